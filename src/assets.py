@@ -0,0 +1,141 @@
+import errno
+import os
+
+from shutil import copy, copyfile, copymode
+
+# ioctl request number of FICLONE on Linux, from linux/fs.h
+FICLONE = 0x40049409
+
+# Errors that mean a strategy is not supported for this pair of files, so a plain copy is used instead
+UNSUPPORTED_ERRORS = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EPERM, errno.ENOSYS}
+
+def remove_existing(dest: str):
+    """
+    Remove an existing output file, so a new file is created instead of writing into a linked one.
+
+    :param dest: Path to the output file.
+    """
+    try:
+        os.unlink(dest)
+    except FileNotFoundError:
+        pass
+
+def remove_empty_parents(path: str, root: str):
+    """
+    Remove the directories of a removed output that it left empty, up to the output directory.
+
+    :param path: Path to the removed output file.
+    :param root: The output directory, which is kept even when empty.
+    """
+    root = os.path.abspath(root)
+    directory = os.path.dirname(os.path.abspath(path))
+    while directory.startswith(root + os.sep):
+        try:
+            os.rmdir(directory)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Not empty, so neither are its parents
+            break
+        directory = os.path.dirname(directory)
+
+def copy_asset(src: str, dest: str):
+    """
+    Copy a file byte for byte.
+
+    :param src: Path to the source file.
+    :param dest: Path to the output file.
+    """
+    remove_existing(dest)
+    copy(src, dest)
+
+def hardlink_asset(src: str, dest: str):
+    """
+    Link the output to the source file, so no data is copied and no extra disk space is used.
+
+    Falls back to a copy when the files are on different file systems.
+
+    :param src: Path to the source file.
+    :param dest: Path to the output file.
+    """
+    remove_existing(dest)
+    try:
+        os.link(src, dest)
+    except OSError as e:
+        if e.errno not in UNSUPPORTED_ERRORS:
+            raise
+        copy(src, dest)
+
+def reflink_asset(src: str, dest: str):
+    """
+    Clone the source file with copy-on-write (FICLONE), sharing its blocks until either file changes.
+
+    Falls back to a copy when the file system does not support reflinks.
+
+    :param src: Path to the source file.
+    :param dest: Path to the output file.
+    """
+    remove_existing(dest)
+    try:
+        import fcntl
+    except ImportError:
+        copy(src, dest)
+        return
+
+    try:
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    except OSError as e:
+        if e.errno not in UNSUPPORTED_ERRORS:
+            raise
+        copy(src, dest)
+        return
+    copymode(src, dest)
+
+def sendfile_asset(src: str, dest: str):
+    """
+    Copy a file inside the kernel with os.sendfile, without passing the data through Python.
+
+    Falls back to a copy when os.sendfile is not available.
+
+    :param src: Path to the source file.
+    :param dest: Path to the output file.
+    """
+    remove_existing(dest)
+    if not hasattr(os, "sendfile"):
+        copy(src, dest)
+        return
+
+    try:
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            size = os.fstat(s.fileno()).st_size
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(d.fileno(), s.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+    except OSError as e:
+        if e.errno not in UNSUPPORTED_ERRORS:
+            raise
+        copyfile(src, dest)
+    copymode(src, dest)
+
+STRATEGIES = {
+    "copy": copy_asset,
+    "hardlink": hardlink_asset,
+    "reflink": reflink_asset,
+    "sendfile": sendfile_asset,
+}
+
+def sync_asset(src: str, dest: str, strategy: str = "copy"):
+    """
+    Write a static file to the output tree using a sync strategy.
+
+    :param src: Path to the source file.
+    :param dest: Path to the output file.
+    :param strategy: One of copy, hardlink, reflink or sendfile.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown asset strategy: {strategy}")
+    STRATEGIES[strategy](src, dest)
@@ -0,0 +1,508 @@
+import json
+import os
+import sys
+
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from io import StringIO
+from os.path import exists, isfile, join
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from tracemalloc import get_traced_memory, start as start_tracing, stop as stop_tracing
+
+from corpus import CorpusSettings, generate_corpus, generate_inline, generate_page_markdown
+from frontmatter import split_front_matter
+from memo import clear_memos
+from main import extract_title, main, markdown_to_flat_document, markdown_to_html_node, parse_page, read_page
+from source import SourceFile
+from splitnodes import text_to_textnodes
+from blocknode import block_to_block_type, classify_block, markdown_to_blocks, remove_block_markers
+from treeindex import TreeIndex, make_directories
+
+# Bytes of the large page read by the source benchmarks, per page of the corpus settings
+LARGE_PAGE_BYTES = 20 * 1024
+
+def measure(function, repeat: int = 3) -> float:
+    """
+    Run a function several times and keep the fastest run.
+
+    Memos are cleared before every run, so a run is never timed against results cached by
+    the previous one. Fragments repeated within a run still hit, like in a real build.
+
+    :param function: The function to run, without arguments.
+    :param repeat: Number of runs.
+    :return: The time of the fastest run in seconds.
+    """
+    best = None
+    for _ in range(repeat):
+        clear_memos()
+        start = perf_counter()
+        function()
+        elapsed = perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def measure_memory(function) -> dict:
+    """
+    Trace the memory allocated by a function while its result is kept alive.
+
+    :param function: The function to run, without arguments.
+    :return: A dictionary with the bytes still held after the call and the peak during it.
+    """
+    clear_memos()
+    start_tracing()
+    try:
+        kept = function()
+        retained, peak = get_traced_memory()
+    finally:
+        stop_tracing()
+    del kept
+    return {"retained_bytes": retained, "peak_bytes": peak}
+
+def result(seconds: float, items: int, size: int) -> dict:
+    """
+    Build the result of a benchmark.
+
+    :param seconds: Time of the fastest run.
+    :param items: Number of items processed per run.
+    :param size: Number of bytes processed per run.
+    :return: A dictionary with the time and the throughput.
+    """
+    return {
+        "seconds": seconds,
+        "items": items,
+        "bytes": size,
+        "items_per_sec": items / seconds if seconds else 0.0,
+        "mb_per_sec": size / seconds / 1e6 if seconds else 0.0,
+    }
+
+def bench_text_to_textnodes(settings: CorpusSettings, repeat: int) -> dict:
+    """
+    Benchmark tokenizing generated paragraphs with text_to_textnodes.
+    """
+    rng = Random(settings.seed)
+    paragraphs = [generate_inline(rng, settings, settings.paragraph_words) for _ in range(settings.pages)]
+
+    def run():
+        for paragraph in paragraphs:
+            text_to_textnodes(paragraph)
+
+    return result(measure(run, repeat), len(paragraphs), sum(len(p.encode()) for p in paragraphs))
+
+def bench_parse(parse, settings: CorpusSettings, repeat: int) -> dict:
+    """
+    Benchmark parsing generated pages, including the memory held by the parsed documents.
+    """
+    rng = Random(settings.seed)
+    pages = [generate_page_markdown(rng, settings, index) for index in range(settings.pages)]
+
+    def run():
+        return [parse(page) for page in pages]
+
+    report = result(measure(run, repeat), len(pages), sum(len(p.encode()) for p in pages))
+    report.update(measure_memory(run))
+    return report
+
+def bench_markdown_to_html_node(settings: CorpusSettings, repeat: int) -> dict:
+    """
+    Benchmark parsing generated pages with markdown_to_html_node.
+    """
+    return bench_parse(markdown_to_html_node, settings, repeat)
+
+def bench_markdown_to_flat_document(settings: CorpusSettings, repeat: int) -> dict:
+    """
+    Benchmark parsing generated pages with markdown_to_flat_document.
+    """
+    return bench_parse(markdown_to_flat_document, settings, repeat)
+
+def bench_to_html(settings: CorpusSettings, repeat: int) -> dict:
+    """
+    Benchmark serializing parsed pages with ParentNode.to_html.
+    """
+    rng = Random(settings.seed)
+    nodes = [markdown_to_html_node(generate_page_markdown(rng, settings, index)) for index in range(settings.pages)]
+    size = sum(len(node.to_html().encode()) for node in nodes)
+
+    def run():
+        for node in nodes:
+            node.to_html()
+
+    return result(measure(run, repeat), len(nodes), size)
+
+def bench_to_html_flat(settings: CorpusSettings, repeat: int) -> dict:
+    """
+    Benchmark serializing flat documents with FlatDocument.to_html.
+    """
+    rng = Random(settings.seed)
+    documents = [markdown_to_flat_document(generate_page_markdown(rng, settings, index)) for index in range(settings.pages)]
+    size = sum(len(document.to_html().encode()) for document in documents)
+
+    def run():
+        for document in documents:
+            document.to_html()
+
+    return result(measure(run, repeat), len(documents), size)
+
+def generate_classifier_blocks(settings: CorpusSettings, marker: str) -> list[str]:
+    """
+    Generate list or quote blocks for the classifier benchmarks.
+
+    :param settings: The corpus settings.
+    :param marker: "-" for unordered lists, "1." for ordered lists or ">" for quotes.
+    :return: List of markdown blocks.
+    """
+    rng = Random(settings.seed)
+    blocks = []
+
+    for _ in range(settings.pages * 10):
+        lines = [generate_inline(rng, settings, rng.randint(3, 12)) for _ in range(rng.randint(2, 20))]
+        if marker == "1.":
+            blocks.append("\n".join(f"{number}. {line}" for number, line in enumerate(lines, 1)))
+        else:
+            blocks.append("\n".join(f"{marker} {line}" for line in lines))
+
+    return blocks
+
+def bench_classifier(classify, markers: list[str]):
+    """
+    Build a benchmark of a block classifier on list-heavy or quote-heavy blocks.
+
+    :param classify: Function taking a block and returning its type and cleaned content.
+    :param markers: Block markers of the generated blocks.
+    :return: The benchmark function.
+    """
+    def benchmark(settings: CorpusSettings, repeat: int) -> dict:
+        blocks = [block for marker in markers for block in generate_classifier_blocks(settings, marker)]
+
+        def run():
+            for block in blocks:
+                classify(block)
+
+        return result(measure(run, repeat), len(blocks), sum(len(block.encode()) for block in blocks))
+
+    return benchmark
+
+def classify_two_pass(block: str) -> tuple:
+    """
+    Classify a block the old way, with block_to_block_type and then remove_block_markers.
+    """
+    block_type = block_to_block_type(block)
+    return block_type, remove_block_markers(block, block_type)
+
+def generate_large_markdown(settings: CorpusSettings) -> str:
+    """
+    Generate one large page for the source reading benchmarks, LARGE_PAGE_BYTES per page of
+    the settings, about 4 MB with the default 200 pages.
+
+    :param settings: The corpus settings.
+    :return: The markdown text.
+    """
+    rng = Random(settings.seed)
+    size = settings.pages * LARGE_PAGE_BYTES
+    blocks = []
+    total = 0
+    index = 0
+    while total < size:
+        page = generate_page_markdown(rng, settings, index)
+        blocks.append(page)
+        total += len(page.encode()) + 2
+        index += 1
+    return "\n\n".join(blocks)
+
+def read_text(path: str) -> tuple:
+    """
+    Read and parse a page the old way, decoding the whole file and splitting the string.
+    """
+    with open(path, "r") as f:
+        md_content = f.read()
+    return parse_page(md_content)
+
+def scan_text(path: str) -> tuple:
+    """
+    Find the title and blocks of a page from the decoded file, without inline parsing.
+    """
+    with open(path, "r") as f:
+        _, body = split_front_matter(f.read())
+    return extract_title(body), markdown_to_blocks(body)
+
+def scan_mmap(path: str) -> tuple:
+    """
+    Find the title and blocks of a page with the bytes-level scanner, without inline parsing.
+    """
+    with SourceFile(path) as source:
+        _, start = source.read_front_matter()
+        return source.title(start), list(source.blocks(start))
+
+def bench_source(read):
+    """
+    Build a benchmark of reading a multi-megabyte page, including the peak memory of a read.
+
+    :param read: Function taking the path of the page.
+    :return: The benchmark function.
+    """
+    def benchmark(settings: CorpusSettings, repeat: int) -> dict:
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, "large.md")
+            with open(path, "w") as f:
+                f.write(generate_large_markdown(settings))
+
+            with redirect_stdout(StringIO()):
+                report = result(measure(lambda: read(path), repeat), 1, os.path.getsize(path))
+                report.update(measure_memory(lambda: read(path)))
+            return report
+
+    return benchmark
+
+def bench_build(settings: CorpusSettings, repeat: int, jobs: int = 1) -> dict:
+    """
+    Benchmark the full build of a generated site through main.
+    """
+    with TemporaryDirectory() as tmp:
+        site = generate_corpus(tmp, settings)
+        argv = [
+            "--content", site["content"],
+            "--static", site["static"],
+            "--template", site["template"],
+            "--output", join(tmp, "docs"),
+            "--state-dir", join(tmp, ".build"),
+            "--jobs", str(jobs),
+        ]
+
+        def run():
+            with redirect_stdout(StringIO()):
+                main(argv)
+
+        return result(measure(run, repeat), settings.pages, site["bytes"])
+
+class SyscallCounter:
+    """
+    Counts calls to the os functions a directory traversal makes, by wrapping them.
+
+    DirEntry.stat cannot be wrapped, so TreeIndex counts its own stats.
+    """
+
+    NAMES = ("stat", "lstat", "listdir", "scandir", "mkdir")
+
+    def __init__(self):
+        self.calls = 0
+        self.originals = {}
+
+    def wrap(self, function):
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return function(*args, **kwargs)
+        return counted
+
+    def __enter__(self):
+        for name in self.NAMES:
+            self.originals[name] = getattr(os, name)
+            setattr(os, name, self.wrap(self.originals[name]))
+        return self
+
+    def __exit__(self, *exc):
+        for name, function in self.originals.items():
+            setattr(os, name, function)
+        return False
+
+def legacy_traversal(content: str, static: str, output: str):
+    """
+    Walk the site the old way, with listdir, isfile and exists on every entry and makedirs on every
+    directory, including the stat of each source made by the build manifest.
+    """
+    def copy_tree(src, dest):
+        if not exists(dest):
+            os.makedirs(dest)
+        for item in os.listdir(src):
+            path = join(src, item)
+            if isfile(path):
+                os.stat(path)
+            else:
+                copy_tree(path, join(dest, item))
+
+    def walk_pages(directory, dest):
+        for item in sorted(os.listdir(directory)):
+            path = join(directory, item)
+            if isfile(path) and item.endswith(".md"):
+                os.stat(path)
+                os.makedirs(dest, exist_ok=True)
+            elif not isfile(path):
+                walk_pages(path, join(dest, item))
+
+    copy_tree(static, output)
+    walk_pages(content, output)
+
+def indexed_traversal(content: str, static: str, output: str) -> int:
+    """
+    Walk the site with TreeIndex and create the output directories in batches.
+
+    :return: Number of stats made through DirEntry.stat.
+    """
+    static_index = TreeIndex(static)
+    content_index = TreeIndex(content)
+    make_directories(output, static_index.directories)
+    make_directories(output, [os.path.dirname(file.relative) for file in content_index.files if file.relative.endswith(".md")])
+    return static_index.stat_calls + content_index.stat_calls
+
+def bench_traversal(settings: CorpusSettings, repeat: int) -> dict:
+    """
+    Benchmark the scan of a generated site with TreeIndex, and count the system calls it saves
+    over the old listdir walk.
+    """
+    with TemporaryDirectory() as tmp:
+        site = generate_corpus(tmp, settings)
+        output = join(tmp, "docs")
+
+        with SyscallCounter() as legacy:
+            legacy_traversal(site["content"], site["static"], output)
+        with SyscallCounter() as indexed:
+            entry_stats = indexed_traversal(site["content"], site["static"], output)
+
+        data = result(measure(lambda: indexed_traversal(site["content"], site["static"], output), repeat), settings.pages, site["bytes"])
+        data["syscalls"] = indexed.calls + entry_stats
+        data["legacy_syscalls"] = legacy.calls
+        return data
+
+BENCHMARKS = {
+    "text_to_textnodes": bench_text_to_textnodes,
+    "markdown_to_html_node": bench_markdown_to_html_node,
+    "markdown_to_flat_document": bench_markdown_to_flat_document,
+    "to_html": bench_to_html,
+    "to_html_flat": bench_to_html_flat,
+    "classify_lists_two_pass": bench_classifier(classify_two_pass, ["-", "1."]),
+    "classify_lists": bench_classifier(classify_block, ["-", "1."]),
+    "classify_quotes_two_pass": bench_classifier(classify_two_pass, [">"]),
+    "classify_quotes": bench_classifier(classify_block, [">"]),
+    "traversal": bench_traversal,
+    "scan_text": bench_source(scan_text),
+    "scan_mmap": bench_source(scan_mmap),
+    "read_text": bench_source(read_text),
+    "read_mmap": bench_source(read_page),
+}
+
+def run_benchmarks(settings: CorpusSettings, repeat: int = 3, jobs: int = 1, names: list[str] = None) -> dict:
+    """
+    Run the micro-benchmarks and the full build benchmark.
+
+    :param settings: The corpus settings.
+    :param repeat: Number of runs per benchmark.
+    :param jobs: Number of processes used by the full build.
+    :param names: Names of the benchmarks to run, all by default.
+    :return: A dictionary of the settings and the benchmark results.
+    """
+    results = {}
+
+    for name, benchmark in BENCHMARKS.items():
+        if names is None or name in names:
+            results[name] = benchmark(settings, repeat)
+    if names is None or "build" in names:
+        results["build"] = bench_build(settings, repeat, jobs)
+
+    return {"settings": settings.to_dict(), "jobs": jobs, "results": results}
+
+def compare_results(current: dict, baseline: dict, threshold: float = 0.1) -> list[str]:
+    """
+    Compare benchmark results against a baseline.
+
+    :param current: Results returned by run_benchmarks.
+    :param baseline: Results of a previous run.
+    :param threshold: Allowed relative drop in throughput before a benchmark counts as a regression.
+    :return: List of messages describing the regressions.
+    """
+    regressions = []
+
+    for name, now in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before["mb_per_sec"]:
+            continue
+        change = now["mb_per_sec"] / before["mb_per_sec"] - 1
+        if change < -threshold:
+            regressions.append(
+                f"{name}: {now['mb_per_sec']:.2f} MB/s vs {before['mb_per_sec']:.2f} MB/s baseline ({change:+.1%})"
+            )
+
+    return regressions
+
+def format_results(report: dict) -> str:
+    """
+    Format benchmark results as a table.
+
+    :param report: Results returned by run_benchmarks.
+    :return: The table text.
+    """
+    lines = [f"{'Benchmark':<26} {'Seconds':>9} {'Items/s':>12} {'MB/s':>9} {'Held MB':>9} {'Peak MB':>9}"]
+    for name, data in report["results"].items():
+        held = f"{data['retained_bytes'] / 1e6:>9.2f}" if "retained_bytes" in data else f"{'':>9}"
+        peak = f"{data['peak_bytes'] / 1e6:>9.2f}" if "peak_bytes" in data else f"{'':>9}"
+        lines.append(f"{name:<26} {data['seconds']:>9.4f} {data['items_per_sec']:>12.1f} {data['mb_per_sec']:>9.2f} {held} {peak}")
+    for name, data in report["results"].items():
+        if "syscalls" in data:
+            saved = data["legacy_syscalls"] - data["syscalls"]
+            lines.append(f"{name}: {data['syscalls']} syscalls vs {data['legacy_syscalls']} with listdir, {saved} saved")
+    return "\n".join(lines)
+
+def parse_args(args: list[str] = None):
+    """
+    Parse the command line arguments of the benchmark.
+
+    :param args: The arguments to parse, defaults to sys.argv.
+    :return: The parsed arguments.
+    """
+    parser = ArgumentParser(description="Benchmark the static site generator on a synthetic site")
+    parser.add_argument("--pages", type=int, default=200, help="number of pages to generate")
+    parser.add_argument("--depth", type=int, default=2, help="directory nesting depth")
+    parser.add_argument("--paragraph-words", type=int, default=80, help="words per paragraph")
+    parser.add_argument("--link-density", type=float, default=0.05, help="fraction of words that are links")
+    parser.add_argument("--image-density", type=float, default=0.01, help="fraction of words that are images")
+    parser.add_argument("--list-density", type=float, default=0.2, help="fraction of blocks that are lists")
+    parser.add_argument("--code-density", type=float, default=0.1, help="fraction of blocks that are code")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic site")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the fastest is kept")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="processes used by the full build")
+    parser.add_argument("--only", nargs="+", choices=[*BENCHMARKS, "build"], help="benchmarks to run")
+    parser.add_argument("--output", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against results written by --output")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative slowdown against the baseline")
+    return parser.parse_args(args)
+
+def run(argv: list[str] = None) -> int:
+    """
+    Run the benchmarks from the command line.
+
+    :param argv: The arguments to parse, defaults to sys.argv.
+    :return: The exit code, 1 if a regression was found.
+    """
+    args = parse_args(argv)
+    settings = CorpusSettings(
+        pages=args.pages,
+        depth=args.depth,
+        paragraph_words=args.paragraph_words,
+        link_density=args.link_density,
+        image_density=args.image_density,
+        list_density=args.list_density,
+        code_density=args.code_density,
+        seed=args.seed,
+    )
+
+    report = run_benchmarks(settings, args.repeat, args.jobs, args.only)
+    print(format_results(report))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_results(report, baseline, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -31,6 +31,98 @@ def markdown_to_blocks(markdown: str) -> list[str]:
 
     return blocks
 
+HEADING_PATTERN = re.compile(r'#{1,6}\s')
+UNORDERED_ITEM_PATTERN = re.compile(r'-\s.')
+
+def classify_block(markdown_block: str) -> tuple[BlockType, str]:
+    """
+    Determine the type of a block and remove its block markers in a single pass.
+
+    Gives the same result as block_to_block_type followed by remove_block_markers, but
+    dispatches on the first character and strips list and quote markers while checking
+    each line, so a block is scanned once.
+
+    :param markdown_block: The markdown block to classify.
+    :return: A (BlockType, block content without markers) pair.
+    """
+    first = markdown_block[:1]
+
+    if first == "#":
+        match = HEADING_PATTERN.match(markdown_block)
+        if match:
+            return BlockType.HEADING, markdown_block[match.end():].strip()
+    elif first == "`":
+        if markdown_block.startswith('```') and markdown_block.endswith('```'):
+            return BlockType.CODE, markdown_block.replace('```\n', '').replace('```', '')
+    elif first == ">":
+        lines = []
+        for line in markdown_block.split('\n'):
+            if not line.startswith('>'):
+                break
+            lines.append(line[1:])
+        else:
+            return BlockType.QUOTE, '\n'.join(lines).strip()
+    elif first == "-":
+        lines = []
+        for line in markdown_block.split('\n'):
+            if not UNORDERED_ITEM_PATTERN.match(line):
+                break
+            lines.append(line[2:])
+        else:
+            return BlockType.UNORDERED_LIST, '\n'.join(lines).strip()
+    elif first.isdigit():
+        lines = []
+        for index, line in enumerate(markdown_block.split('\n'), 1):
+            marker = f"{index}. "
+            if not line.startswith(marker) or not line[len(marker):].strip():
+                break
+            lines.append(line[len(marker):])
+        else:
+            return BlockType.ORDERED_LIST, '\n'.join(lines).strip()
+
+    return BlockType.PARAGRAPH, markdown_block.replace('\n', ' ')
+
+class BlockReader:
+    """
+    Reads markdown blocks from a file object line by line, capturing the title on the way.
+
+    Blocks are the same as the ones markdown_to_blocks returns, but only the current
+    block is held in memory.
+    """
+
+    def __init__(self, fp):
+        """
+        Initialize the BlockReader with a text file object.
+
+        :param fp: The text file object to read from.
+        """
+        self.fp = fp
+        self.title = None
+
+    def __iter__(self):
+        """
+        Read the file and generate its blocks.
+
+        :return: An iterator over the non-empty blocks of the file.
+        """
+        lines = []
+
+        for line in self.fp:
+            if line == "\n":
+                block = "".join(lines).strip()
+                lines = []
+                if block != "":
+                    yield block
+                continue
+
+            if self.title is None and line.startswith("# "):
+                self.title = line[2:].strip()
+            lines.append(line)
+
+        block = "".join(lines).strip()
+        if block != "":
+            yield block
+
 def block_to_block_type(markdown_block: str) -> BlockType:
     """
     Determines the type of block based on the markdown content.
@@ -0,0 +1,219 @@
+import os
+
+from datetime import datetime, timezone
+from html import escape
+from os.path import join
+
+# Name of the Atom feed written in the directory of every collection
+FEED_NAME = "feed.xml"
+
+PAGE_SIZE = 10
+FEED_SIZE = 20
+
+def parse_date(value: str) -> datetime:
+    """
+    Parse a date from front matter, such as 2024-05-01 or 2024-05-01T12:30:00+02:00.
+
+    :param value: The ISO 8601 date.
+    :return: An aware datetime, in UTC when no offset is given.
+    """
+    date = datetime.fromisoformat(value)
+    return date if date.tzinfo is not None else date.replace(tzinfo=timezone.utc)
+
+def page_url(relative_output: str) -> str:
+    """
+    Get the root-relative URL a page is served at.
+
+    :param relative_output: Path of the HTML file relative to the output directory.
+    :return: The URL, ending with the directory for index pages.
+    """
+    url = "/" + relative_output.replace(os.sep, "/")
+    return url[:-len("index.html")] if url.endswith("/index.html") or url == "/index.html" else url
+
+class PageMeta:
+    """
+    What listings and feeds show of a page, known without parsing its body.
+    """
+
+    __slots__ = ("source", "url", "title", "date", "description", "meta")
+
+    def __init__(self, source: str, url: str, title: str, date: datetime, description: str = "", meta: dict = None):
+        self.source = source
+        self.url = url
+        self.title = title
+        self.date = date
+        self.description = description
+        self.meta = meta or {}
+
+def page_meta(path: str, url: str, entry: dict) -> PageMeta:
+    """
+    Get what listings show of a page from its metadata index entry.
+
+    :param path: Path to the markdown file.
+    :param url: The URL of the generated page.
+    :param entry: The entry of the page in the MetadataIndex.
+    :return: The PageMeta of the page, dated by its modification time when it has no date.
+    """
+    fields = entry["fields"]
+    try:
+        date = parse_date(fields["date"]) if "date" in fields else datetime.fromtimestamp(entry["mtime"] // 1_000_000_000, timezone.utc)
+    except ValueError:
+        raise ValueError(f"Invalid date {fields['date']!r} in {path}, expected YYYY-MM-DD")
+    return PageMeta(path, url, entry["title"], date, fields.get("description", ""), fields)
+
+class Collection:
+    """
+    The pages under a content directory, newest first, split into listing pages.
+    """
+
+    def __init__(self, name: str, pages: list[PageMeta], page_size: int = PAGE_SIZE, has_index: bool = False):
+        """
+        Initialize the Collection.
+
+        :param name: The content directory, relative to the content root, such as blog.
+        :param pages: The pages of the collection, in any order.
+        :param page_size: Number of pages per listing page.
+        :param has_index: Whether the directory has its own index page, in which case the first
+            listing page is written under page/1 instead of replacing it.
+        """
+        self.name = name.strip("/")
+        self.title = self.name.replace("-", " ").replace("/", " ").title()
+        # Sorted once, every listing page is then a slice
+        self.pages = sorted(pages, key=lambda page: (-page.date.timestamp(), page.title))
+        self.page_size = max(1, page_size)
+        self.has_index = has_index
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-len(self.pages) // self.page_size))
+
+    def listing_path(self, number: int) -> str:
+        """
+        Get the output path of a listing page.
+
+        :param number: The number of the listing page, from 1.
+        :return: The path relative to the output directory.
+        """
+        if number == 1 and not self.has_index:
+            return join(self.name, "index.html")
+        return join(self.name, "page", str(number), "index.html")
+
+    def listings(self):
+        """
+        Split the pages into listing pages.
+
+        :return: An iterator over (number, pages) pairs.
+        """
+        for number in range(1, self.page_count + 1):
+            start = (number - 1) * self.page_size
+            yield number, self.pages[start:start + self.page_size]
+
+    def render_listing(self, number: int, pages: list[PageMeta]) -> list[str]:
+        """
+        Render the body of a listing page.
+
+        :param number: The number of the listing page.
+        :param pages: The pages it lists.
+        :return: The HTML fragments of the body, with root-relative links.
+        """
+        fragments = [f"<div><h1>{escape(self.title, quote=False)}</h1><ul>"]
+        for page in pages:
+            fragments.append(f'<li><a href="{escape(page.url)}">{escape(page.title, quote=False)}</a> <time datetime="{page.date.isoformat()}">{page.date:%Y-%m-%d}</time>')
+            if page.description:
+                fragments.append(f"<p>{escape(page.description, quote=False)}</p>")
+            fragments.append("</li>")
+        fragments.append("</ul>")
+
+        links = []
+        if number > 1:
+            links.append(f'<a href="{page_url(self.listing_path(number - 1))}" rel="prev">Newer</a>')
+        if number < self.page_count:
+            links.append(f'<a href="{page_url(self.listing_path(number + 1))}" rel="next">Older</a>')
+        if links:
+            fragments.append(f'<nav>{" ".join(links)}</nav>')
+        fragments.append("</div>")
+        return fragments
+
+    def render_feed(self, base_url: str, size: int = FEED_SIZE) -> str:
+        """
+        Render an Atom feed of the newest pages.
+
+        :param base_url: The absolute URL of the site root, ending with a slash.
+        :param size: Maximum number of entries.
+        :return: The XML of the feed.
+        """
+        home = f"{base_url}{self.name}/"
+        updated = self.pages[0].date if self.pages else datetime.fromtimestamp(0, timezone.utc)
+        lines = [
+            '<?xml version="1.0" encoding="utf-8"?>',
+            '<feed xmlns="http://www.w3.org/2005/Atom">',
+            f"  <title>{escape(self.title)}</title>",
+            f"  <id>{escape(home)}</id>",
+            f'  <link href="{escape(home)}"/>',
+            f'  <link rel="self" href="{escape(home + FEED_NAME)}"/>',
+            f"  <updated>{updated.isoformat()}</updated>",
+        ]
+        for page in self.pages[:size]:
+            url = escape(base_url + page.url[1:])
+            lines += [
+                "  <entry>",
+                f"    <title>{escape(page.title)}</title>",
+                f'    <link href="{url}"/>',
+                f"    <id>{url}</id>",
+                f"    <updated>{page.date.isoformat()}</updated>",
+            ]
+            if page.description:
+                lines.append(f"    <summary>{escape(page.description)}</summary>")
+            lines.append("  </entry>")
+        lines.append("</feed>")
+        return "\n".join(lines) + "\n"
+
+def build_collections(metadata, root: str, names: list[str], page_output, page_size: int = PAGE_SIZE, include_drafts: bool = False) -> list[Collection]:
+    """
+    Group the pages of every collection, from the metadata index alone.
+
+    :param metadata: The MetadataIndex of the content directory, up to date.
+    :param root: The content directory.
+    :param names: The content directories to list.
+    :param page_output: Function mapping a markdown path to its HTML path, both relative.
+    :param page_size: Number of pages per listing page.
+    :param include_drafts: Whether draft pages are listed.
+    :return: The collections, in the order of names.
+    """
+    names = [name.strip("/") for name in names]
+    members = {name: [] for name in names}
+    indexes = set()
+    for relative, entry in sorted(metadata.entries.items()):
+        if entry["fields"]["draft"] and not include_drafts:
+            continue
+        path = relative.replace(os.sep, "/")
+        for name in names:
+            if path == f"{name}/index.md":
+                indexes.add(name)
+            elif path.startswith(f"{name}/"):
+                members[name].append(page_meta(join(root, relative), page_url(page_output(relative)), entry))
+    return [Collection(name, members[name], page_size, name in indexes) for name in names]
+
+def stale_listings(output: str, collection: Collection) -> list[str]:
+    """
+    Find listing pages of a previous build beyond the current page count.
+
+    :param output: The output directory.
+    :param collection: The collection.
+    :return: Paths of the directories of the stale listing pages.
+    """
+    directory = join(output, collection.name, "page")
+    if not os.path.isdir(directory):
+        return []
+    first = 1 if collection.has_index else 2
+    return [join(directory, name) for name in os.listdir(directory) if name.isdigit() and not first <= int(name) <= collection.page_count]
+
+def base_url(site_url: str, basepath: str) -> str:
+    """
+    Join the site URL and the basepath.
+
+    :param site_url: The scheme and host of the site, such as https://example.com, or empty.
+    :param basepath: The basepath of the site.
+    :return: The absolute URL of the site root, ending with a slash.
+    """
+    return site_url.rstrip("/") + "/" + basepath.strip("/") + ("/" if basepath.strip("/") else "")
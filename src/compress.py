@@ -0,0 +1,146 @@
+import json
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+from gzip import GzipFile
+from os import makedirs
+from os.path import dirname, exists, getsize, join, relpath
+
+from assets import remove_empty_parents, remove_existing
+from manifest import hash_file
+
+COMPRESS_STORE_PATH = "./.build/compress.json"
+
+# Outputs served as text, which the CDN asks for with Accept-Encoding
+COMPRESS_SUFFIXES = (".html", ".css")
+
+CHUNK_SIZE = 64 * 1024
+
+def compress_file(path: str, level: int = 9) -> bool:
+    """
+    Stream a file through gzip into a .gz sibling.
+
+    The header carries no name or timestamp, so the same content always compresses to the
+    same bytes. No sibling is kept when it would not be smaller than the file.
+
+    :param path: Path to the file.
+    :param level: The gzip compression level, from 1 to 9.
+    :return: True if the sibling was written, False if compression saved no space.
+    """
+    dest = path + ".gz"
+    partial = dest + ".tmp"
+    with open(path, "rb") as source, open(partial, "wb") as raw:
+        with GzipFile(filename="", mode="wb", compresslevel=level, fileobj=raw, mtime=0) as compressed:
+            while chunk := source.read(CHUNK_SIZE):
+                compressed.write(chunk)
+
+    if getsize(partial) >= getsize(path):
+        os.remove(partial)
+        remove_existing(dest)
+        return False
+    os.replace(partial, dest)
+    return True
+
+class Compressor:
+    """
+    Writes .gz siblings of outputs in a pool of threads while the build goes on.
+
+    The content hash of every output is kept between builds, so an output whose content did
+    not change is not compressed again as long as its sibling is still there.
+    """
+
+    def __init__(self, output: str, threads: int = None, level: int = 9):
+        """
+        Initialize the Compressor.
+
+        :param output: The output directory the stored paths are relative to.
+        :param threads: Number of compression threads, the number of CPUs when not given.
+        :param level: The gzip compression level, from 1 to 9.
+        """
+        self.output = output
+        self.threads = threads or os.cpu_count() or 1
+        self.level = level
+        self.previous = {}
+        self.entries = {}
+        self.futures = {}
+        self.executor = ThreadPoolExecutor(self.threads)
+        self.counts = {"compressed": 0, "incompressible": 0, "unchanged": 0}
+
+    def load(self, path: str):
+        """
+        Load the content hashes of a previous build.
+
+        :param path: Path of a store written by save.
+        """
+        try:
+            with open(path, "r") as f:
+                self.previous = json.load(f)["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def save(self, path: str):
+        """
+        Write the content hashes of this build.
+
+        :param path: Path of the store.
+        """
+        directory = dirname(path)
+        if directory:
+            makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"files": self.entries}, f, indent=2, sort_keys=True)
+
+    def submit(self, path: str):
+        """
+        Queue an output for compression, if it is of a compressed type.
+
+        Safe to call from several threads, as long as each output is queued once.
+
+        :param path: Path of the output, which must be completely written.
+        """
+        if not path.endswith(COMPRESS_SUFFIXES):
+            return
+        self.futures[path] = self.executor.submit(self.compress, path)
+
+    def compress(self, path: str) -> tuple[dict, str]:
+        """
+        Compress an output unless its content is unchanged since the previous build.
+
+        :param path: Path of the output.
+        :return: The stored entry of the output and what was done, one of the keys of counts.
+        """
+        digest = hash_file(path)
+        previous = self.previous.get(relpath(path, self.output))
+        if previous is not None and previous["hash"] == digest and (not previous["compressed"] or exists(path + ".gz")):
+            return previous, "unchanged"
+        compressed = compress_file(path, self.level)
+        return {"hash": digest, "compressed": compressed}, "compressed" if compressed else "incompressible"
+
+    def finish(self) -> dict[str, int]:
+        """
+        Wait for every queued output and stop the threads, then forget outputs that no longer exist and remove their siblings.
+
+        Outputs that were not queued, such as the ones an incremental build skipped, keep their
+        previous entry.
+
+        :return: Number of outputs by what was done with them.
+        """
+        try:
+            for path, future in self.futures.items():
+                entry, outcome = future.result()
+                self.entries[relpath(path, self.output)] = entry
+                self.counts[outcome] += 1
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+            self.futures = {}
+
+        for relative, entry in self.previous.items():
+            if relative in self.entries:
+                continue
+            path = join(self.output, relative)
+            if exists(path):
+                self.entries[relative] = entry
+            else:
+                remove_existing(path + ".gz")
+                remove_empty_parents(path, self.output)
+        return self.counts
@@ -0,0 +1,177 @@
+from os import makedirs
+from os.path import join
+from random import Random
+
+WORDS = [
+    "elf", "ring", "shire", "hobbit", "wizard", "mountain", "river", "forest", "tower", "shadow",
+    "light", "king", "road", "journey", "song", "sword", "council", "valley", "harbour", "lore",
+    "ancient", "quiet", "golden", "grey", "swift", "distant", "hidden", "bright", "old", "deep",
+]
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+class CorpusSettings:
+    """
+    The shape of a synthetic content tree.
+    """
+
+    def __init__(
+        self,
+        pages: int = 100,
+        depth: int = 2,
+        paragraph_words: int = 80,
+        link_density: float = 0.05,
+        image_density: float = 0.01,
+        list_density: float = 0.2,
+        code_density: float = 0.1,
+        seed: int = 0,
+    ):
+        """
+        Initialize the CorpusSettings.
+
+        :param pages: Number of pages to generate.
+        :param depth: Number of directory levels the pages are nested in.
+        :param paragraph_words: Number of words per paragraph.
+        :param link_density: Fraction of inline tokens that are links.
+        :param image_density: Fraction of inline tokens that are images.
+        :param list_density: Fraction of blocks that are lists.
+        :param code_density: Fraction of blocks that are code blocks.
+        :param seed: Seed of the random generator, so the same settings always produce the same tree.
+        """
+        self.pages = pages
+        self.depth = depth
+        self.paragraph_words = paragraph_words
+        self.link_density = link_density
+        self.image_density = image_density
+        self.list_density = list_density
+        self.code_density = code_density
+        self.seed = seed
+
+    def to_dict(self) -> dict:
+        """
+        Convert the settings to a dictionary, for reports.
+
+        :return: A dictionary of the settings.
+        """
+        return dict(vars(self))
+
+def generate_inline(rng: Random, settings: CorpusSettings, words: int) -> str:
+    """
+    Generate a line of inline markdown.
+
+    :param rng: The random generator.
+    :param settings: The corpus settings.
+    :param words: Number of words to generate.
+    :return: The markdown text.
+    """
+    tokens = []
+
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < settings.image_density:
+            tokens.append(f"![{word} image](/images/{word}.png)")
+        elif roll < settings.image_density + settings.link_density:
+            tokens.append(f"[{word}](/{word}/{rng.randrange(settings.pages)})")
+        elif roll < 0.9:
+            tokens.append(word)
+        elif roll < 0.94:
+            tokens.append(f"**{word}**")
+        elif roll < 0.97:
+            tokens.append(f"_{word}_")
+        else:
+            tokens.append(f"`{word}`")
+
+    return " ".join(tokens)
+
+def generate_page_markdown(rng: Random, settings: CorpusSettings, index: int) -> str:
+    """
+    Generate the markdown of a single page.
+
+    :param rng: The random generator.
+    :param settings: The corpus settings.
+    :param index: Index of the page, used in its title.
+    :return: The markdown text.
+    """
+    blocks = [f"# Page {index} {rng.choice(WORDS)}"]
+
+    for _ in range(rng.randint(4, 12)):
+        roll = rng.random()
+        if roll < settings.code_density:
+            lines = [f"print(\"{rng.choice(WORDS)}\")" for _ in range(rng.randint(1, 6))]
+            blocks.append("```\n" + "\n".join(lines) + "\n```")
+        elif roll < settings.code_density + settings.list_density:
+            items = [generate_inline(rng, settings, rng.randint(3, 12)) for _ in range(rng.randint(2, 8))]
+            if rng.random() < 0.5:
+                blocks.append("\n".join(f"- {item}" for item in items))
+            else:
+                blocks.append("\n".join(f"{number}. {item}" for number, item in enumerate(items, 1)))
+        elif roll < settings.code_density + settings.list_density + 0.05:
+            blocks.append("> " + generate_inline(rng, settings, settings.paragraph_words // 2))
+        else:
+            blocks.append(generate_inline(rng, settings, settings.paragraph_words))
+
+    return "\n\n".join(blocks) + "\n"
+
+def page_directory(content_path: str, index: int, depth: int) -> str:
+    """
+    Build the nested directory of a page.
+
+    :param content_path: The root content directory.
+    :param index: Index of the page.
+    :param depth: Number of directory levels.
+    :return: Path of the page directory.
+    """
+    parts = [content_path]
+    for level in range(depth, 0, -1):
+        parts.append(f"section-{(index // (10 ** level)) % 10}")
+    parts.append(f"page-{index}")
+    return join(*parts)
+
+def generate_corpus(path: str, settings: CorpusSettings = None) -> dict:
+    """
+    Generate a synthetic site with content, static files and a template.
+
+    :param path: Directory to generate the site into.
+    :param settings: The corpus settings.
+    :return: A dictionary with the paths of the generated site and its size in bytes.
+    """
+    settings = settings if settings is not None else CorpusSettings()
+    rng = Random(settings.seed)
+    content_path = join(path, "content")
+    static_path = join(path, "static")
+    template_path = join(path, "template.html")
+    total_bytes = 0
+
+    for index in range(settings.pages):
+        directory = page_directory(content_path, index, settings.depth)
+        makedirs(directory, exist_ok=True)
+        markdown = generate_page_markdown(rng, settings, index)
+        with open(join(directory, "index.md"), "w") as f:
+            f.write(markdown)
+        total_bytes += len(markdown.encode())
+
+    makedirs(join(static_path, "images"), exist_ok=True)
+    with open(join(static_path, "index.css"), "w") as f:
+        f.write("body { font-family: serif; }\n")
+    with open(template_path, "w") as f:
+        f.write(TEMPLATE)
+
+    return {
+        "content": content_path,
+        "static": static_path,
+        "template": template_path,
+        "bytes": total_bytes,
+    }
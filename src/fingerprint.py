@@ -0,0 +1,209 @@
+import json
+import os
+import posixpath
+import re
+
+from hashlib import sha256
+from os import makedirs
+from os.path import dirname, splitext
+
+from manifest import hash_file
+
+# Name of the asset manifest written at the root of the output
+ASSET_MANIFEST = "asset-manifest.json"
+
+# Number of hex digits of the content hash put in fingerprinted names
+FINGERPRINT_LENGTH = 10
+
+# Files only referenced from pages and stylesheets, which can change names. Favicons,
+# robots.txt and the like are fetched by fixed URLs and keep theirs.
+FINGERPRINT_SUFFIXES = (".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".avif", ".woff", ".woff2")
+
+# A url() in a stylesheet, with its optional quotes
+CSS_URL = re.compile(r"""url\(\s*(["']?)([^"')]*)\1\s*\)""")
+
+# The asset map used while rendering pages in this process
+_assets = None
+
+def fingerprint_path(path: str, digest: str) -> str:
+    """
+    Put a content hash in the name of a file, such as index.3f2a9c1b0d.css for index.css.
+
+    :param path: The path or URL of the file.
+    :param digest: The hex content hash of the file.
+    :return: The fingerprinted path or URL.
+    """
+    root, ext = splitext(path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+class AssetMap:
+    """
+    The fingerprinted URL of every asset by its original root-relative URL.
+
+    Links are rewritten with one lookup per href or src attribute, during the same pass that
+    adds the basepath, however many assets the site has.
+    """
+
+    def __init__(self):
+        self.urls = {}
+        self.stylesheets = {}
+        self._version = None
+
+    def __len__(self):
+        return len(self.urls)
+
+    def add(self, relative: str, digest: str) -> str:
+        """
+        Fingerprint an asset.
+
+        :param relative: Path of the asset relative to the output directory.
+        :param digest: The hex content hash of the asset.
+        :return: The fingerprinted path, relative to the output directory.
+        """
+        relative = relative.replace(os.sep, "/")
+        fingerprinted = fingerprint_path(relative, digest)
+        self.urls[f"/{relative}"] = f"/{fingerprinted}"
+        self._version = None
+        return fingerprinted
+
+    def output(self, relative: str) -> str:
+        """
+        Get the path an asset is written to.
+
+        :param relative: Path of the asset relative to the output directory.
+        :return: The fingerprinted path if the asset is fingerprinted, the path itself otherwise.
+        """
+        url = self.urls.get("/" + relative.replace(os.sep, "/"))
+        return url[1:] if url is not None else relative
+
+    def stylesheet(self, relative: str) -> str:
+        """
+        Get the rewritten content of a stylesheet.
+
+        :param relative: Path of the stylesheet relative to the output directory.
+        :return: The content with url() targets fingerprinted, or None if the stylesheet is copied as it is.
+        """
+        return self.stylesheets.get(relative)
+
+    def target(self, url: str, base: str) -> str:
+        """
+        Find the asset a url() of a stylesheet points to.
+
+        :param url: The URL, relative to the stylesheet or root-relative.
+        :param base: The root-relative URL of the directory of the stylesheet.
+        :return: The root-relative URL of the asset, or None for external URLs, data URIs and fragments.
+        """
+        path = re.split(r"[?#]", url, maxsplit=1)[0]
+        if not path or path.startswith("//") or ":" in path:
+            return None
+        return posixpath.normpath(posixpath.join(base, path))
+
+    def rewrite_css(self, css: str, relative: str) -> str:
+        """
+        Point the url() targets of a stylesheet to fingerprinted names, keeping relative URLs relative.
+
+        :param css: The content of the stylesheet.
+        :param relative: Path of the stylesheet relative to the output directory.
+        :return: The rewritten content.
+        """
+        base = "/" + posixpath.dirname(relative.replace(os.sep, "/"))
+
+        def replace(match):
+            quote, url = match.groups()
+            target = self.target(url.strip(), base)
+            fingerprinted = self.urls.get(target)
+            if fingerprinted is None:
+                return match.group(0)
+            url = url.strip()
+            suffix = url[len(re.split(r"[?#]", url, maxsplit=1)[0]):]
+            if not url.startswith("/"):
+                fingerprinted = posixpath.relpath(fingerprinted, base)
+            return f"url({quote}{fingerprinted}{suffix}{quote})"
+
+        return CSS_URL.sub(replace, css)
+
+    @property
+    def version(self) -> str:
+        """
+        A hash of the whole map, which changes whenever any asset does.
+        """
+        if self._version is None:
+            self._version = sha256(json.dumps(self.urls, sort_keys=True).encode()).hexdigest()
+        return self._version
+
+    def write(self, path: str):
+        """
+        Write the asset manifest, mapping original paths to fingerprinted ones.
+
+        :param path: Path of the JSON file.
+        """
+        directory = dirname(path)
+        if directory:
+            makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({url[1:]: fingerprinted[1:] for url, fingerprinted in self.urls.items()}, f, indent=2, sort_keys=True)
+
+def fingerprint_files(index, manifest=None) -> AssetMap:
+    """
+    Hash the assets of a source tree.
+
+    Stylesheets are hashed last, after the url() targets in them are rewritten to the
+    fingerprinted names, so a stylesheet changes name whenever an asset it references does.
+    A stylesheet imported by another one is hashed first; imports in a cycle keep their URL.
+
+    :param index: The TreeIndex of the static directory.
+    :param manifest: Optional build manifest, whose recorded hashes are reused for unchanged files.
+    :return: The AssetMap of the tree.
+    """
+    assets = AssetMap()
+    stylesheets = {}
+    for file in index.files:
+        if not file.relative.lower().endswith(FINGERPRINT_SUFFIXES):
+            continue
+        if file.relative.lower().endswith(".css"):
+            stylesheets["/" + file.relative.replace(os.sep, "/")] = file
+            continue
+        digest = manifest.digest(file.path, file.info) if manifest is not None else hash_file(file.path)
+        assets.add(file.relative, digest)
+
+    pending = set(stylesheets)
+
+    def add_stylesheet(url: str):
+        pending.discard(url)
+        file = stylesheets[url]
+        with open(file.path, "r", encoding="utf-8") as f:
+            css = f.read()
+        base = posixpath.dirname(url)
+        for match in CSS_URL.finditer(css):
+            target = assets.target(match.group(2).strip(), base)
+            if target in pending:
+                add_stylesheet(target)
+        rewritten = assets.rewrite_css(css, file.relative)
+        if rewritten != css:
+            assets.stylesheets[file.relative] = rewritten
+            digest = sha256(rewritten.encode("utf-8")).hexdigest()
+        else:
+            digest = manifest.digest(file.path, file.info) if manifest is not None else hash_file(file.path)
+        assets.add(file.relative, digest)
+
+    for url in sorted(stylesheets):
+        if url in pending:
+            add_stylesheet(url)
+    return assets
+
+def use_asset_map(assets: AssetMap):
+    """
+    Set the asset map used while rendering pages in this process.
+
+    :param assets: The AssetMap, or None to keep URLs as they are.
+    """
+    global _assets
+    _assets = assets
+
+def get_asset_map() -> AssetMap:
+    """
+    Get the asset map used while rendering pages in this process.
+
+    :return: The AssetMap, or None.
+    """
+    return _assets
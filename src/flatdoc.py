@@ -0,0 +1,228 @@
+from array import array
+
+from htmlnode import VOID_TAGS
+
+PARENT = 0
+LEAF = 1
+EMPTY_LEAF = 2
+
+class FlatDocument:
+    """
+    An HTML tree stored as parallel arrays instead of one object per node.
+
+    Nodes are kept in document order. Node i has a tag id, a kind, a props id and,
+    for leaves, a [start, end) range into a single text buffer. The descendants of
+    node i are the nodes in the range [i + 1, ends[i]).
+    """
+
+    __slots__ = ("tags", "props", "text", "kinds", "tag_ids", "props_ids", "text_starts", "text_ends", "ends")
+
+    def __init__(self, tags, props, text, kinds, tag_ids, props_ids, text_starts, text_ends, ends):
+        self.tags = tags
+        self.props = props
+        self.text = text
+        self.kinds = kinds
+        self.tag_ids = tag_ids
+        self.props_ids = props_ids
+        self.text_starts = text_starts
+        self.text_ends = text_ends
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def iter_html(self):
+        """
+        Generate the HTML of the document as a sequence of string fragments, straight from the arrays.
+
+        :return: An iterator over the fragments of the HTML string.
+        """
+        tags, props, text = self.tags, self.props, self.text
+        kinds, tag_ids, props_ids = self.kinds, self.tag_ids, self.props_ids
+        text_starts, text_ends, ends = self.text_starts, self.text_ends, self.ends
+        open_tags = []
+
+        for i in range(len(kinds)):
+            while open_tags and open_tags[-1][0] <= i:
+                yield f"</{open_tags.pop()[1]}>"
+
+            kind = kinds[i]
+            tag = tags[tag_ids[i]]
+            if kind == EMPTY_LEAF:
+                if tag in VOID_TAGS:
+                    yield f"<{tag} {props[props_ids[i]]}>" if props_ids[i] else f"<{tag}>"
+                continue
+
+            props_str = props[props_ids[i]]
+
+            if kind == PARENT:
+                yield f"<{tag} {props_str}>" if props_str else f"<{tag}>"
+                open_tags.append((ends[i], tag))
+            elif tag is None:
+                yield text[text_starts[i]:text_ends[i]]
+            elif props_str:
+                yield f"<{tag} {props_str}>{text[text_starts[i]:text_ends[i]]}</{tag}>"
+            else:
+                yield f"<{tag}>{text[text_starts[i]:text_ends[i]]}</{tag}>"
+
+        while open_tags:
+            yield f"</{open_tags.pop()[1]}>"
+
+    def write_html(self, fp):
+        """
+        Write the HTML of the document to a file object, one fragment at a time.
+
+        :param fp: A text file object to write to.
+        """
+        fp.writelines(self.iter_html())
+
+    def to_html(self) -> str:
+        """
+        Convert the document to an HTML string.
+
+        :return: The HTML string representation of the document.
+        """
+        return "".join(self.iter_html())
+
+class FlatDocumentBuilder:
+    """
+    Builds a FlatDocument in document order, without creating node objects.
+    """
+
+    def __init__(self):
+        self.tags = [None]
+        self.tag_index = {None: 0}
+        self.props = [""]
+        self.props_index = {"": 0}
+        self.chunks = []
+        self.text_length = 0
+        self.kinds = array("B")
+        self.tag_ids = array("H")
+        self.props_ids = array("I")
+        self.text_starts = array("Q")
+        self.text_ends = array("Q")
+        self.ends = array("I")
+        self.open_nodes = []
+
+    def intern_tag(self, tag: str) -> int:
+        """
+        Get the id of a tag, adding it to the tag table if needed.
+
+        :param tag: The HTML tag.
+        :return: The index of the tag in the tag table.
+        """
+        index = self.tag_index.get(tag)
+        if index is None:
+            index = self.tag_index[tag] = len(self.tags)
+            self.tags.append(tag)
+        return index
+
+    def intern_props(self, props: dict) -> int:
+        """
+        Render the attributes of a node once and get their id in the props table.
+
+        :param props: The attributes of the node.
+        :return: The index of the rendered attributes in the props table, 0 for none.
+        """
+        if not props:
+            return 0
+        props_str = " ".join([f'{key}="{value}"' for key, value in props.items()])
+        index = self.props_index.get(props_str)
+        if index is None:
+            index = self.props_index[props_str] = len(self.props)
+            self.props.append(props_str)
+        return index
+
+    def add_node(self, kind: int, tag: str, props: dict, value: str = None) -> int:
+        """
+        Append a node to the arrays.
+
+        :param kind: PARENT, LEAF or EMPTY_LEAF.
+        :param tag: The HTML tag of the node.
+        :param props: The attributes of the node.
+        :param value: The text content of a leaf.
+        :return: The index of the node.
+        """
+        index = len(self.kinds)
+        self.kinds.append(kind)
+        self.tag_ids.append(self.intern_tag(tag))
+        self.props_ids.append(self.intern_props(props))
+        self.text_starts.append(self.text_length)
+        if value:
+            self.chunks.append(value)
+            self.text_length += len(value)
+        self.text_ends.append(self.text_length)
+        self.ends.append(index + 1)
+        return index
+
+    def open(self, tag: str, props: dict = None):
+        """
+        Start a parent node. Nodes added until the matching close become its descendants.
+
+        :param tag: The HTML tag of the node.
+        :param props: The attributes of the node.
+        """
+        if tag is None:
+            raise ValueError("ParentNode must have a tag")
+        self.open_nodes.append(self.add_node(PARENT, tag, props))
+
+    def close(self):
+        """
+        End the most recently opened parent node.
+        """
+        index = self.open_nodes.pop()
+        self.ends[index] = len(self.kinds)
+
+    def leaf(self, tag: str, value: str, props: dict = None):
+        """
+        Add a leaf node.
+
+        :param tag: The HTML tag of the node, or None for plain text.
+        :param value: The text content of the node. A leaf without a value renders nothing,
+            or only its tag for VOID_TAGS.
+        :param props: The attributes of the node.
+        """
+        self.add_node(LEAF if value is not None else EMPTY_LEAF, tag, props, value)
+
+    def finish(self) -> FlatDocument:
+        """
+        Complete the document.
+
+        :return: The built FlatDocument.
+        """
+        if self.open_nodes:
+            raise ValueError("FlatDocument has unclosed nodes")
+        return FlatDocument(
+            self.tags,
+            self.props,
+            "".join(self.chunks),
+            self.kinds,
+            self.tag_ids,
+            self.props_ids,
+            self.text_starts,
+            self.text_ends,
+            self.ends,
+        )
+
+def flatten(node) -> FlatDocument:
+    """
+    Convert an HTMLNode tree to a FlatDocument.
+
+    :param node: The root HTMLNode.
+    :return: The equivalent FlatDocument.
+    """
+    builder = FlatDocumentBuilder()
+    stack = [node]
+
+    while stack:
+        current = stack.pop()
+        if current is None:
+            builder.close()
+        elif current.children is not None:
+            builder.open(current.tag, current.props)
+            stack.append(None)
+            stack.extend(reversed(current.children))
+        else:
+            builder.leaf(current.tag, current.value, current.props)
+
+    return builder.finish()
@@ -0,0 +1,100 @@
+# Line opening and closing the front matter at the very start of a markdown file
+DELIMITER = "---"
+
+def parse_value(value: str):
+    """
+    Parse a front matter value.
+
+    :param value: The text after the colon.
+    :return: A list for values written as [a, b], the unquoted string otherwise.
+    """
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        return [parse_value(item) for item in value[1:-1].split(",") if item.strip()]
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+def parse_front_matter(lines) -> dict:
+    """
+    Parse front matter lines of the form key: value. Blank lines and comments starting with # are ignored.
+
+    :param lines: The lines between the delimiters.
+    :return: The values by key.
+    """
+    meta = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        key, separator, value = line.partition(":")
+        if not separator:
+            raise ValueError(f"Invalid front matter line {line!r}, expected key: value")
+        meta[key.strip()] = parse_value(value)
+    return meta
+
+def split_front_matter(markdown: str) -> tuple[dict, str]:
+    """
+    Separate the front matter of a markdown string from its body.
+
+    :param markdown: The markdown string.
+    :return: A (front matter, body) pair. Without front matter, the values are empty and the
+        body is the string itself.
+    """
+    if not markdown.startswith(DELIMITER):
+        return {}, markdown
+    lines = markdown.split("\n")
+    if lines[0].rstrip() != DELIMITER:
+        return {}, markdown
+    for i in range(1, len(lines)):
+        if lines[i].rstrip() == DELIMITER:
+            return parse_front_matter(lines[1:i]), "\n".join(lines[i + 1:])
+    return {}, markdown
+
+def read_front_matter(fp) -> dict:
+    """
+    Read the front matter of a markdown file object, leaving it positioned at the start of the body.
+
+    :param fp: A seekable text file object at the start of the file.
+    :return: The values by key, empty without front matter.
+    """
+    if fp.readline().rstrip() != DELIMITER:
+        fp.seek(0)
+        return {}
+    lines = []
+    for line in iter(fp.readline, ""):
+        if line.rstrip() == DELIMITER:
+            return parse_front_matter(lines)
+        lines.append(line)
+    fp.seek(0)
+    return {}
+
+def parse_bool(value) -> bool:
+    """
+    Parse a front matter flag, such as draft: true.
+
+    :param value: The parsed value.
+    :return: The flag.
+    """
+    if isinstance(value, str) and value.lower() in ("true", "yes", "1"):
+        return True
+    if isinstance(value, str) and value.lower() in ("false", "no", "0", ""):
+        return False
+    raise ValueError(f"Invalid flag {value!r}, expected true or false")
+
+def page_fields(meta: dict) -> dict:
+    """
+    Normalize the front matter fields the generator understands: date, tags, draft, template
+    and description. Other fields are kept as they are.
+
+    :param meta: The parsed front matter.
+    :return: The front matter, with tags as a list and draft as a bool.
+    """
+    fields = dict(meta)
+    tags = fields.get("tags", [])
+    fields["tags"] = tags if isinstance(tags, list) else [tag.strip() for tag in tags.split(",") if tag.strip()]
+    fields["draft"] = parse_bool(fields.get("draft", "false"))
+    for key in ("date", "template", "description"):
+        if key in fields and not isinstance(fields[key], str):
+            raise ValueError(f"Invalid {key} {fields[key]!r}, expected a single value")
+    return fields
@@ -1,12 +1,12 @@
+# Elements without content or closing tag, rendered from leaves without a value
+VOID_TAGS = {"img"}
+
 class HTMLNode:
     """
     A class representing a node in an HTML document.
     """
 
-    tag = None
-    value = None
-    children = None
-    props = None
+    __slots__ = ("tag", "value", "children", "props")
 
     def __init__(self, tag: str = None, value: str = None, children: list = None, props: dict = None):
         """
@@ -31,6 +31,22 @@ class HTMLNode:
         :return: The HTML string representation of the node.
         """
         raise NotImplementedError()
+
+    def iter_html(self):
+        """
+        Generate the HTML of the node as a sequence of string fragments.
+
+        :return: An iterator over the fragments of the HTML string.
+        """
+        yield self.to_html()
+
+    def write_html(self, fp):
+        """
+        Write the HTML of the node to a file object, one fragment at a time.
+
+        :param fp: A text file object to write to.
+        """
+        fp.writelines(self.iter_html())
     
     def props_to_html(self) -> str:
         """
@@ -47,6 +63,8 @@ class LeafNode(HTMLNode):
         A class representing a leaf node in an HTML document.
         """
 
+        __slots__ = ()
+
         def __init__(self, tag: str, value: str, props: dict = None):
             super().__init__(tag, value, None, props)
 
@@ -57,6 +75,9 @@ class LeafNode(HTMLNode):
             :return: The HTML string representation of the node.
             """
             if self.value is None:
+                if self.tag in VOID_TAGS:
+                    props_str = self.props_to_html()
+                    return f"<{self.tag} {props_str}>" if props_str else f"<{self.tag}>"
                 return ""
             elif self.tag is None:
                 return self.value
@@ -72,6 +93,8 @@ class ParentNode(HTMLNode):
     A class representing a parent node in an HTML document.
     """
 
+    __slots__ = ()
+
     def __init__(self, tag: str, children: list, props: dict = None):
         super().__init__(tag, None, children, props)
 
@@ -81,14 +104,34 @@ class ParentNode(HTMLNode):
 
         :return: The HTML string representation of the node.
         """
-        if self.tag is None:
-            raise ValueError("ParentNode must have a tag")
-        elif self.children is None:
-            raise ValueError("ParentNode must have children")
-        else:
-            props_str = self.props_to_html()
-            children_str = "".join([child.to_html() for child in self.children])
-            if props_str:
-                return f"<{self.tag} {props_str}>{children_str}</{self.tag}>"
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        """
+        Generate the HTML of the ParentNode as a sequence of string fragments.
+
+        The tree is walked with an explicit stack, so the fragments are never
+        concatenated per level and deep documents do not hit the recursion limit.
+
+        :return: An iterator over the fragments of the HTML string.
+        """
+        stack = [self]
+
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                yield node
+            elif isinstance(node, ParentNode):
+                if node.tag is None:
+                    raise ValueError("ParentNode must have a tag")
+                elif node.children is None:
+                    raise ValueError("ParentNode must have children")
+                props_str = node.props_to_html()
+                if props_str:
+                    yield f"<{node.tag} {props_str}>"
+                else:
+                    yield f"<{node.tag}>"
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
             else:
-                return f"<{self.tag}>{children_str}</{self.tag}>"
\ No newline at end of file
+                yield from node.iter_html()
\ No newline at end of file
@@ -0,0 +1,501 @@
+import json
+import os
+import re
+import struct
+import zlib
+
+from concurrent.futures import ProcessPoolExecutor
+from os import makedirs
+from hashlib import sha256
+from os.path import basename, dirname, exists, join, splitext
+
+from assets import sync_asset
+from manifest import hash_file
+
+IMAGE_CACHE_DIR = "./.build/images"
+
+# Widths of the generated variants, only the ones narrower than the original are made
+IMAGE_WIDTHS = (480, 960)
+
+# Part of the name of every cached variant, bump it when resizing or encoding changes
+CODEC_VERSION = "1"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Samples per pixel by PNG color type: gray, RGB, palette, gray and alpha, RGBA
+CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+# Image tags as rendered from IMAGE text nodes, whose src comes first
+IMG_PATTERN = re.compile(r'<img src="([^"]*)"')
+
+# Attributes of the images of the site by URL, used while rendering pages
+_attributes = {}
+
+class PngHeader:
+    """
+    The IHDR fields of a PNG file.
+    """
+
+    __slots__ = ("width", "height", "bit_depth", "color_type", "interlace")
+
+    def __init__(self, width: int, height: int, bit_depth: int, color_type: int, interlace: int):
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+        self.color_type = color_type
+        self.interlace = interlace
+
+    @property
+    def resizable(self) -> bool:
+        """
+        Whether decode_png supports the image: 8 bits per sample and no interlacing.
+        """
+        return self.bit_depth == 8 and self.color_type in CHANNELS and self.interlace == 0
+
+def parse_png_header(data: bytes) -> PngHeader:
+    """
+    Parse the signature and IHDR chunk at the start of a PNG file.
+
+    :param data: At least the first 33 bytes of the file.
+    :return: The header, or None if the data is not a PNG file.
+    """
+    if len(data) < 33 or data[:8] != PNG_SIGNATURE or data[12:16] != b"IHDR":
+        return None
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", data[16:29])
+    return PngHeader(width, height, bit_depth, color_type, interlace)
+
+def read_png_header(path: str) -> PngHeader:
+    """
+    Read the dimensions and format of a PNG file without reading its pixels.
+
+    :param path: Path to the file.
+    :return: The header, or None if the file is not a PNG file.
+    """
+    with open(path, "rb") as f:
+        return parse_png_header(f.read(33))
+
+def iter_chunks(data: bytes):
+    """
+    Split a PNG file into its chunks.
+
+    :param data: The content of the file.
+    :return: An iterator over (type, payload) pairs.
+    """
+    pos = 8
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        yield kind, data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+
+def unfilter_row(kind: int, row: bytearray, previous: bytes, bpp: int):
+    """
+    Undo the filter of a scanline in place.
+
+    :param kind: The filter type, from 0 to 4.
+    :param row: The filtered scanline, without its filter type byte.
+    :param previous: The unfiltered previous scanline, all zeros for the first one.
+    :param bpp: Bytes per pixel.
+    """
+    n = len(row)
+    if kind == 1:
+        for i in range(bpp, n):
+            row[i] = (row[i] + row[i - bpp]) & 0xFF
+    elif kind == 2:
+        row[:] = bytes((a + b) & 0xFF for a, b in zip(row, previous))
+    elif kind == 3:
+        for i in range(n):
+            left = row[i - bpp] if i >= bpp else 0
+            row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+    elif kind == 4:
+        for i in range(n):
+            a = row[i - bpp] if i >= bpp else 0
+            b = previous[i]
+            c = previous[i - bpp] if i >= bpp else 0
+            p = a + b - c
+            pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+            predictor = a if pa <= pb and pa <= pc else b if pb <= pc else c
+            row[i] = (row[i] + predictor) & 0xFF
+    elif kind != 0:
+        raise ValueError(f"Invalid PNG filter type {kind}")
+
+def decode_png(data: bytes) -> tuple[int, int, int, list[bytes]]:
+    """
+    Decode an 8 bit, non-interlaced PNG file. Palette images are expanded to RGB, or RGBA
+    when the palette has transparency.
+
+    :param data: The content of the file.
+    :return: A (width, height, channels, rows) tuple, each row holding width * channels samples.
+    """
+    header = parse_png_header(data)
+    if header is None or not header.resizable:
+        raise ValueError("Only 8 bit, non-interlaced PNG files can be decoded")
+
+    compressed = []
+    palette = transparency = None
+    for kind, payload in iter_chunks(data):
+        if kind == b"IDAT":
+            compressed.append(payload)
+        elif kind == b"PLTE":
+            palette = payload
+        elif kind == b"tRNS":
+            transparency = payload
+    raw = zlib.decompress(b"".join(compressed))
+
+    width, height = header.width, header.height
+    channels = CHANNELS[header.color_type]
+    stride = width * channels
+    rows = []
+    previous = bytes(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        row = bytearray(raw[start + 1:start + 1 + stride])
+        unfilter_row(raw[start], row, previous, channels)
+        rows.append(bytes(row))
+        previous = row
+
+    if header.color_type == 3:
+        if palette is None:
+            raise ValueError("PNG palette image without a PLTE chunk")
+        colors = [palette[i:i + 3] for i in range(0, len(palette), 3)]
+        if transparency is not None:
+            alphas = transparency + b"\xff" * (len(colors) - len(transparency))
+            colors = [color + alphas[i:i + 1] for i, color in enumerate(colors)]
+        channels = len(colors[0])
+        rows = [b"".join(colors[index] for index in row) for row in rows]
+
+    return width, height, channels, rows
+
+def spans(size: int, new_size: int) -> list[tuple[int, int]]:
+    """
+    Split a range of source pixels into the ranges covered by each resized pixel.
+
+    :param size: Number of source pixels.
+    :param new_size: Number of resized pixels, at most size.
+    :return: A [start, end) range per resized pixel.
+    """
+    return [(i * size // new_size, max((i + 1) * size // new_size, i * size // new_size + 1)) for i in range(new_size)]
+
+def resize_pixels(rows: list[bytes], width: int, channels: int, new_width: int, new_height: int) -> list[bytes]:
+    """
+    Downscale an image by averaging the source pixels covered by each resized pixel.
+
+    :param rows: The rows of the image, each holding width * channels samples.
+    :param width: The width of the image.
+    :param channels: Samples per pixel.
+    :param new_width: The width to resize to, at most width.
+    :param new_height: The height to resize to, at most the number of rows.
+    :return: The resized rows.
+    """
+    columns = spans(width, new_width)
+    resized = []
+    for top, bottom in spans(len(rows), new_height):
+        summed = [sum(samples) for samples in zip(*rows[top:bottom])]
+        count = bottom - top
+        row = bytearray(new_width * channels)
+        for x, (left, right) in enumerate(columns):
+            area = count * (right - left)
+            for c in range(channels):
+                row[x * channels + c] = (sum(summed[left * channels + c:right * channels:channels]) + area // 2) // area
+        resized.append(bytes(row))
+    return resized
+
+def encode_png(width: int, height: int, channels: int, rows: list[bytes], level: int = 9) -> bytes:
+    """
+    Encode an image as an 8 bit PNG file, with the Average filter on every row, which compresses
+    resized photos best of the filters that need no per-pixel branching.
+
+    :param width: The width of the image.
+    :param height: The height of the image.
+    :param channels: Samples per pixel, 1 to 4.
+    :param rows: The rows of the image, each holding width * channels samples.
+    :param level: The zlib compression level.
+    :return: The content of the file.
+    """
+    color_type = {1: 0, 2: 4, 3: 2, 4: 6}[channels]
+    filtered = bytearray()
+    previous = bytes(width * channels)
+    for row in rows:
+        left = bytes(channels) + row[:-channels]
+        filtered.append(3)
+        filtered += bytes((x - ((a + b) >> 1)) & 0xFF for x, a, b in zip(row, left, previous))
+        previous = row
+
+    def chunk(kind: bytes, payload: bytes) -> bytes:
+        return struct.pack(">I", len(payload)) + kind + payload + struct.pack(">I", zlib.crc32(kind + payload))
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return PNG_SIGNATURE + chunk(b"IHDR", ihdr) + chunk(b"IDAT", zlib.compress(bytes(filtered), level)) + chunk(b"IEND", b"")
+
+def variant_widths(header: PngHeader, widths=IMAGE_WIDTHS) -> list[int]:
+    """
+    Get the widths of the variants generated for an image.
+
+    :param header: The header of the image.
+    :param widths: The configured variant widths.
+    :return: The sorted widths narrower than the image, none if it cannot be decoded.
+    """
+    if not header.resizable:
+        return []
+    return sorted(width for width in set(widths) if width < header.width)
+
+def variant_height(header: PngHeader, width: int) -> int:
+    """
+    Get the height of a variant, keeping the aspect ratio of the image.
+
+    :param header: The header of the image.
+    :param width: The width of the variant.
+    :return: The height of the variant.
+    """
+    return max(1, round(header.height * width / header.width))
+
+def variant_path(path: str, width: int) -> str:
+    """
+    Get the path or URL of a variant next to its image, such as photo-480w.png for photo.png.
+
+    :param path: The path or URL of the image.
+    :param width: The width of the variant.
+    :return: The path or URL of the variant.
+    """
+    root, ext = splitext(path)
+    return f"{root}-{width}w{ext}"
+
+def image_attributes(url: str, header: PngHeader, widths=IMAGE_WIDTHS) -> dict:
+    """
+    Get the attributes added to the img tags showing an image.
+
+    :param url: The root-relative URL of the image.
+    :param header: The header of the image.
+    :param widths: The configured variant widths.
+    :return: The srcset, if there are variants, width and height attributes.
+    """
+    attributes = {}
+    variants = variant_widths(header, widths)
+    if variants:
+        candidates = [f"{variant_path(url, width)} {width}w" for width in variants]
+        attributes["srcset"] = ", ".join(candidates + [f"{url} {header.width}w"])
+    attributes["width"] = str(header.width)
+    attributes["height"] = str(header.height)
+    return attributes
+
+def make_variants(job: tuple) -> tuple[int, str]:
+    """
+    Generate the missing variants of an image into the derivative cache, in a worker process.
+
+    :param job: A (source path, {width: cached path}) tuple.
+    :return: A (number of variants written, error) pair, the error being None on success, or a
+        message when the image could not be decoded, so one corrupt image does not stop the build.
+    """
+    source, variants = job
+    try:
+        with open(source, "rb") as f:
+            width, height, channels, rows = decode_png(f.read())
+    except (OSError, ValueError, IndexError, struct.error, zlib.error) as e:
+        return 0, f"{type(e).__name__}: {e}"
+    header = PngHeader(width, height, 8, 0, 0)
+
+    written = 0
+    for new_width, cached in sorted(variants.items()):
+        if exists(cached):
+            continue
+        new_height = variant_height(header, new_width)
+        data = encode_png(new_width, new_height, channels, resize_pixels(rows, width, channels, new_width, new_height))
+        partial = f"{cached}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            f.write(data)
+        os.replace(partial, cached)
+        written += 1
+    return written, None
+
+def use_image_attributes(attributes: dict):
+    """
+    Set the attributes added to img tags while rendering pages in this process.
+
+    :param attributes: Attributes by image URL, as returned by ResponsiveImages.build.
+    """
+    global _attributes
+    _attributes = attributes
+
+def get_image_attributes() -> dict:
+    """
+    Get the attributes added to img tags in this process.
+
+    :return: Attributes by image URL.
+    """
+    return _attributes
+
+def add_image_attributes(html: str) -> str:
+    """
+    Add srcset, width and height to the img tags of known images.
+
+    :param html: An HTML fragment, before its links are rewritten to the basepath.
+    :return: The fragment with the attributes added.
+    """
+    if not _attributes or "<img " not in html:
+        return html
+
+    def add(match):
+        attributes = _attributes.get(match.group(1))
+        if attributes is None:
+            return match.group(0)
+        return match.group(0) + "".join(f' {key}="{value}"' for key, value in attributes.items())
+
+    return IMG_PATTERN.sub(add, html)
+
+class ResponsiveImages:
+    """
+    Generates narrower variants of the PNG images of the site.
+
+    Variants are kept in a derivative cache named after the content hash of their image, so an
+    image is decoded and resized once, however often the site is rebuilt or the image renamed.
+    Hashes are remembered by path, size and modification time, so unchanged images are not read.
+    """
+
+    def __init__(self, cache_dir: str = IMAGE_CACHE_DIR, widths=IMAGE_WIDTHS, jobs: int = None):
+        """
+        Initialize the ResponsiveImages.
+
+        :param cache_dir: The directory of the derivative cache.
+        :param widths: Widths of the variants.
+        :param jobs: Number of worker processes resizing images, the number of CPUs when not given.
+        """
+        self.cache_dir = cache_dir
+        self.widths = tuple(widths)
+        self.jobs = jobs
+        self.hashes = {}
+        self.index_path = join(cache_dir, "index.json")
+        self.generated = 0
+        try:
+            with open(self.index_path, "r") as f:
+                self.hashes = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def digest(self, file) -> str:
+        """
+        Get the content hash of an image, reusing the remembered one if the file was not touched.
+
+        :param file: An IndexedFile.
+        :return: The hex digest of the image.
+        """
+        entry = self.hashes.get(file.path)
+        if entry is not None and entry["size"] == file.size and entry["mtime"] == file.mtime_ns:
+            return entry["hash"]
+        digest = hash_file(file.path)
+        self.hashes[file.path] = {"hash": digest, "size": file.size, "mtime": file.mtime_ns}
+        return digest
+
+    def cached_path(self, digest: str, width: int) -> str:
+        """
+        Get the path of a variant in the derivative cache.
+
+        :param digest: The content hash of the image.
+        :param width: The width of the variant.
+        :return: The path of the cached variant.
+        """
+        return join(self.cache_dir, f"{digest}-{width}w-v{CODEC_VERSION}.png")
+
+    def generate(self, pending: list) -> set:
+        """
+        Generate the missing variants of images, across worker processes when there are several.
+
+        :param pending: List of (source path, {width: cached path}) jobs.
+        :return: Paths of the images that could not be decoded, which are logged and skipped.
+        """
+        if not pending:
+            return set()
+        makedirs(self.cache_dir, exist_ok=True)
+        failed = set()
+        if len(pending) == 1 or self.jobs == 1:
+            results = list(map(make_variants, pending))
+        else:
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                results = list(executor.map(make_variants, pending))
+        for (source, _), (written, error) in zip(pending, results):
+            self.generated += written
+            if error is not None:
+                print(f"Skipping variants of {source}: {error}")
+                failed.add(source)
+        return failed
+
+    def prune(self, expected: set) -> list[str]:
+        """
+        Evict cached variants no image needs anymore, such as the ones of deleted or changed images.
+
+        Files being written by a worker end with .tmp and are left alone.
+
+        :param expected: Paths of the cached variants of the current images.
+        :return: Paths of the evicted variants.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        evicted = []
+        for name in os.listdir(self.cache_dir):
+            path = join(self.cache_dir, name)
+            if name.endswith(".png") and path not in expected:
+                os.remove(path)
+                evicted.append(path)
+        return evicted
+
+    def build(self, index, output: str, manifest=None, strategy: str = "copy", shard=None, assets=None) -> dict:
+        """
+        Generate the variants of every PNG image of a source tree and write them next to the copied images.
+
+        :param index: The TreeIndex of the static directory.
+        :param output: The output directory.
+        :param manifest: Optional build manifest, used to skip variants that are already written.
+        :param strategy: How variants are written from the cache, one of copy, hardlink, reflink or sendfile.
+        :param shard: Optional shard, only the variants of the images assigned to it are written.
+            Attributes are still returned for every image, since any page may show any image.
+        :param assets: Optional AssetMap the variants of every image are fingerprinted in. The name
+            of a cached variant identifies its content, so it is hashed instead of the variant.
+        :return: The img attributes of every image by root-relative URL.
+        """
+        attributes = {}
+        images = []
+        pending = []
+        seen = set()
+        for file in index.files:
+            if not file.relative.lower().endswith(".png"):
+                continue
+            seen.add(file.path)
+            header = read_png_header(file.path)
+            if header is None:
+                continue
+            relative = file.relative.replace(os.sep, "/")
+            attributes[f"/{relative}"] = image_attributes(f"/{relative}", header, self.widths)
+            widths = variant_widths(header, self.widths)
+            if not widths:
+                continue
+
+            digest = self.digest(file)
+            variants = {width: self.cached_path(digest, width) for width in widths}
+            included = shard is None or shard.includes(file.path, index.root)
+            if included and not all(exists(cached) for cached in variants.values()):
+                pending.append((file.path, variants))
+            images.append((file.path, relative, variants, included))
+
+        failed = self.generate(pending)
+
+        outputs = []
+        for path, relative, variants, included in images:
+            if path in failed:
+                # Pages keep the plain img tag of an image without variants
+                del attributes[f"/{relative}"]
+                continue
+            names = {width: variant_path(relative, width) for width in variants}
+            if assets is not None:
+                names = {width: assets.add(name, sha256(basename(variants[width]).encode()).hexdigest()) for width, name in names.items()}
+            if included:
+                outputs += [(cached, join(output, names[width])) for width, cached in variants.items()]
+
+        for cached, dest in outputs:
+            if manifest is None or manifest.needs_build(cached, dest, uses_template=False):
+                makedirs(dirname(dest), exist_ok=True)
+                sync_asset(cached, dest, strategy)
+
+        self.prune({cached for _, _, variants, _ in images for cached in variants.values()})
+        self.hashes = {path: entry for path, entry in self.hashes.items() if path in seen}
+        makedirs(self.cache_dir, exist_ok=True)
+        with open(self.index_path, "w") as f:
+            json.dump(self.hashes, f, indent=2, sort_keys=True)
+        return attributes
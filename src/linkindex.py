@@ -0,0 +1,198 @@
+import json
+import re
+
+from os import makedirs
+from os.path import dirname, relpath
+from posixpath import join as url_join, normpath, splitext
+from urllib.parse import unquote, urlsplit
+
+from flatdoc import EMPTY_LEAF, LEAF, FlatDocument
+
+LINKS_PATH = "./.build/links.json"
+
+# Attributes of rendered props, as written by FlatDocumentBuilder.intern_props
+PROP_PATTERN = re.compile(r'(\w+)="([^"]*)"')
+
+def collect_references(node, links: list, images: list):
+    """
+    Collect the link and image URLs of a parsed page.
+
+    :param node: An HTMLNode tree, a FlatDocument, or a node carrying the references of a cached
+        page in a references attribute.
+    :param links: List the href of every link is appended to.
+    :param images: List the src of every image is appended to.
+    """
+    cached = getattr(node, "references", None)
+    if cached is not None:
+        links.extend(cached[0])
+        images.extend(cached[1])
+        return
+
+    if isinstance(node, FlatDocument):
+        for i, kind in enumerate(node.kinds):
+            if (kind == LEAF or kind == EMPTY_LEAF) and node.props_ids[i]:
+                add_reference(node.tags[node.tag_ids[i]], dict(PROP_PATTERN.findall(node.props[node.props_ids[i]])), links, images)
+        return
+
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.children is not None:
+            stack.extend(reversed(current.children))
+        elif current.props:
+            add_reference(current.tag, current.props, links, images)
+
+def add_reference(tag: str, props: dict, links: list, images: list):
+    """
+    Record the URL of a leaf if it is a link or an image.
+
+    :param tag: The HTML tag of the leaf.
+    :param props: The attributes of the leaf.
+    :param links: List of link URLs.
+    :param images: List of image URLs.
+    """
+    if tag == "a" and "href" in props:
+        links.append(props["href"])
+    elif tag == "img" and "src" in props:
+        images.append(props["src"])
+
+def resolve(url: str, page: str) -> str:
+    """
+    Resolve a URL found in a page to a path in the output directory.
+
+    :param url: The URL as written in the markdown.
+    :param page: Path of the page relative to the output directory.
+    :return: The target path relative to the output directory, or None for external URLs
+        and links within the page.
+    """
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+
+    path = unquote(parts.path)
+    if path.startswith("/"):
+        target = normpath(path.lstrip("/") or ".")
+    else:
+        target = normpath(url_join(dirname(page), path))
+    if path.endswith("/"):
+        target = url_join(target, "index.html") if target != "." else "index.html"
+    return target
+
+def find_target(target: str, targets: set) -> str:
+    """
+    Find the output a resolved target is served from.
+
+    :param target: A path returned by resolve.
+    :param targets: Paths of every generated page and static file, relative to the output directory.
+    :return: The target itself, the index page of the directory it names, or None if neither exists.
+    """
+    if target in targets:
+        return target
+    index = url_join(target, "index.html")
+    if not splitext(target)[1] and index in targets:
+        return index
+    return None
+
+class LinkIndex:
+    """
+    A site-wide index of the links and images of every page, and of the pages referencing each target.
+    """
+
+    def __init__(self, output: str):
+        """
+        Initialize the LinkIndex.
+
+        :param output: The output directory the page paths are relative to.
+        """
+        self.output = output
+        self.pages = {}
+
+    def load(self, path: str):
+        """
+        Load the pages of a previous build, so pages skipped by an incremental build keep their references.
+
+        :param path: Path of a JSON index written by write_json.
+        """
+        try:
+            with open(path, "r") as f:
+                self.pages.update(json.load(f)["pages"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def add_page(self, dest_path: str, links: list[str], images: list[str]):
+        """
+        Record the references of a generated page, replacing any previous record.
+
+        :param dest_path: Path of the generated HTML file.
+        :param links: The link URLs of the page.
+        :param images: The image URLs of the page.
+        """
+        page = relpath(dest_path, self.output).replace("\\", "/")
+        self.pages[page] = {"links": links, "images": images}
+
+    def retain(self, pages: set[str]):
+        """
+        Forget pages that are no longer part of the site.
+
+        :param pages: Paths of every page of the site, relative to the output directory.
+        """
+        self.pages = {page: entry for page, entry in self.pages.items() if page in pages}
+
+    def inbound(self, targets: set[str]) -> dict[str, list[str]]:
+        """
+        Map each target to the pages referencing it.
+
+        :param targets: Paths of every generated page and static file, relative to the output directory.
+        :return: Sorted pages by target. Internal targets are keyed by the output they are served
+            from, or by their resolved path when broken, and external ones by their URL.
+        """
+        references = {}
+        for page, entry in self.pages.items():
+            for url in entry["links"] + entry["images"]:
+                target = resolve(url, page)
+                if target is None:
+                    target = url
+                else:
+                    target = find_target(target, targets) or target
+                references.setdefault(target, set()).add(page)
+        return {target: sorted(pages) for target, pages in sorted(references.items())}
+
+    def broken(self, targets: set[str]) -> list[dict]:
+        """
+        Find internal links and images whose target is not an output of the site.
+
+        Each check is a set lookup, so no output is read or crawled.
+
+        :param targets: Paths of every generated page and static file, relative to the output directory.
+        :return: List of {"page", "kind", "url"} records, sorted by page.
+        """
+        found = []
+        for page, entry in sorted(self.pages.items()):
+            for kind in ("links", "images"):
+                for url in entry[kind]:
+                    target = resolve(url, page)
+                    if target is not None and find_target(target, targets) is None:
+                        found.append({"page": page, "kind": kind[:-1], "url": url})
+        return found
+
+    def report(self, targets: set[str]) -> dict:
+        """
+        Check every reference against the outputs of the site.
+
+        :param targets: Paths of every generated page and static file, relative to the output directory.
+        :return: A dictionary of the references by page, the pages by target and the broken references.
+        """
+        return {"pages": self.pages, "inbound": self.inbound(targets), "broken": self.broken(targets)}
+
+def write_json(path: str, report: dict):
+    """
+    Write a link report to a JSON file.
+
+    :param path: Path of the JSON file.
+    :param report: The report returned by LinkIndex.report.
+    """
+    directory = dirname(path)
+    if directory:
+        makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
@@ -1,44 +1,87 @@
 from textnode import TextNode, TextType
 from htmlnode import HTMLNode, LeafNode, ParentNode
-from blocknode import BlockType, block_to_block_type, markdown_to_blocks, remove_block_markers
+from blocknode import BlockReader, BlockType, classify_block, markdown_to_blocks
 from splitnodes import text_to_textnodes
-from shutil import rmtree, copy
-from os.path import exists, join, isfile, basename
-from os import makedirs, listdir
-from sys import argv
+from manifest import BuildManifest, MANIFEST_PATH
+from template import Template, load_template, rewrite_basepath
+from assets import STRATEGIES, remove_existing, sync_asset
+from pagecache import CACHE_PATH, PageCache
+from flatdoc import FlatDocument, FlatDocumentBuilder
+from shard import SHARD_MANIFEST, Shard, merge_shards, parse_shard
+from pipeline import Pipeline
+from treeindex import TreeIndex, make_directories
+from linkindex import LINKS_PATH, LinkIndex, collect_references, write_json as write_links
+from compress import COMPRESS_STORE_PATH, Compressor
+from fingerprint import ASSET_MANIFEST, AssetMap, fingerprint_files, get_asset_map, use_asset_map
+from frontmatter import read_front_matter, split_front_matter
+from source import SourceFile
+from metadataindex import METADATA_PATH, MetadataIndex, template_variables
+from collection import FEED_NAME, PAGE_SIZE, base_url, build_collections, page_url, stale_listings
+from images import IMAGE_CACHE_DIR, IMAGE_WIDTHS, ResponsiveImages, add_image_attributes, get_image_attributes, use_image_attributes
+from searchindex import SEARCH_DIR, SEARCH_STORE_PATH, TERMS_VERSION, SearchIndex, collect_terms
+from memo import DEFAULT_MAXSIZE, memo_counts, memoize, resize_memos
+from profiler import Profiler, count_file_bytes, disable as disable_profiler, enable as enable_profiler, get_profiler, stage, time_page
+import json
+import sys
 
-def text_node_to_html_node(text_node: TextNode) -> HTMLNode: 
+from shutil import rmtree
+from os.path import exists, join, basename, dirname, getsize, split
+from os import makedirs
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+from traceback import format_exc
+from functools import partial
+from itertools import chain
+
+# Markdown files larger than this are rendered block by block instead of being read whole
+STREAM_THRESHOLD = 8 * 1024 * 1024
+
+# Number of blocks held back while looking for the title of a streamed page
+STREAM_TITLE_BLOCKS = 64
+
+def text_node_parts(text_node: TextNode) -> tuple[str, str, dict]:
     """
-    Convert a TextNode to an HTMLNode.
+    Get the tag, value and props of the HTML leaf a TextNode renders to.
 
     :param text_node: The TextNode to convert.
-    :return: An HTMLNode representing the TextNode.
+    :return: A (tag, value, props) tuple.
     """
     if text_node.type == TextType.TEXT:
-        return LeafNode(None, text_node.text)
+        return None, text_node.text, None
     elif text_node.type == TextType.BOLD:
-        return LeafNode("b", text_node.text)
+        return "b", text_node.text, None
     elif text_node.type == TextType.ITALIC:
-        return LeafNode("i", text_node.text)
+        return "i", text_node.text, None
     elif text_node.type == TextType.CODE:
-        return LeafNode("code", text_node.text)
+        return "code", text_node.text, None
     elif text_node.type == TextType.LINK:
-        return LeafNode("a", text_node.text, {"href": text_node.url})
+        return "a", text_node.text, {"href": text_node.url}
     elif text_node.type == TextType.IMAGE:
-        return LeafNode("img", None, {"src": text_node.url, "alt": text_node.text})
+        return "img", None, {"src": text_node.url, "alt": text_node.text}
     else:
         raise ValueError(f"Unknown text type: {text_node.type}")
+
+def text_node_to_html_node(text_node: TextNode) -> HTMLNode: 
+    """
+    Convert a TextNode to an HTMLNode.
+
+    :param text_node: The TextNode to convert.
+    :return: An HTMLNode representing the TextNode.
+    """
+    return LeafNode(*text_node_parts(text_node))
     
-def text_to_children(text: str) -> list[HTMLNode]:
+def text_to_children(text: str) -> tuple[HTMLNode, ...]:
     """
-    Convert a plain text string to a list of HTMLNode objects.
+    Convert a plain text string to a tuple of HTMLNode objects.
+
+    The nodes are built fresh from the memoized parts of the text, so callers own them.
 
     :param text: The plain text string to convert.
-    :return: List of HTMLNode objects.
+    :return: Tuple of HTMLNode objects.
     """
-    
-    nodes = text_to_textnodes(text)
-    return [text_node_to_html_node(node) for node in nodes]
+    return tuple(LeafNode(tag, value, dict(props) if props is not None else None) for tag, value, props in text_to_parts(text))
 
 def list_item_wrapper(node: HTMLNode) -> HTMLNode:
     """
@@ -50,6 +93,53 @@ def list_item_wrapper(node: HTMLNode) -> HTMLNode:
     
     return ParentNode("li", [node]) if isinstance(node, LeafNode) else ParentNode("li", node.children)
     
+def classify_blocks(blocks):
+    """
+    Classify markdown blocks and remove their markers.
+
+    :param blocks: An iterable of markdown blocks.
+    :return: An iterator over (BlockType, block content without markers) pairs.
+    """
+    for block in blocks:
+        with stage("block_to_block_type"):
+            block_type, format_block = classify_block(block)
+        yield block_type, format_block
+
+def iter_blocks(markdown: str):
+    """
+    Split a markdown string into blocks and classify them.
+
+    :param markdown: The markdown string to split.
+    :return: An iterator over (BlockType, block content without markers) pairs.
+    """
+    with stage("markdown_to_blocks"):
+        blocks = markdown_to_blocks(markdown)
+
+    return classify_blocks(blocks)
+
+def block_to_html_node(block_type: BlockType, format_block: str) -> HTMLNode:
+    """
+    Convert a classified markdown block to an HTMLNode.
+
+    :param block_type: The type of the block.
+    :param format_block: The block content without block markers.
+    :return: An HTMLNode representing the block.
+    """
+    if block_type == BlockType.PARAGRAPH:
+        return ParentNode("p", text_to_children(format_block.replace("\n", " ").strip()))
+    elif block_type == BlockType.HEADING:
+        return ParentNode("h1", text_to_children(format_block))
+    elif block_type == BlockType.CODE:
+        return LeafNode("pre", text_node_to_html_node(TextNode(format_block, TextType.CODE)).to_html())
+    elif block_type == BlockType.QUOTE:
+        return ParentNode("blockquote", text_to_children(format_block))
+    elif block_type == BlockType.UNORDERED_LIST:
+        return ParentNode("ul", [ParentNode('li', text_to_children(item)) for item in format_block.split("\n")])
+    elif block_type == BlockType.ORDERED_LIST:
+        return ParentNode("ol", [ParentNode('li', text_to_children(item)) for item in format_block.split("\n")])
+    else:
+        raise ValueError(f"Unknown block type: {block_type}")
+
 def markdown_to_html_node(markdown: str) -> HTMLNode:
     """
     Convert a markdown string to an HTMLNode.
@@ -58,46 +148,146 @@ def markdown_to_html_node(markdown: str) -> HTMLNode:
     :return: An HTMLNode representing the markdown.
     """
     
-    nodes = []
+    return ParentNode("div", [block_to_html_node(block_type, format_block) for block_type, format_block in iter_blocks(markdown)])
 
-    for block in markdown_to_blocks(markdown):
-        block_type = block_to_block_type(block)
-        format_block = remove_block_markers(block, block_type)
+def blocks_to_html_node(blocks) -> HTMLNode:
+    """
+    Convert markdown blocks to an HTMLNode, such as the blocks scanned from a SourceFile.
+
+    :param blocks: An iterable of markdown blocks.
+    :return: The same HTMLNode as markdown_to_html_node on the text of the blocks.
+    """
+    return ParentNode("div", [block_to_html_node(block_type, format_block) for block_type, format_block in classify_blocks(blocks)])
+
+def iter_blocks_html(blocks, summary: "PageSummary" = None):
+    """
+    Render markdown blocks one at a time, so only the current block is held in memory.
+
+    :param blocks: An iterable of markdown blocks.
+    :param summary: Optional summary the links, images and terms of each block are added to.
+    :return: An iterator over fragments of the same HTML as markdown_to_html_node.
+    """
+    yield "<div>"
+    for block_type, format_block in classify_blocks(blocks):
+        node = block_to_html_node(block_type, format_block)
+        if summary is not None:
+            summary.collect(node)
+        yield from node.iter_html()
+    yield "</div>"
+
+@memoize()
+def text_to_parts(text: str) -> tuple[tuple[str, str, tuple], ...]:
+    """
+    Convert a plain text string to the (tag, value, props) parts of its inline nodes.
+
+    Results are memoized by text and shared, so they are made of tuples only: the props
+    of each part are a tuple of (name, value) pairs, or None.
+
+    :param text: The plain text string to convert.
+    :return: Tuple of (tag, value, props) tuples.
+    """
+    with stage("text_to_textnodes"):
+        nodes = text_to_textnodes(text)
+    parts = []
+    for node in nodes:
+        tag, value, props = text_node_parts(node)
+        parts.append((tag, value, tuple(props.items()) if props is not None else None))
+    return tuple(parts)
+
+def add_text_leaves(builder: FlatDocumentBuilder, text: str):
+    """
+    Add the inline nodes of a text to a FlatDocumentBuilder.
 
+    :param builder: The builder to add to.
+    :param text: The plain text string to convert.
+    """
+    for tag, value, props in text_to_parts(text):
+        builder.leaf(tag, value, dict(props) if props is not None else None)
+
+def markdown_to_flat_document(markdown: str) -> FlatDocument:
+    """
+    Convert a markdown string to a FlatDocument, without creating an HTMLNode per element.
+
+    The document renders to the same HTML as markdown_to_html_node.
+
+    :param markdown: The markdown string to convert.
+    :return: A FlatDocument representing the markdown.
+    """
+    with stage("markdown_to_blocks"):
+        blocks = markdown_to_blocks(markdown)
+    return blocks_to_flat_document(blocks)
+
+def blocks_to_flat_document(blocks) -> FlatDocument:
+    """
+    Convert markdown blocks to a FlatDocument, such as the blocks scanned from a SourceFile.
+
+    :param blocks: An iterable of markdown blocks.
+    :return: The same FlatDocument as markdown_to_flat_document on the text of the blocks.
+    """
+    builder = FlatDocumentBuilder()
+    builder.open("div")
+
+    for block_type, format_block in classify_blocks(blocks):
         if block_type == BlockType.PARAGRAPH:
-            nodes.append(ParentNode("p", text_to_children(format_block.replace("\n", " ").strip())))
+            builder.open("p")
+            add_text_leaves(builder, format_block.replace("\n", " ").strip())
+            builder.close()
         elif block_type == BlockType.HEADING:
-            nodes.append(ParentNode("h1", text_to_children(format_block)))
+            builder.open("h1")
+            add_text_leaves(builder, format_block)
+            builder.close()
         elif block_type == BlockType.CODE:
-            nodes.append(LeafNode("pre", text_node_to_html_node(TextNode(format_block, TextType.CODE)).to_html()))
+            builder.leaf("pre", f"<code>{format_block}</code>")
         elif block_type == BlockType.QUOTE:
-            nodes.append(ParentNode("blockquote", text_to_children(format_block)))
-        elif block_type == BlockType.UNORDERED_LIST:
-            nodes.append(ParentNode("ul", [ParentNode('li', text_to_children(item)) for item in format_block.split("\n")]))
-        elif block_type == BlockType.ORDERED_LIST:
-            nodes.append(ParentNode("ol", [ParentNode('li', text_to_children(item)) for item in format_block.split("\n")]))
+            builder.open("blockquote")
+            add_text_leaves(builder, format_block)
+            builder.close()
+        elif block_type in (BlockType.UNORDERED_LIST, BlockType.ORDERED_LIST):
+            builder.open("ul" if block_type == BlockType.UNORDERED_LIST else "ol")
+            for item in format_block.split("\n"):
+                builder.open("li")
+                add_text_leaves(builder, item)
+                builder.close()
+            builder.close()
         else:
             raise ValueError(f"Unknown block type: {block_type}")
 
-    return ParentNode("div", nodes)
+    builder.close()
+    return builder.finish()
 
-def copy_files(src: str, dest: str):
+def copy_files(src: str, dest: str, manifest: BuildManifest = None, strategy: str = "copy", shard: Shard = None, index: TreeIndex = None, compressor: Compressor = None, assets: AssetMap = None):
     """
     Copy files from source to destination directory.
 
     :param src: Source directory.
     :param dest: Destination directory.
+    :param manifest: Optional build manifest, used to skip files that did not change.
+    :param strategy: How files are written, one of copy, hardlink, reflink or sendfile.
+    :param shard: Optional shard, only the files assigned to it are copied.
+    :param index: Index of the source directory, scanned when not given.
+    :param compressor: Optional compressor every copied file is queued on.
+    :param assets: Optional asset map, fingerprinted files are written under their fingerprinted name, stylesheets with their url() targets rewritten.
     """
-    if not exists(dest):
-        makedirs(dest)
+    index = index or TreeIndex(src)
+    make_directories(dest, index.directories)
     
-    for item in listdir(src):
-        s = join(src, item)
-        d = join(dest, item)
-        if isfile(s):
-            copy(s, d)
-        else:
-            copy_files(s, d)
+    for file in index.files:
+        if shard is not None and not shard.includes(file.path, src):
+            continue
+        d = join(dest, assets.output(file.relative) if assets is not None else file.relative)
+        if manifest is None or manifest.needs_build(file.path, d, uses_template=False, info=file.info):
+            with stage("copy_files"):
+                stylesheet = assets.stylesheet(file.relative) if assets is not None else None
+                if stylesheet is None:
+                    sync_asset(file.path, d, strategy)
+                else:
+                    # Never write through a link to the source
+                    remove_existing(d)
+                    with open(d, "w", encoding="utf-8") as f:
+                        f.write(stylesheet)
+            count_file_bytes(file.path, d)
+            if compressor is not None:
+                compressor.submit(d)
             
 def extract_title(markdown: str) -> str:
     """
@@ -112,68 +302,867 @@ def extract_title(markdown: str) -> str:
             return line[2:].strip()
     return "Untitled Document"
 
-def generate_page(from_path, template_path, dest_path, basepath="/"):
+class CachedBody(LeafNode):
+    """
+    The body HTML of a page read from the page cache, with the references and terms recorded when it was parsed.
+    """
+
+    __slots__ = ("references", "terms")
+
+    def __init__(self, html: str, references: tuple[list, list], terms: dict):
+        super().__init__(None, html)
+        self.references = references
+        self.terms = terms
+
+class PageSummary:
+    """
+    What the site-wide stages need to know about a generated page, sent back from workers.
+    """
+
+    __slots__ = ("title", "links", "images", "terms")
+
+    def __init__(self, title: str = None, terms: bool = False):
+        """
+        Initialize the PageSummary.
+
+        :param title: The title of the page.
+        :param terms: Whether to collect search terms, which costs tokenizing every text node.
+        """
+        self.title = title
+        self.links = []
+        self.images = []
+        self.terms = {} if terms else None
+
+    def collect(self, node):
+        """
+        Add the links, images and, if enabled, the search terms of a parsed page or block.
+
+        :param node: An HTMLNode tree, a FlatDocument or a CachedBody.
+        """
+        collect_references(node, self.links, self.images)
+        if self.terms is not None:
+            collect_terms(node, self.terms)
+
+    def record(self, dest_path: str, links: LinkIndex = None, search: SearchIndex = None):
+        """
+        Add the page to the site-wide indexes.
+
+        :param dest_path: Path of the generated HTML file.
+        :param links: Optional link index.
+        :param search: Optional search index.
+        """
+        if links is not None:
+            links.add_page(dest_path, self.links, self.images)
+        if search is not None and self.terms is not None:
+            search.add_page(dest_path, self.title, self.terms)
+
+def read_page(from_path: str, cache: PageCache = None, flat: bool = False) -> tuple[str, HTMLNode]:
+    """
+    Read a markdown file and parse it into its title and HTML tree.
+
+    The file is mapped and scanned as bytes: only the title line and the blocks are decoded,
+    each from its own slice, and a cache hit decodes nothing. Files with \r line endings are
+    read as text instead, so they keep the newline translation of text mode.
+
+    :param from_path: Path to the markdown file.
+    :param cache: Optional page cache. On a hit the markdown is not parsed, and the
+        tree is a single node holding the cached body HTML.
+    :param flat: Whether to parse into a FlatDocument instead of an HTMLNode tree.
+    :return: A (title, HTMLNode or FlatDocument) pair.
+    """
+    with SourceFile(from_path) as source:
+        with stage("read"):
+            scannable = source.scannable
+            if scannable:
+                _, start = source.read_front_matter()
+        if scannable:
+            parse = blocks_to_flat_document if flat else blocks_to_html_node
+            return parse_cached(source.view[start:], lambda: source.title(start), lambda: parse(source.blocks(start)), cache)
+
+    with stage("read"):
+        with open(from_path, "r") as f:
+            md_content = f.read()
+    return parse_page(md_content, cache, flat)
+
+def parse_page(md_content: str, cache: PageCache = None, flat: bool = False) -> tuple[str, HTMLNode]:
+    """
+    Parse markdown into its title and HTML tree.
+
+    :param md_content: The markdown text of the page.
+    :param cache: Optional page cache. On a hit the markdown is not parsed, and the
+        tree is a single node holding the cached body HTML.
+    :param flat: Whether to parse into a FlatDocument instead of an HTMLNode tree.
+    :return: A (title, HTMLNode or FlatDocument) pair.
+    """
+    parse = markdown_to_flat_document if flat else markdown_to_html_node
+    _, md_content = split_front_matter(md_content)
+    return parse_cached(md_content, lambda: extract_title(md_content), lambda: parse(md_content), cache)
+
+def parse_cached(body, get_title, parse, cache: PageCache = None) -> tuple[str, HTMLNode]:
+    """
+    Parse the body of a page, unless the page cache has it.
+
+    :param body: The markdown text of the body, or its UTF-8 bytes, which the cache key is computed from.
+    :param get_title: Function returning the title of the page.
+    :param parse: Function returning the HTMLNode or FlatDocument of the page.
+    :param cache: Optional page cache.
+    :return: A (title, HTMLNode or FlatDocument) pair.
+    """
+    if cache is None:
+        return get_title(), parse()
+
+    with stage("cache"):
+        key = cache.key(body)
+        cached = cache.get(key)
+    if cached is not None:
+        title, html, references, terms = cached
+        return title, CachedBody(html, references, terms)
+
+    title, html_node = get_title(), parse()
+    summary = PageSummary(title, terms=True)
+    summary.collect(html_node)
+    with stage("cache"):
+        cache.put(key, title, html_node.to_html(), (summary.links, summary.images), summary.terms)
+    return title, html_node
+
+def write_fragments(dest_path: str, template: Template, title: str, fragments, basepath="/", variables: dict = None):
+    """
+    Render page content given as HTML fragments with a template and write it to a file.
+
+    :param dest_path: Destination path for the generated HTML file.
+    :param template: The compiled template.
+    :param title: The title of the page.
+    :param fragments: An iterable of HTML fragments of the page content.
+    :param basepath: The basepath used to rewrite links.
+    :param variables: Optional other variables of the page, such as its Path.
+    """
+    with stage("render"), open_output(dest_path) as f:
+        template.render(f, page_variables(title, fragments, basepath, variables))
+
+def open_output(dest_path: str):
+    """
+    Open an output file for writing, creating its directory only when it is missing.
+
+    Output directories are normally created up front, so this costs no extra system calls.
+
+    :param dest_path: Path of the output file.
+    :return: The text file object.
+    """
+    try:
+        return open(dest_path, "w")
+    except FileNotFoundError:
+        makedirs(dirname(dest_path), exist_ok=True)
+        return open(dest_path, "w")
+
+def page_variables(title: str, fragments, basepath="/", variables: dict = None) -> dict:
+    """
+    Get the template variables of a page.
+
+    Every slot is filled during the single pass that writes the template, so variables
+    cost nothing beyond their own value.
+
+    :param title: The title of the page.
+    :param fragments: An iterable of HTML fragments of the page content.
+    :param basepath: The basepath used to rewrite links.
+    :param variables: Optional other variables of the page, such as its Path.
+    :return: The variables to render the template with.
+    """
+    assets = get_asset_map()
+    urls = assets.urls if assets is not None else None
+    return {
+        "Title": title,
+        **(variables or {}),
+        # Fragments are rewritten one at a time instead of copying the whole page for every replace
+        "Content": (rewrite_basepath(add_image_attributes(fragment), basepath, urls) for fragment in fragments),
+    }
+
+def render_page(template: Template, title: str, html_node: HTMLNode, basepath="/", variables: dict = None) -> str:
+    """
+    Render a parsed page with a template in memory.
+
+    :param template: The compiled template.
+    :param title: The title of the page.
+    :param html_node: The HTML tree of the page content.
+    :param basepath: The basepath used to rewrite links.
+    :param variables: Optional other variables of the page, such as its Path.
+    :return: The HTML of the whole page.
+    """
+    output = StringIO()
+    with stage("render"):
+        template.render(output, page_variables(title, html_node.iter_html(), basepath, variables))
+    return output.getvalue()
+
+def write_page(dest_path: str, template: Template, title: str, html_node: HTMLNode, basepath="/", variables: dict = None):
+    """
+    Render a parsed page with a template and write it to a file.
+
+    :param dest_path: Destination path for the generated HTML file.
+    :param template: The compiled template.
+    :param title: The title of the page.
+    :param html_node: The HTML tree of the page content.
+    :param basepath: The basepath used to rewrite links.
+    :param variables: Optional other variables of the page, such as its Path.
+    """
+    write_fragments(dest_path, template, title, html_node.iter_html(), basepath, variables)
+
+def read_title(fp) -> str:
+    """
+    Extract the title from a markdown file object, reading one line at a time.
+
+    :param fp: The text file object to read from.
+    :return: The extracted title.
+    """
+    for line in fp:
+        if line.startswith("# "):
+            return line[2:].strip()
+    return "Untitled Document"
+
+def stream_page(from_path: str, template: Template, dest_path: str, basepath="/", summary: PageSummary = None, variables: dict = None):
+    """
+    Generate a page while reading its markdown, keeping memory flat for very large files.
+
+    The title is captured by the block reader. Blocks read before the title is found are
+    held back, up to STREAM_TITLE_BLOCKS, after which the title is looked up with a separate scan.
+
+    :param from_path: Path to the markdown file.
+    :param template: The compiled template.
+    :param dest_path: Destination path for the generated HTML file.
+    :param basepath: The basepath used to rewrite links.
+    :param summary: Optional summary the title, links, images and terms of the page are added to.
+    :param variables: Optional other variables of the page, such as its Path.
+    """
+    with open(from_path, "r") as source:
+        read_front_matter(source)
+        reader = BlockReader(source)
+        blocks = iter(reader)
+        pending = []
+
+        for block in blocks:
+            pending.append(block)
+            if reader.title is not None or len(pending) >= STREAM_TITLE_BLOCKS:
+                break
+
+        title = reader.title
+        if title is None:
+            with open(from_path, "r") as f:
+                read_front_matter(f)
+                title = read_title(f)
+
+        if summary is not None:
+            summary.title = title
+        write_fragments(dest_path, template, title, iter_blocks_html(chain(pending, blocks), summary), basepath, variables)
+
+def write_collection(collection, template_path, output, basepath="/", site_url="", compressor: Compressor = None) -> list[str]:
+    """
+    Write the listing pages and the Atom feed of a collection.
+
+    Pages were sorted once when the collection was built, so every page is rendered into
+    exactly one listing, and the work is linear in the number of pages.
+
+    :param collection: The Collection.
+    :param template_path: Path to the HTML template the listing pages are rendered with.
+    :param output: The output directory.
+    :param basepath: The basepath used to rewrite links.
+    :param site_url: Scheme and host of the site, used for the absolute URLs of the feed. Without it
+        no feed is written, since feed readers need absolute ids, and a feed of a previous build is removed.
+    :param compressor: Optional compressor every written listing page is queued on.
+    :return: Paths of the written files, relative to the output directory.
+    """
+    template = load_template(template_path, basepath, get_asset_map())
+    for path in stale_listings(output, collection):
+        rmtree(path)
+
+    written = []
+    for number, pages in collection.listings():
+        relative = collection.listing_path(number)
+        title = collection.title if number == 1 else f"{collection.title}, page {number}"
+        write_fragments(join(output, relative), template, title, collection.render_listing(number, pages), basepath)
+        if compressor is not None:
+            compressor.submit(join(output, relative))
+        written.append(relative)
+
+    feed = join(collection.name, FEED_NAME)
+    if not site_url:
+        remove_existing(join(output, feed))
+        return written
+    with open_output(join(output, feed)) as f:
+        f.write(collection.render_feed(base_url(site_url, basepath)))
+    written.append(feed)
+    return written
+
+def generate_page(from_path, template_path, dest_path, basepath="/", cache: PageCache = None, flat: bool = False, search: bool = False, variables: dict = None) -> PageSummary:
     """
     Generate a page from a markdown file using a template.
 
     :param from_path: Path to the markdown file.
     :param template_path: Path to the HTML template.
     :param dest_path: Destination path for the generated HTML file.
+    :param cache: Optional page cache, used to skip parsing unchanged markdown.
+    :param flat: Whether to parse into a FlatDocument instead of an HTMLNode tree.
+        Files larger than STREAM_THRESHOLD are always rendered block by block instead.
+    :param search: Whether to collect the search terms of the page.
+    :param variables: Optional other template variables of the page, such as its Path.
+    :return: The summary of the page.
     """
     print(f"Generating page from {from_path} to {dest_path} using template {template_path}")
-    
-    md_content = open(from_path, "r").read()
-    template_file = open(template_path, "r").read()
-    html_content = markdown_to_html_node(md_content).to_html()
-    title = extract_title(md_content)
-    file = template_file.replace("{{ Title }}", title).replace("{{ Content }}", html_content)
-    file = file.replace('href="/', f'href="{basepath}')
-    file = file.replace('src="/', f'src="{basepath}')
-
-    # print(f"=" * 45)
-    # print(f"Template content:\n{html_content}")
-    
-    # print(f"=" * 45)
-    # print(f"Generated HTML content:\n{file}")
-    
-    directory = dest_path.rsplit('/', 1)[0]
-    if not exists(directory):
-        makedirs(directory)
-    with open(dest_path, "w") as f:
-        f.write(file)
+    profiler = get_profiler()
+    counts = memo_counts() if profiler is not None else None
+
+    summary = PageSummary(terms=search)
+
+    with time_page(from_path):
+        with stage("read"):
+            template = load_template(template_path, basepath, get_asset_map())
+        if getsize(from_path) > STREAM_THRESHOLD:
+            stream_page(from_path, template, dest_path, basepath, summary, variables)
+        else:
+            summary.title, html_node = read_page(from_path, cache, flat)
+            write_page(dest_path, template, summary.title, html_node, basepath, variables)
+            with stage("summary"):
+                summary.collect(html_node)
+    # The search index shows the same title as the page
+    if variables is not None and "Title" in variables:
+        summary.title = variables["Title"]
+
+    count_file_bytes(from_path, dest_path)
+    if profiler is not None:
+        for name, (hits, misses) in memo_counts().items():
+            profiler.add_memo(name, hits - counts[name][0], misses - counts[name][1])
+    return summary
         
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath="/"):
+def collect_pages(dir_path_content, dest_dir_path, manifest: BuildManifest = None, shard: Shard = None, index: TreeIndex = None, drafts: set = None) -> list[tuple[str, str]]:
+    """
+    Recursively collect the markdown files in a directory and the HTML files they generate.
+
+    :param dir_path_content: Path to the directory containing markdown files.
+    :param dest_dir_path: Destination directory for the generated HTML files.
+    :param manifest: Optional build manifest, used to skip pages that did not change.
+    :param shard: Optional shard, only the pages assigned to it are collected.
+    :param index: Index of the content directory, scanned when not given.
+    :param drafts: Optional paths of draft pages relative to the content directory, which are left out.
+    :return: Sorted list of (source, destination) pairs.
+    """
+    return list(walk_pages(dir_path_content, dest_dir_path, manifest, shard, index, drafts))
+
+def page_output(relative_path: str) -> str:
+    """
+    Get the path of the HTML file a markdown file generates.
+
+    :param relative_path: Path of the markdown file relative to the content directory.
+    :return: Path of the HTML file relative to the output directory.
+    """
+    directory, name = split(relative_path)
+    return join(directory, name.replace(".md", ".html"))
+
+def walk_pages(dir_path_content, dest_dir_path, manifest: BuildManifest = None, shard: Shard = None, index: TreeIndex = None, drafts: set = None):
+    """
+    Walk the markdown files of a directory tree, yielding pages as they are checked.
+
+    :param dir_path_content: Path to the directory containing markdown files.
+    :param dest_dir_path: Destination directory for the generated HTML files.
+    :param manifest: Optional build manifest, used to skip pages that did not change.
+    :param shard: Optional shard, only the pages assigned to it are collected.
+    :param index: Index of the content directory, scanned when not given.
+    :param drafts: Optional paths of draft pages relative to the content directory, which are left out.
+    :return: An iterator over (source, destination) pairs, in sorted order.
+    """
+    index = index or TreeIndex(dir_path_content)
+
+    for file in index.files:
+        if not file.relative.endswith(".md"):
+            continue
+        if drafts and file.relative in drafts:
+            continue
+        if shard is not None and not shard.includes(file.path, dir_path_content):
+            continue
+        dest_path = join(dest_dir_path, page_output(file.relative))
+        if manifest is None or manifest.needs_build(file.path, dest_path, info=file.info):
+            yield file.path, dest_path
+
+def init_worker(image_attributes: dict, assets: AssetMap):
+    """
+    Set up a worker process to render pages.
+
+    :param image_attributes: Attributes added to img tags by image URL.
+    :param assets: The asset map links are rewritten with, or None.
+    """
+    use_image_attributes(image_attributes)
+    use_asset_map(assets)
+
+def build_page(job: tuple, profile: bool = False) -> tuple[str, str, dict, PageSummary]:
+    """
+    Generate a single page in a worker process, capturing its log output.
+
+    :param job: A (from_path, template_path, dest_path, basepath, cache, flat, search, variables) tuple.
+    :param profile: Whether to profile the page.
+    :return: A (log output, error, profile, summary) tuple, the error being None on success,
+        the profile being the raw measurements of the page, or None, and the summary being
+        None on failure.
+    """
+    log = StringIO()
+    error = None
+    summary = None
+    profiler = enable_profiler() if profile else None
+    with redirect_stdout(log):
+        try:
+            summary = generate_page(*job)
+        except Exception:
+            error = format_exc()
+    if profiler is not None:
+        disable_profiler()
+        return log.getvalue(), error, profiler.state(), summary
+    return log.getvalue(), error, None, summary
+
+def generate_pages(pages: list[tuple[str, str]], template_path, basepath="/", jobs: int = 1, cache: PageCache = None, flat: bool = False, links: LinkIndex = None, search: SearchIndex = None, compressor: Compressor = None, templates: dict = None, variables: dict = None):
+    """
+    Generate a list of pages, optionally across a pool of worker processes.
+
+    Logs are printed in page order, so the output is the same as a serial build.
+
+    :param pages: List of (source, destination) pairs.
+    :param template_path: Path to the HTML template.
+    :param basepath: The basepath used to rewrite links.
+    :param jobs: Number of worker processes.
+    :param cache: Optional page cache, used to skip parsing unchanged markdown.
+    :param flat: Whether to parse into a FlatDocument instead of an HTMLNode tree.
+    :param links: Optional link index the references of every page are added to.
+    :param search: Optional search index the terms of every page are added to.
+    :param compressor: Optional compressor every generated page is queued on.
+    :param templates: Optional paths of the templates chosen by pages, by source path.
+    :param variables: Optional other template variables of pages, by source path.
+    """
+    templates = templates or {}
+    variables = variables or {}
+    if jobs <= 1 or len(pages) <= 1:
+        for from_path, dest_path in pages:
+            generate_page(from_path, templates.get(from_path, template_path), dest_path, basepath, cache, flat, search is not None, variables.get(from_path)).record(dest_path, links, search)
+            if compressor is not None:
+                compressor.submit(dest_path)
+        return
+
+    work = [(from_path, templates.get(from_path, template_path), dest_path, basepath, cache, flat, search is not None, variables.get(from_path)) for from_path, dest_path in pages]
+    profiler = get_profiler()
+    failed = []
+
+    # Workers render links and img tags like this process, however they are started
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(get_image_attributes(), get_asset_map())) as executor:
+        chunksize = max(1, len(work) // (jobs * 4))
+        results = executor.map(partial(build_page, profile=profiler is not None), work, chunksize=chunksize)
+        for (from_path, dest_path), (log, error, profile, summary) in zip(pages, results):
+            print(log, end="")
+            if profile is not None:
+                profiler.merge(profile)
+            if summary is not None:
+                summary.record(dest_path, links, search)
+                if compressor is not None:
+                    compressor.submit(dest_path)
+            if error is not None:
+                print(f"Failed to generate page from {from_path}:\n{error}")
+                failed.append(from_path)
+
+    if failed:
+        raise RuntimeError(f"Failed to generate {len(failed)} page(s): {', '.join(failed)}")
+
+def generate_pages_pipelined(pages, template_path, basepath="/", cache: PageCache = None, flat: bool = False, io_threads: int = 4, depth: int = 16, links: LinkIndex = None, search: SearchIndex = None, compressor: Compressor = None, templates: dict = None, variables: dict = None):
+    """
+    Generate pages in one process, overlapping reading, rendering and writing.
+
+    Sources are read and pages written by pools of threads, while pages are parsed and
+    rendered on the calling thread. Pages larger than STREAM_THRESHOLD are streamed from
+    the render stage instead of being read whole.
+
+    :param pages: An iterable of (source, destination) pairs, consumed as the pipeline drains.
+    :param template_path: Path to the HTML template.
+    :param basepath: The basepath used to rewrite links.
+    :param cache: Optional page cache, used to skip parsing unchanged markdown.
+    :param flat: Whether to parse into a FlatDocument instead of an HTMLNode tree.
+    :param io_threads: Number of reader threads and of writer threads.
+    :param depth: Maximum number of pages waiting between two stages.
+    :param links: Optional link index the references of every page are added to.
+    :param search: Optional search index the terms of every page are added to.
+    :param compressor: Optional compressor every written page is queued on.
+    :param templates: Optional paths of the templates chosen by pages, by source path.
+    :param variables: Optional other template variables of pages, by source path.
+    """
+    templates = templates or {}
+    variables = variables or {}
+
+    def read(page):
+        from_path, _ = page
+        if getsize(from_path) > STREAM_THRESHOLD:
+            return None
+        with open(from_path, "r") as f:
+            return f.read()
+
+    def render(page, md_content):
+        from_path, dest_path = page
+        page_template = templates.get(from_path, template_path)
+        print(f"Generating page from {from_path} to {dest_path} using template {page_template}")
+        template = load_template(page_template, basepath, get_asset_map())
+        summary = PageSummary(terms=search is not None)
+        with time_page(from_path):
+            if md_content is None:
+                stream_page(from_path, template, dest_path, basepath, summary, variables.get(from_path))
+                html = None
+            else:
+                summary.title, html_node = parse_page(md_content, cache, flat)
+                html = render_page(template, summary.title, html_node, basepath, variables.get(from_path))
+                with stage("summary"):
+                    summary.collect(html_node)
+        summary.title = variables.get(from_path, {}).get("Title", summary.title)
+        summary.record(dest_path, links, search)
+        return html
+
+    def write(page, html):
+        _, dest_path = page
+        if html is not None:
+            with open_output(dest_path) as f:
+                f.write(html)
+        if compressor is not None:
+            compressor.submit(dest_path)
+
+    profiler = get_profiler()
+    counts = memo_counts() if profiler is not None else None
+    walked = []
+
+    def produce():
+        for page in pages:
+            walked.append(page)
+            yield page
+
+    failures = Pipeline(read, render, write, io_threads, io_threads, depth).run(produce())
+
+    failed = []
+    for page, error in failures:
+        source = page[0] if page is not None else "the content directory"
+        print(f"Failed to generate page from {source}:\n{error}")
+        failed.append(source)
+
+    if profiler is not None:
+        for from_path, dest_path in walked:
+            if from_path not in failed:
+                count_file_bytes(from_path, dest_path)
+        for name, (hits, misses) in memo_counts().items():
+            profiler.add_memo(name, hits - counts[name][0], misses - counts[name][1])
+
+    if failed:
+        raise RuntimeError(f"Failed to generate {len(failed)} page(s): {', '.join(failed)}")
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath="/", manifest: BuildManifest = None, jobs: int = 1, cache: PageCache = None, flat: bool = False, shard: Shard = None, index: TreeIndex = None, links: LinkIndex = None, search: SearchIndex = None, compressor: Compressor = None, templates: dict = None, drafts: set = None, variables: dict = None):
     """
     Recursively generate pages from markdown files in a directory.
 
     :param dir_path_content: Path to the directory containing markdown files.
     :param template_path: Path to the HTML template.
     :param dest_dir_path: Destination directory for the generated HTML files.
+    :param manifest: Optional build manifest, used to skip pages that did not change.
+    :param jobs: Number of worker processes.
+    :param cache: Optional page cache, used to skip parsing unchanged markdown.
+    :param flat: Whether to parse into a FlatDocument instead of an HTMLNode tree.
+    :param shard: Optional shard, only the pages assigned to it are generated.
+    :param index: Index of the content directory, scanned when not given.
+    :param links: Optional link index the references of every page are added to.
+    :param search: Optional search index the terms of every page are added to.
+    :param compressor: Optional compressor every generated page is queued on.
+    :param templates: Optional paths of the templates chosen by pages, by source path.
+    :param drafts: Optional paths of draft pages relative to the content directory, which are not generated.
+    :param variables: Optional other template variables of pages, by source path.
     """
     
-    for item in listdir(dir_path_content):
-        item_path = join(dir_path_content, item)
-        if isfile(item_path) and item.endswith(".md"):
-            dest_path = join(dest_dir_path, item.replace(".md", ".html"))
-            generate_page(item_path, template_path, dest_path, basepath)
-        elif not isfile(item_path):
-            new_dest_dir = join(dest_dir_path, item)
-            if not exists(new_dest_dir):
-                makedirs(new_dest_dir)
-            generate_pages_recursive(item_path, template_path, new_dest_dir, basepath)
-
-def main():
-    basepath = argv[1] if len(argv) > 1 else "/"
-    output_path = "./docs"
-    
-    if exists(output_path):
+    generate_pages(collect_pages(dir_path_content, dest_dir_path, manifest, shard, index, drafts), template_path, basepath, jobs, cache, flat, links, search, compressor, templates, variables)
+
+# Directory of the state kept between builds, and the default path of each part of it
+STATE_DIR = "./.build"
+STATE_PATHS = {
+    "manifest": MANIFEST_PATH,
+    "cache_dir": CACHE_PATH,
+    "links": LINKS_PATH,
+    "search_store": SEARCH_STORE_PATH,
+    "compress_store": COMPRESS_STORE_PATH,
+    "image_cache": IMAGE_CACHE_DIR,
+    "metadata": METADATA_PATH,
+}
+
+def parse_args(args: list[str] = None):
+    """
+    Parse the command line arguments of the build.
+
+    :param args: The arguments to parse, defaults to sys.argv.
+    :return: The parsed arguments.
+    """
+    parser = ArgumentParser(description="Build the static site")
+    parser.add_argument("basepath", nargs="?", default="/", help="basepath used to rewrite links")
+    parser.add_argument("--content", default="./content", help="directory of markdown pages")
+    parser.add_argument("--static", default="./static", help="directory of static files")
+    parser.add_argument("--template", default="./template.html", help="HTML template for every page")
+    parser.add_argument("--output", default="./docs", help="directory the site is generated into")
+    parser.add_argument("--state-dir", default=STATE_DIR, metavar="DIR", help=f"directory the state kept between builds is stored in (default: {STATE_DIR})")
+    parser.add_argument("--manifest", help="build manifest used by --incremental (default: manifest.json in the state directory)")
+    parser.add_argument("--incremental", action="store_true", help="only rebuild outputs whose inputs changed")
+    parser.add_argument("--assets", choices=sorted(STRATEGIES), default="copy", help="how static files are written to the output")
+    parser.add_argument("--cache", action="store_true", help="reuse parsed pages whose markdown did not change")
+    parser.add_argument("--cache-dir", help="directory of the parsed page cache (default: page-cache in the state directory)")
+    parser.add_argument("--cache-size", type=int, default=256, metavar="MB", help="size the parsed page cache is pruned to")
+    parser.add_argument("--clear-cache", action="store_true", help="delete the parsed page cache and exit")
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N", help="only build shard I of N (from 0) into its own output directory")
+    parser.add_argument("--links", metavar="PATH", help="where the site-wide link index is written (default: links.json in the state directory)")
+    parser.add_argument("--no-links", action="store_true", help="do not index links or check for broken ones")
+    parser.add_argument("--search", action="store_true", help="write a client-side search index into the output")
+    parser.add_argument("--search-store", metavar="PATH", help="terms of every page, kept for incremental search updates (default: search.json in the state directory)")
+    parser.add_argument("--compress", action="store_true", help="write a .gz sibling next to every HTML and CSS output")
+    parser.add_argument("--compress-level", type=int, default=9, choices=range(1, 10), metavar="LEVEL", help="gzip compression level, from 1 to 9 (default: 9)")
+    parser.add_argument("--compress-threads", type=int, default=None, metavar="N", help="number of compression threads (default: number of CPUs)")
+    parser.add_argument("--compress-store", metavar="PATH", help="content hashes of the compressed outputs, used to skip unchanged ones (default: compress.json in the state directory)")
+    parser.add_argument("--images", action="store_true", help="write narrower variants of PNG images and add srcset, width and height to img tags")
+    parser.add_argument("--image-widths", type=int, nargs="+", default=list(IMAGE_WIDTHS), metavar="W", help=f"widths of the image variants (default: {' '.join(map(str, IMAGE_WIDTHS))})")
+    parser.add_argument("--image-cache", metavar="DIR", help="derivative cache the image variants are kept in (default: images in the state directory)")
+    parser.add_argument("--image-jobs", type=int, default=None, metavar="N", help="number of processes resizing images (default: number of CPUs)")
+    parser.add_argument("--fingerprint", action="store_true", help="put a content hash in the names of static assets and rewrite the links to them")
+    parser.add_argument("--asset-manifest", metavar="PATH", help=f"where the original and fingerprinted asset names are written (default: {ASSET_MANIFEST} in the output)")
+    parser.add_argument("--collection", action="append", default=[], metavar="DIR", help="write paginated listings and an Atom feed of the pages under a content directory, can be repeated")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, metavar="N", help=f"pages per listing page (default: {PAGE_SIZE})")
+    parser.add_argument("--metadata", metavar="PATH", help="front matter and title of every page, kept between builds (default: metadata.json in the state directory)")
+    parser.add_argument("--drafts", action="store_true", help="also generate and list pages marked draft: true")
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument("--list-drafts", action="store_true", help="print the draft pages and exit")
+    query.add_argument("--tagged", metavar="TAG", help="print the pages with a tag and exit")
+    parser.add_argument("--site-url", default="", metavar="URL", help="scheme and host of the site, such as https://example.com, used for absolute URLs in feeds, which are only written when it is set")
+    parser.add_argument("--flat", action="store_true", help="parse pages into flat array-backed documents")
+    parser.add_argument("--memo-size", type=int, default=DEFAULT_MAXSIZE, metavar="N", help="inline fragments memoized per process, 0 to disable")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of processes used to generate pages")
+    parser.add_argument("--pipeline", action="store_true", help="overlap reading, rendering and writing pages in one process")
+    parser.add_argument("--io-threads", type=int, default=4, metavar="N", help="reader and writer threads used by --pipeline")
+    parser.add_argument("--profile", action="store_true", help="print a timing report of the build stages")
+    parser.add_argument("--profile-json", metavar="PATH", help="also write the timing report as JSON")
+    parser.add_argument("--profile-top", type=int, default=10, metavar="N", help="number of slowest pages to report")
+    parsed = parser.parse_args(args)
+    for name, default in STATE_PATHS.items():
+        if getattr(parsed, name) is None:
+            setattr(parsed, name, join(parsed.state_dir, basename(default)))
+    if parsed.pipeline and parsed.jobs > 1:
+        parser.error("--pipeline generates pages in one process and cannot be combined with --jobs")
+    if parsed.search and parsed.shard:
+        parser.error("--search indexes the whole site and cannot be combined with --shard")
+    return parsed
+
+def parse_merge_args(args: list[str] = None):
+    """
+    Parse the command line arguments of the merge command.
+
+    :param args: The arguments to parse.
+    :return: The parsed arguments.
+    """
+    parser = ArgumentParser(prog="main.py merge", description="Combine the output directories of a sharded build")
+    parser.add_argument("shards", nargs="+", help="output directories of every shard")
+    parser.add_argument("--output", default="./docs", help="directory the site is merged into")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="where the merged build manifest is written")
+    parser.add_argument("--assets", choices=sorted(STRATEGIES), default="copy", help="how files are written to the output")
+    return parser.parse_args(args)
+
+def merge(argv: list[str] = None):
+    """
+    Merge the shards of a build into the final output tree and manifest.
+
+    :param argv: The arguments to parse.
+    """
+    args = parse_merge_args(argv)
+    merged = merge_shards(args.shards, args.output, args.assets)
+
+    manifest_dir = dirname(args.manifest)
+    if manifest_dir:
+        makedirs(manifest_dir, exist_ok=True)
+    with open(args.manifest, "w") as f:
+        json.dump(merged, f, indent=2, sort_keys=True)
+    print(f"Merged {len(args.shards)} shards into {args.output}")
+
+def main(argv: list[str] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["merge"]:
+        merge(argv[1:])
+        return
+
+    args = parse_args(argv)
+    basepath = args.basepath
+    output_path = args.output
+    manifest_path = args.manifest
+    links_path = args.links
+    compress_path = args.compress_store
+    metadata_path = args.metadata
+    template_path = args.template
+    shard = args.shard
+    manifest = None
+    profiler = None
+    cache = PageCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    if args.clear_cache:
+        cache.clear()
+        print(f"Cleared page cache {args.cache_dir}")
+        return
+
+    if not args.cache:
+        cache = None
+
+    # Queries are answered from the metadata index, which only reads pages changed since it was saved
+    if args.list_drafts or args.tagged is not None:
+        metadata = MetadataIndex(args.metadata)
+        metadata.load()
+        metadata.update(TreeIndex(args.content), read_title)
+        metadata.save()
+        for relative in metadata.drafts() if args.list_drafts else metadata.tagged(args.tagged):
+            print(join(args.content, relative))
+        return
+
+    resize_memos(args.memo_size)
+
+    if args.profile or args.profile_json:
+        profiler = enable_profiler(Profiler())
+
+    # Every shard records what it built in its own output directory, for the merge command
+    if shard is not None:
+        output_path = shard.output(output_path)
+        manifest_path = join(output_path, SHARD_MANIFEST)
+        links_path = shard.output(links_path)
+        compress_path = shard.output(compress_path)
+        metadata_path = shard.output(metadata_path)
+
+    if args.incremental or shard is not None:
+        manifest = BuildManifest(manifest_path, template_path, basepath)
+        if shard is not None:
+            manifest.current["shard"] = {"index": shard.index, "count": shard.count, "output": output_path}
+
+    # Without a previous manifest we cannot tell which outputs are stale, so start clean
+    if exists(output_path) and (not args.incremental or not manifest.loaded):
         rmtree(output_path)
 
-    copy_files("./static", output_path)
+    compressor = None
+    if args.compress:
+        compressor = Compressor(output_path, args.compress_threads, args.compress_level)
+        compressor.load(compress_path)
+
+    # Scan both trees once, then create every output directory in one batch
+    with stage("scan"):
+        static_index = TreeIndex(args.static)
+        content_index = TreeIndex(args.content)
+
+    # First phase: the front matter and title of every changed page, without parsing bodies
+    with stage("metadata"):
+        metadata = MetadataIndex(metadata_path)
+        metadata.load()
+        metadata.update(content_index, read_title)
+    drafts = set() if args.drafts else set(metadata.drafts())
+    templates = {join(args.content, relative): path for relative, path in metadata.templates(dirname(template_path)).items()}
+    for source, path in templates.items():
+        if not exists(path):
+            raise ValueError(f"Template {path} of {source} does not exist")
+    variables = {
+        file.path: {"Path": basepath + page_url(page_output(file.relative))[1:], **template_variables(metadata.get(file.relative))}
+        for file in content_index.files if file.relative.endswith(".md")
+    }
+    # Pages choosing a template depend on it like every page depends on the default one
+    if manifest is not None and templates:
+        manifest.add_setting("templates", {path: manifest.digest(path) for path in sorted(set(templates.values()))})
+
+    assets = None
+    if args.fingerprint:
+        with stage("fingerprint"):
+            assets = fingerprint_files(static_index, manifest)
+    copy_files(args.static, output_path, manifest, args.assets, shard, static_index, compressor, assets)
+
+    if args.images:
+        with stage("images"):
+            images = ResponsiveImages(args.image_cache, args.image_widths, args.image_jobs)
+            attributes = images.build(static_index, output_path, manifest, args.assets, shard, assets)
+        use_image_attributes(attributes)
+        # Pages show the width and height of their images, so changed dimensions rebuild them
+        if manifest is not None:
+            manifest.add_setting("images", attributes)
+        if images.generated:
+            print(f"Generated {images.generated} image variant(s) in {args.image_cache}")
+
+    if assets is not None:
+        use_asset_map(assets)
+        # Pages link to fingerprinted names, so any changed asset rebuilds them
+        if manifest is not None:
+            manifest.add_setting("assets", assets.version)
+        # Every shard has the whole map, one of them writes it
+        if shard is None or shard.index == 0:
+            assets.write(args.asset_manifest or join(output_path, ASSET_MANIFEST))
+    make_directories(output_path, [dirname(file.relative) for file in content_index.files if file.relative.endswith(".md")])
+
+    collections = []
+    if args.collection:
+        collections = build_collections(metadata, args.content, args.collection, page_output, args.page_size, args.drafts)
+
+    links = None
+    if not args.no_links:
+        links = LinkIndex(output_path)
+        if args.incremental:
+            links.load(links_path)
+
+    search = None
+    if args.search:
+        search = SearchIndex(output_path)
+        if args.incremental:
+            search.load(args.search_store)
+        # Pages recorded with older terms are indexed again
+        if manifest is not None:
+            manifest.add_setting("search", TERMS_VERSION)
     
-    generate_pages_recursive("./content", "./template.html", output_path, basepath)
+    if args.pipeline:
+        pages = walk_pages(args.content, output_path, manifest, shard, content_index, drafts)
+        generate_pages_pipelined(pages, template_path, basepath, cache, args.flat, args.io_threads, links=links, search=search, compressor=compressor, templates=templates, variables=variables)
+    else:
+        generate_pages_recursive(args.content, template_path, output_path, basepath, manifest, args.jobs, cache, args.flat, shard, content_index, links, search, compressor, templates, drafts, variables)
+    metadata.save()
+
+    page_paths = {page_output(file.relative) for file in content_index.files if file.relative.endswith(".md") and file.relative not in drafts}
+
+    # Second phase: listings and feeds, written by one shard since every shard read all the metadata
+    listings = set()
+    if collections and (shard is None or shard.index == 0):
+        if not args.site_url:
+            print("Skipping the feeds of the collections, which need --site-url for their absolute URLs")
+        with stage("collections"):
+            for collection in collections:
+                listings.update(write_collection(collection, template_path, output_path, basepath, args.site_url, compressor))
+
+    if search is not None:
+        with stage("search"):
+            search.retain(page_paths)
+            search.write(join(output_path, SEARCH_DIR), basepath)
+            search.save(args.search_store)
+
+    if links is not None:
+        with stage("links"):
+            links.retain(page_paths)
+            report = links.report(page_paths | listings | {file.relative for file in static_index.files})
+            write_links(links_path, report)
+        for reference in report["broken"]:
+            print(f"Broken {reference['kind']} in {reference['page']}: {reference['url']}")
+        if report["broken"]:
+            print(f"Found {len(report['broken'])} broken reference(s), see {links_path}")
+
+    if cache is not None:
+        cache.prune()
+
+    if manifest is not None:
+        manifest.remove_stale(output_path)
+
+    # After stale outputs are removed, so their siblings are removed as well
+    if compressor is not None:
+        with stage("compress"):
+            counts = compressor.finish()
+        compressor.save(compress_path)
+        print(f"Compressed {counts['compressed']} output(s), {counts['unchanged']} unchanged, {counts['incompressible']} not worth compressing")
+
+    if manifest is not None:
+        manifest.save()
 
-    pass
+    if profiler is not None:
+        disable_profiler()
+        print(profiler.format_report(args.profile_top))
+        if args.profile_json:
+            profiler.write_json(args.profile_json, args.profile_top)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,149 @@
+import json
+
+from hashlib import sha256
+from os import makedirs, remove, stat
+from os.path import dirname, exists
+
+from assets import remove_empty_parents
+
+MANIFEST_PATH = "./.build/manifest.json"
+
+def hash_file(path: str) -> str:
+    """
+    Compute the content hash of a file.
+
+    :param path: Path to the file to hash.
+    :return: The hex digest of the file contents.
+    """
+    digest = sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class BuildManifest:
+    """
+    A record of the inputs used for the previous build, used to skip outputs whose inputs did not change.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH, template_path: str = None, basepath: str = "/"):
+        """
+        Load the previous manifest from disk and start recording the current build.
+
+        :param path: Path of the manifest file.
+        :param template_path: Path to the HTML template used for every page.
+        :param basepath: The basepath used to rewrite links.
+        """
+        self.path = path
+        self.previous = {}
+        self.loaded = False
+        self.digests = {}
+
+        if exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.previous = json.load(f)
+                self.loaded = True
+            except (OSError, ValueError):
+                self.previous = {}
+
+        self.current = {
+            "basepath": basepath,
+            "template": hash_file(template_path) if template_path else None,
+            "files": {},
+        }
+
+        # Every page depends on the template and the basepath, so a change to either rebuilds them all
+        self.settings_changed = (
+            self.previous.get("basepath") != self.current["basepath"]
+            or self.previous.get("template") != self.current["template"]
+        )
+
+    def add_setting(self, name: str, value):
+        """
+        Record another setting every page depends on, rebuilding them all when it changed.
+
+        :param name: The name of the setting.
+        :param value: A JSON-serializable value.
+        """
+        self.current[name] = value
+        if self.previous.get(name) != value:
+            self.settings_changed = True
+
+    def digest(self, src: str, info=None) -> str:
+        """
+        Get the content hash of an input file, reading it at most once per build.
+
+        Files whose size and modification time match the previous build reuse the recorded hash.
+
+        :param src: Path to the source file.
+        :param info: The stat result of the source if it is already known, such as from a TreeIndex.
+        :return: The hex digest of the file contents.
+        """
+        digest = self.digests.get(src)
+        if digest is None:
+            info = info or stat(src)
+            entry = self.previous.get("files", {}).get(src)
+            if entry is not None and entry.get("size") == info.st_size and entry.get("mtime") == info.st_mtime_ns:
+                digest = entry["hash"]
+            else:
+                digest = hash_file(src)
+            self.digests[src] = digest
+        return digest
+
+    def needs_build(self, src: str, dest: str, uses_template: bool = True, info=None) -> bool:
+        """
+        Record an input file for the current build and check whether its output must be rewritten.
+
+        Hashes come from digest, so only new or touched files are read.
+
+        :param src: Path to the source file.
+        :param dest: Path to the output file.
+        :param uses_template: Whether the output also depends on the template and basepath.
+        :param info: The stat result of the source if it is already known, such as from a TreeIndex.
+        :return: True if the output is missing or out of date, False otherwise.
+        """
+        info = info or stat(src)
+        entry = self.previous.get("files", {}).get(src)
+        digest = self.digest(src, info)
+        self.current["files"][src] = {"hash": digest, "dest": dest, "size": info.st_size, "mtime": info.st_mtime_ns}
+
+        if entry is None or entry["hash"] != digest or entry["dest"] != dest:
+            return True
+        if uses_template and self.settings_changed:
+            return True
+        return not exists(dest)
+
+    def remove_stale(self, root: str = None) -> list[str]:
+        """
+        Delete outputs whose sources were removed since the previous build, or now write
+        to another output, such as a fingerprinted file whose content changed.
+
+        :param root: The output directory, below which directories left empty are removed as well.
+        :return: List of the removed output paths.
+        """
+        current_dests = {entry["dest"] for entry in self.current["files"].values()}
+        removed = []
+
+        for src, entry in self.previous.get("files", {}).items():
+            dest = entry["dest"]
+            if dest in current_dests:
+                continue
+            if exists(dest):
+                print(f"Removing stale output {dest}")
+                remove(dest)
+                removed.append(dest)
+                if root is not None:
+                    remove_empty_parents(dest, root)
+
+        return removed
+
+    def save(self):
+        """
+        Write the manifest of the current build to disk.
+        """
+        directory = dirname(self.path)
+        if directory and not exists(directory):
+            makedirs(directory)
+        with open(self.path, "w") as f:
+            json.dump(self.current, f, indent=2, sort_keys=True)
@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from threading import Lock
+
+DEFAULT_MAXSIZE = 4096
+
+# Longer keys are computed without being cached. Repeated fragments are short, and the cap
+# bounds the memory of a full memo, such as while streaming a document of long paragraphs.
+MAX_KEY_LENGTH = 512
+
+class Memo:
+    """
+    A bounded least-recently-used cache around a function of one hashable argument.
+
+    Results are cached as returned, so the function should return immutable values such
+    as tuples. Lookups are guarded by a lock, so a Memo can be shared between threads.
+    Each worker process has its own copy.
+    """
+
+    def __init__(self, function, maxsize: int = DEFAULT_MAXSIZE, name: str = None, max_key_length: int = MAX_KEY_LENGTH):
+        """
+        Initialize the Memo.
+
+        :param function: The function to cache.
+        :param maxsize: Maximum number of cached results, 0 to disable caching.
+        :param name: Name of the memo in statistics, the function name by default.
+        :param max_key_length: Length of the longest key whose result is cached, for keys with a length.
+        """
+        self.function = function
+        self.maxsize = maxsize
+        self.max_key_length = max_key_length
+        self.name = name or function.__name__
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.__doc__ = function.__doc__
+        self.__name__ = function.__name__
+
+    def __call__(self, key):
+        if self.maxsize <= 0 or (isinstance(key, (str, bytes)) and len(key) > self.max_key_length):
+            return self.function(key)
+
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        # Computed outside the lock, so a slow call does not block other threads
+        value = self.function(key)
+
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+        return value
+
+    def resize(self, maxsize: int):
+        """
+        Change the maximum number of cached results, evicting the oldest ones if needed.
+
+        :param maxsize: Maximum number of cached results, 0 to disable caching.
+        """
+        with self.lock:
+            self.maxsize = maxsize
+            while len(self.entries) > max(maxsize, 0):
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove every cached result and reset the statistics.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Get the statistics of the memo.
+
+        :return: A dictionary with hits, misses, hit rate, size and maximum size.
+        """
+        with self.lock:
+            calls = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / calls if calls else 0.0,
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+            }
+
+MEMOS = []
+
+def memoize(maxsize: int = DEFAULT_MAXSIZE, name: str = None, max_key_length: int = MAX_KEY_LENGTH):
+    """
+    Decorate a function with a registered Memo.
+
+    :param maxsize: Maximum number of cached results, 0 to disable caching.
+    :param name: Name of the memo in statistics, the function name by default.
+    :param max_key_length: Length of the longest key whose result is cached, for keys with a length.
+    :return: The decorator.
+    """
+    def decorator(function) -> Memo:
+        memo = Memo(function, maxsize, name, max_key_length)
+        MEMOS.append(memo)
+        return memo
+    return decorator
+
+def memo_counts() -> dict:
+    """
+    Get the hit and miss counts of every registered memo.
+
+    :return: A dictionary of (hits, misses) pairs by memo name.
+    """
+    return {memo.name: (memo.hits, memo.misses) for memo in MEMOS}
+
+def clear_memos():
+    """
+    Remove the cached results of every registered memo.
+    """
+    for memo in MEMOS:
+        memo.clear()
+
+def resize_memos(maxsize: int):
+    """
+    Change the maximum size of every registered memo.
+
+    :param maxsize: Maximum number of cached results, 0 to disable caching.
+    """
+    for memo in MEMOS:
+        memo.resize(maxsize)
@@ -0,0 +1,167 @@
+import json
+import os
+
+from html import escape
+from os import makedirs
+from os.path import dirname, join
+
+from frontmatter import page_fields, read_front_matter
+
+METADATA_PATH = "./.build/metadata.json"
+
+# Bumped whenever the recorded fields change, so older indexes are read again
+METADATA_VERSION = "1"
+
+def read_entry(path: str, info, read_title) -> dict:
+    """
+    Read the front matter and title of a markdown file, stopping at the title.
+
+    :param path: Path to the markdown file.
+    :param info: The stat result of the file.
+    :param read_title: Function extracting the title from a file object, one line at a time.
+    :return: The entry of the file, with its size, modification time, title and fields.
+    """
+    with open(path, "r") as f:
+        try:
+            fields = page_fields(read_front_matter(f))
+        except ValueError as e:
+            raise ValueError(f"Invalid front matter in {path}: {e}")
+        title = fields.get("title") or read_title(f)
+    return {"size": info.st_size, "mtime": info.st_mtime_ns, "title": title, "fields": fields}
+
+def template_variables(entry: dict) -> dict:
+    """
+    Get the template variables of the front matter of a page.
+
+    The Title is the one listings and feeds show, so a title set in the front matter replaces
+    the heading everywhere.
+
+    :param entry: The entry of the page.
+    :return: Title, then Date, Description and Tags, HTML-escaped and empty when the page does not set them.
+    """
+    fields = entry["fields"]
+    return {
+        "Title": entry["title"],
+        "Date": escape(fields.get("date", "")),
+        "Description": escape(fields.get("description", "")),
+        "Tags": escape(", ".join(fields["tags"])),
+    }
+
+class MetadataIndex:
+    """
+    The front matter and title of every page, kept between builds.
+
+    Entries are keyed by the size and modification time of their file, so an update only
+    reads the files that changed, and queries never read the content tree at all.
+    """
+
+    def __init__(self, path: str = METADATA_PATH):
+        """
+        Initialize an empty MetadataIndex.
+
+        :param path: Path of the index file.
+        """
+        self.path = path
+        self.entries = {}
+        self.read = 0
+
+    def load(self):
+        """
+        Load the index of a previous build, if there is one.
+        """
+        try:
+            with open(self.path, "r") as f:
+                stored = json.load(f)
+            if stored.get("version") == METADATA_VERSION:
+                self.entries = stored["entries"]
+        except (OSError, ValueError, KeyError):
+            self.entries = {}
+
+    def save(self):
+        """
+        Write the index to disk.
+        """
+        directory = dirname(self.path)
+        if directory:
+            makedirs(directory, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({"version": METADATA_VERSION, "entries": self.entries}, f, sort_keys=True)
+
+    def update(self, index, read_title):
+        """
+        Bring the index up to date with a content tree, reading new and changed pages only.
+
+        :param index: The TreeIndex of the content directory.
+        :param read_title: Function extracting the title from a file object, one line at a time.
+        """
+        self.entries = {file.relative: self.lookup(file.path, file.relative, file.info, read_title) for file in index.files if file.relative.endswith(".md")}
+
+    def update_page(self, path: str, relative: str, read_title) -> dict:
+        """
+        Bring the entry of one page up to date, such as after it was edited.
+
+        :param path: Path to the markdown file.
+        :param relative: Path of the markdown file relative to the content directory.
+        :param read_title: Function extracting the title from a file object, one line at a time.
+        :return: The entry of the page.
+        """
+        entry = self.lookup(path, relative, os.stat(path), read_title)
+        self.entries[relative] = entry
+        return entry
+
+    def remove_page(self, relative: str):
+        """
+        Forget a page that was deleted.
+
+        :param relative: Path of the markdown file relative to the content directory.
+        """
+        self.entries.pop(relative, None)
+
+    def lookup(self, path: str, relative: str, info, read_title) -> dict:
+        """
+        Get the entry of a page, reading the file only when it changed since the entry was recorded.
+
+        :param path: Path to the markdown file.
+        :param relative: Path of the markdown file relative to the content directory.
+        :param info: The stat result of the file.
+        :param read_title: Function extracting the title from a file object, one line at a time.
+        :return: The entry of the page.
+        """
+        entry = self.entries.get(relative)
+        if entry is None or entry["size"] != info.st_size or entry["mtime"] != info.st_mtime_ns:
+            entry = read_entry(path, info, read_title)
+            self.read += 1
+        return entry
+
+    def get(self, relative: str) -> dict:
+        """
+        Get the entry of a page.
+
+        :param relative: Path of the markdown file relative to the content directory.
+        :return: The entry, or None for unknown pages.
+        """
+        return self.entries.get(relative)
+
+    def drafts(self) -> list[str]:
+        """
+        :return: Paths of the draft pages, relative to the content directory.
+        """
+        return sorted(relative for relative, entry in self.entries.items() if entry["fields"]["draft"])
+
+    def tagged(self, tag: str) -> list[str]:
+        """
+        Find the pages with a tag.
+
+        :param tag: The tag.
+        :return: Paths of the pages, relative to the content directory.
+        """
+        return sorted(relative for relative, entry in self.entries.items() if tag in entry["fields"]["tags"])
+
+    def templates(self, template_dir: str) -> dict:
+        """
+        Get the templates chosen by pages with a template field.
+
+        :param template_dir: The directory template names are relative to.
+        :return: Paths of the templates by page path relative to the content directory.
+        """
+        return {relative: join(template_dir, entry["fields"]["template"]) for relative, entry in self.entries.items() if entry["fields"].get("template")}
@@ -0,0 +1,140 @@
+import json
+import os
+
+from hashlib import sha256
+from os.path import exists, join
+from shutil import rmtree
+
+CACHE_PATH = "./.build/page-cache"
+
+# Bump whenever a change to the parser changes the HTML or the search terms it produces, so old entries are not reused
+PARSER_VERSION = "5"
+
+class PageCache:
+    """
+    An on-disk cache of parsed pages, keyed by the hash of the markdown source and the parser version.
+
+    Each entry stores the title, the rendered body HTML, the link and image URLs and the search terms of a page. Entries are touched when
+    they are read, and prune evicts the least recently used ones once the cache grows too large.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Initialize the PageCache.
+
+        :param path: Directory of the cache.
+        :param max_bytes: Size the cache is pruned down to.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def key(self, markdown) -> str:
+        """
+        Compute the cache key of a markdown source.
+
+        :param markdown: The markdown text, or its UTF-8 bytes, such as a slice of a mapped file.
+        :return: The hex digest of the parser version and the text, the same for both forms.
+        """
+        digest = sha256(f"{PARSER_VERSION}\0".encode())
+        digest.update(markdown.encode() if isinstance(markdown, str) else markdown)
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        """
+        Get the path of a cache entry, sharded by the first two characters of its key.
+
+        :param key: The cache key.
+        :return: Path of the entry file.
+        """
+        return join(self.path, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> tuple[str, str, tuple, dict]:
+        """
+        Look up a parsed page.
+
+        :param key: The cache key.
+        :return: A (title, body HTML, (links, images), terms) tuple, or None on a miss.
+        """
+        path = self.entry_path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["title"], entry["html"], (entry["links"], entry["images"]), entry["terms"]
+
+    def put(self, key: str, title: str, html: str, references: tuple = ((), ()), terms: dict = None):
+        """
+        Store a parsed page.
+
+        :param key: The cache key.
+        :param title: The title of the page.
+        :param html: The rendered body HTML of the page.
+        :param references: The (links, images) URLs of the page.
+        :param terms: The weighted search terms of the page.
+        """
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first, so a concurrent reader never sees a partial entry
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"title": title, "html": html, "links": list(references[0]), "images": list(references[1]), "terms": terms or {}}, f)
+        os.replace(temp_path, path)
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        """
+        List the entries of the cache.
+
+        :return: List of (last use time, size, path) tuples.
+        """
+        found = []
+        if not exists(self.path):
+            return found
+
+        with os.scandir(self.path) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as files:
+                    for entry in files:
+                        if entry.name.endswith(".json"):
+                            info = entry.stat()
+                            found.append((info.st_mtime, info.st_size, entry.path))
+
+        return found
+
+    def prune(self) -> int:
+        """
+        Evict the least recently used entries until the cache fits in its size cap.
+
+        :return: Number of evicted entries.
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+
+        return evicted
+
+    def clear(self):
+        """
+        Delete every entry of the cache.
+        """
+        if exists(self.path):
+            rmtree(self.path)
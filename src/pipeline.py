@@ -0,0 +1,132 @@
+from queue import Queue
+from threading import Lock, Thread
+from traceback import format_exc
+
+# Marks the end of the items on a queue, one per consumer
+STOP = object()
+
+class Pipeline:
+    """
+    Runs items through a read stage, a render stage and a write stage connected by bounded queues.
+
+    Reads and writes run in pools of threads, so they overlap with each other and with
+    rendering, which runs on the calling thread. Every queue holds at most depth items,
+    so a slow stage blocks the stages feeding it instead of letting work pile up in memory.
+    """
+
+    def __init__(self, read, render, write, readers: int = 4, writers: int = 4, depth: int = 16):
+        """
+        Initialize the Pipeline.
+
+        :param read: Called with an item in a reader thread, returns the data to render.
+        :param render: Called with an item and its data on the calling thread, returns the data to write.
+        :param write: Called with an item and its rendered data in a writer thread.
+        :param readers: Number of reader threads.
+        :param writers: Number of writer threads.
+        :param depth: Maximum number of items waiting in each queue.
+        """
+        self.read = read
+        self.render = render
+        self.write = write
+        self.readers = max(1, readers)
+        self.writers = max(1, writers)
+        self.depth = max(1, depth)
+        self.failures = []
+        self.lock = Lock()
+
+    def fail(self, item):
+        """
+        Record that an item failed, with the exception being handled.
+
+        :param item: The item that failed.
+        """
+        with self.lock:
+            self.failures.append((item, format_exc()))
+
+    def produce(self, items, read_queue: Queue):
+        """
+        Feed the items to the readers, then tell each reader to stop.
+
+        :param items: An iterable of items.
+        :param read_queue: The queue of items to read.
+        """
+        try:
+            for item in items:
+                read_queue.put(item)
+        except Exception:
+            self.fail(None)
+        finally:
+            for _ in range(self.readers):
+                read_queue.put(STOP)
+
+    def read_items(self, read_queue: Queue, render_queue: Queue):
+        """
+        Read items until told to stop, passing their data on to the render stage.
+
+        :param read_queue: The queue of items to read.
+        :param render_queue: The queue of (item, data) pairs to render.
+        """
+        while True:
+            item = read_queue.get()
+            if item is STOP:
+                render_queue.put(STOP)
+                return
+            try:
+                render_queue.put((item, self.read(item)))
+            except Exception:
+                self.fail(item)
+
+    def write_items(self, write_queue: Queue):
+        """
+        Write rendered items until told to stop.
+
+        :param write_queue: The queue of (item, data) pairs to write.
+        """
+        while True:
+            entry = write_queue.get()
+            if entry is STOP:
+                return
+            item, data = entry
+            try:
+                self.write(item, data)
+            except Exception:
+                self.fail(item)
+
+    def run(self, items) -> list[tuple]:
+        """
+        Run every item through the pipeline.
+
+        :param items: An iterable of items, consumed by a producer thread as the queues drain.
+        :return: List of (item, traceback) pairs of the items that failed. The item is None
+            when iterating over the items failed.
+        """
+        self.failures = []
+        read_queue = Queue(self.depth)
+        render_queue = Queue(self.depth)
+        write_queue = Queue(self.depth)
+
+        threads = [Thread(target=self.produce, args=(items, read_queue), daemon=True)]
+        threads += [Thread(target=self.read_items, args=(read_queue, render_queue), daemon=True) for _ in range(self.readers)]
+        threads += [Thread(target=self.write_items, args=(write_queue,), daemon=True) for _ in range(self.writers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            stopped = 0
+            while stopped < self.readers:
+                entry = render_queue.get()
+                if entry is STOP:
+                    stopped += 1
+                    continue
+                item, data = entry
+                try:
+                    write_queue.put((item, self.render(item, data)))
+                except Exception:
+                    self.fail(item)
+        finally:
+            for _ in range(self.writers):
+                write_queue.put(STOP)
+
+        for thread in threads:
+            thread.join()
+        return self.failures
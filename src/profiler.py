@@ -0,0 +1,300 @@
+import json
+
+from math import ceil
+from os.path import getsize
+from time import perf_counter
+
+class Timer:
+    """
+    A context manager that adds the time spent inside it to a profiler stage.
+    """
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add_time(self.name, perf_counter() - self.start)
+        return False
+
+class PageTimer(Timer):
+    """
+    A context manager that records the total time spent generating a page.
+    """
+
+    __slots__ = ()
+
+    def __exit__(self, *exc):
+        self.profiler.pages.append((self.name, perf_counter() - self.start))
+        return False
+
+class NullTimer:
+    """
+    A context manager that does nothing, used when profiling is disabled.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = NullTimer()
+
+def percentile(values: list[float], fraction: float) -> float:
+    """
+    Compute a percentile of a list of values using the nearest-rank method.
+
+    :param values: The values, which do not need to be sorted.
+    :param fraction: The percentile as a fraction between 0 and 1.
+    :return: The percentile, or 0.0 for an empty list.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+class Profiler:
+    """
+    Collects stage timings, per-page timings, memo hit counts and I/O counters for a build.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.pages = []
+        self.memos = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def stage(self, name: str) -> Timer:
+        """
+        Time a stage of the build.
+
+        :param name: The name of the stage.
+        :return: A context manager timing the stage.
+        """
+        return Timer(self, name)
+
+    def page(self, path: str) -> PageTimer:
+        """
+        Time the generation of a single page.
+
+        :param path: Path to the page source.
+        :return: A context manager timing the page.
+        """
+        return PageTimer(self, path)
+
+    def add_time(self, name: str, seconds: float, count: int = 1):
+        """
+        Add time to a stage.
+
+        :param name: The name of the stage.
+        :param seconds: The time spent in the stage.
+        :param count: The number of calls the time covers.
+        """
+        total = self.stages.get(name)
+        if total is None:
+            self.stages[name] = [seconds, count]
+        else:
+            total[0] += seconds
+            total[1] += count
+
+    def add_memo(self, name: str, hits: int, misses: int):
+        """
+        Count lookups of a memoized function.
+
+        :param name: The name of the memo.
+        :param hits: Number of lookups answered from the memo.
+        :param misses: Number of lookups that called the function.
+        """
+        total = self.memos.get(name)
+        if total is None:
+            self.memos[name] = [hits, misses]
+        else:
+            total[0] += hits
+            total[1] += misses
+
+    def add_bytes(self, read: int = 0, written: int = 0):
+        """
+        Count bytes read and written by the build.
+
+        :param read: Number of bytes read.
+        :param written: Number of bytes written.
+        """
+        self.bytes_read += read
+        self.bytes_written += written
+
+    def state(self) -> dict:
+        """
+        Export the raw measurements, so they can be sent from a worker process.
+
+        :return: A dictionary of the raw measurements.
+        """
+        return {
+            "stages": self.stages,
+            "pages": self.pages,
+            "memos": self.memos,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+        }
+
+    def merge(self, state: dict):
+        """
+        Add the raw measurements of another profiler.
+
+        :param state: Raw measurements returned by Profiler.state.
+        """
+        for name, (seconds, count) in state["stages"].items():
+            self.add_time(name, seconds, count)
+        self.pages.extend(state["pages"])
+        for name, (hits, misses) in state["memos"].items():
+            self.add_memo(name, hits, misses)
+        self.add_bytes(state["bytes_read"], state["bytes_written"])
+
+    def report(self, top: int = 10) -> dict:
+        """
+        Summarize the measurements.
+
+        :param top: Number of slowest pages to include.
+        :return: A dictionary with stage totals, page statistics, memo hit rates and I/O counters.
+        """
+        page_times = [seconds for _, seconds in self.pages]
+        slowest = sorted(self.pages, key=lambda page: (-page[1], page[0]))[:top]
+
+        return {
+            "stages": {
+                name: {"seconds": seconds, "calls": count}
+                for name, (seconds, count) in sorted(self.stages.items())
+            },
+            "pages": {
+                "count": len(page_times),
+                "total": sum(page_times),
+                "p50": percentile(page_times, 0.5),
+                "p95": percentile(page_times, 0.95),
+                "max": max(page_times, default=0.0),
+                "slowest": [{"path": path, "seconds": seconds} for path, seconds in slowest],
+            },
+            "memos": {
+                name: {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+                for name, (hits, misses) in sorted(self.memos.items())
+            },
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+        }
+
+    def format_report(self, top: int = 10) -> str:
+        """
+        Format the measurements as a human-readable report.
+
+        :param top: Number of slowest pages to include.
+        :return: The report text.
+        """
+        report = self.report(top)
+        pages = report["pages"]
+        lines = ["Stage                     Seconds      Calls"]
+
+        for name, stage in report["stages"].items():
+            lines.append(f"{name:<24} {stage['seconds']:>8.4f} {stage['calls']:>10}")
+
+        lines.append("")
+        lines.append(
+            f"Pages: {pages['count']}  total {pages['total']:.4f}s  "
+            f"p50 {pages['p50'] * 1000:.2f}ms  p95 {pages['p95'] * 1000:.2f}ms  max {pages['max'] * 1000:.2f}ms"
+        )
+        lines.append(f"Bytes read: {report['bytes_read']}  written: {report['bytes_written']}")
+
+        for name, memo in report["memos"].items():
+            if memo["hits"] or memo["misses"]:
+                lines.append(f"Memo {name}: {memo['hits']} hits  {memo['misses']} misses  hit rate {memo['hit_rate']:.1%}")
+
+        if pages["slowest"]:
+            lines.append("")
+            lines.append(f"Slowest {len(pages['slowest'])} pages:")
+            for page in pages["slowest"]:
+                lines.append(f"  {page['seconds'] * 1000:>8.2f}ms  {page['path']}")
+
+        return "\n".join(lines)
+
+    def write_json(self, path: str, top: int = 10):
+        """
+        Write the summarized measurements to a JSON file.
+
+        :param path: Path of the JSON file.
+        :param top: Number of slowest pages to include.
+        """
+        with open(path, "w") as f:
+            json.dump(self.report(top), f, indent=2)
+
+_active = None
+
+def enable(profiler: Profiler = None) -> Profiler:
+    """
+    Start profiling the build in the current process.
+
+    :param profiler: The profiler to record into, a new one by default.
+    :return: The active profiler.
+    """
+    global _active
+    _active = profiler if profiler is not None else Profiler()
+    return _active
+
+def disable() -> Profiler:
+    """
+    Stop profiling the build in the current process.
+
+    :return: The profiler that was active, if any.
+    """
+    global _active
+    profiler, _active = _active, None
+    return profiler
+
+def get_profiler() -> Profiler:
+    """
+    Get the active profiler.
+
+    :return: The active profiler, or None when profiling is disabled.
+    """
+    return _active
+
+def stage(name: str):
+    """
+    Time a stage of the build with the active profiler.
+
+    :param name: The name of the stage.
+    :return: A context manager, which does nothing when profiling is disabled.
+    """
+    return _active.stage(name) if _active is not None else NULL_TIMER
+
+def time_page(path: str):
+    """
+    Time the generation of a page with the active profiler.
+
+    :param path: Path to the page source.
+    :return: A context manager, which does nothing when profiling is disabled.
+    """
+    return _active.page(path) if _active is not None else NULL_TIMER
+
+def count_file_bytes(read_path: str = None, written_path: str = None):
+    """
+    Count the size of files read and written with the active profiler.
+
+    The files are only looked up when profiling is enabled.
+
+    :param read_path: Path of a file that was read.
+    :param written_path: Path of a file that was written.
+    """
+    if _active is not None:
+        _active.add_bytes(
+            getsize(read_path) if read_path else 0,
+            getsize(written_path) if written_path else 0,
+        )
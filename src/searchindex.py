@@ -0,0 +1,310 @@
+import json
+import os
+import re
+
+from base64 import b64decode, b64encode
+from os import makedirs
+from os.path import dirname, exists, join, relpath
+
+from flatdoc import PARENT, FlatDocument
+
+# Directory of the index inside the output, so the client can fetch it next to the pages
+SEARCH_DIR = "search"
+SEARCH_STORE_PATH = "./.build/search.json"
+
+# Bumped whenever the terms collected from a page change, so older stores are not reused
+TERMS_VERSION = "2"
+
+TITLE_BOOST = 10
+HEADING_BOOST = 5
+
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Code blocks are leaves whose value is the HTML of their code element
+CODE_MARKUP = re.compile(r"</?code>")
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into lowercase search terms.
+
+    :param text: The text to split.
+    :return: The terms, in order, without single characters.
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1]
+
+def add_terms(terms: dict, text: str, weight: int = 1):
+    """
+    Add the terms of a text to a page's term weights.
+
+    :param terms: Weights of the page by term.
+    :param text: The text to add.
+    :param weight: Weight of every occurrence.
+    """
+    for token in tokenize(text):
+        terms[token] = terms.get(token, 0) + weight
+
+def leaf_text(tag: str, value: str) -> str:
+    """
+    Get the text of a leaf node, without the markup a code block carries in its value.
+
+    :param tag: The HTML tag of the leaf.
+    :param value: The value of the leaf.
+    :return: The text of the leaf.
+    """
+    return CODE_MARKUP.sub(" ", value) if tag == "pre" else value
+
+def collect_terms(node, terms: dict):
+    """
+    Collect the weighted terms of a parsed page from the text of its inline nodes.
+
+    Text inside headings is weighted by HEADING_BOOST.
+
+    :param node: An HTMLNode tree, a FlatDocument, or a node carrying the terms of a cached
+        page in a terms attribute.
+    :param terms: Weights of the page by term, updated in place.
+    """
+    cached = getattr(node, "terms", None)
+    if cached is not None:
+        for term, weight in cached.items():
+            terms[term] = terms.get(term, 0) + weight
+        return
+
+    if isinstance(node, FlatDocument):
+        headings = []
+        for i, kind in enumerate(node.kinds):
+            while headings and headings[-1] <= i:
+                headings.pop()
+            if kind == PARENT:
+                if node.tags[node.tag_ids[i]] in HEADING_TAGS:
+                    headings.append(node.ends[i])
+            elif node.text_ends[i] > node.text_starts[i]:
+                weight = HEADING_BOOST if headings else 1
+                add_terms(terms, leaf_text(node.tags[node.tag_ids[i]], node.text[node.text_starts[i]:node.text_ends[i]]), weight)
+        return
+
+    stack = [(node, False)]
+    while stack:
+        current, in_heading = stack.pop()
+        if current.children is not None:
+            in_heading = in_heading or current.tag in HEADING_TAGS
+            stack.extend((child, in_heading) for child in reversed(current.children))
+        elif current.value:
+            add_terms(terms, leaf_text(current.tag, current.value), HEADING_BOOST if in_heading else 1)
+
+def encode_postings(postings: list[tuple[int, int]]) -> bytes:
+    """
+    Encode the postings of a term as varints, with each document id stored as the gap from the previous one.
+
+    :param postings: (document id, weight) pairs, sorted by document id.
+    :return: The encoded bytes.
+    """
+    out = bytearray()
+    previous = 0
+    for doc_id, weight in postings:
+        for value in (doc_id - previous, weight):
+            while value >= 0x80:
+                out.append((value & 0x7F) | 0x80)
+                value >>= 7
+            out.append(value)
+        previous = doc_id
+    return bytes(out)
+
+def decode_postings(data: bytes) -> list[tuple[int, int]]:
+    """
+    Decode postings written by encode_postings.
+
+    :param data: The encoded bytes.
+    :return: (document id, weight) pairs, sorted by document id.
+    """
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+
+    postings = []
+    doc_id = 0
+    for i in range(0, len(values), 2):
+        doc_id += values[i]
+        postings.append((doc_id, values[i + 1]))
+    return postings
+
+def shard_key(term: str) -> str:
+    """
+    Get the shard of the index a term is stored in, so a client fetches one file per query term.
+
+    :param term: The search term.
+    :return: The first character of ASCII terms, or "_" for the rest.
+    """
+    first = term[0]
+    return first if first.isascii() and first.isalnum() else "_"
+
+class SearchIndex:
+    """
+    An inverted index of the pages of the site.
+
+    The weighted terms of every page are kept in a store between builds, and document ids are
+    stable, so an incremental build only tokenizes the pages it regenerates and only rewrites
+    the shards whose postings changed.
+    """
+
+    def __init__(self, output: str):
+        """
+        Initialize the SearchIndex.
+
+        :param output: The output directory the page paths are relative to.
+        """
+        self.output = output
+        self.pages = {}
+        self.ids = {}
+        self.next_id = 0
+
+    def load(self, path: str):
+        """
+        Load the store of a previous build.
+
+        :param path: Path of a store written by save.
+        """
+        try:
+            with open(path, "r") as f:
+                store = json.load(f)
+            if store.get("version") != TERMS_VERSION:
+                return
+            self.pages = store["pages"]
+            self.ids = store["ids"]
+            self.next_id = store["next_id"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def save(self, path: str):
+        """
+        Write the store, so the next incremental build can update the index.
+
+        :param path: Path of the store.
+        """
+        directory = dirname(path)
+        if directory:
+            makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"version": TERMS_VERSION, "pages": self.pages, "ids": self.ids, "next_id": self.next_id}, f)
+
+    def add_page(self, dest_path: str, title: str, terms: dict):
+        """
+        Record the terms of a generated page, replacing any previous record.
+
+        :param dest_path: Path of the generated HTML file.
+        :param title: The title of the page, whose terms are weighted by TITLE_BOOST.
+        :param terms: Weights of the page by term.
+        """
+        page = relpath(dest_path, self.output).replace("\\", "/")
+        terms = dict(terms)
+        add_terms(terms, title, TITLE_BOOST)
+        self.pages[page] = {"title": title, "terms": terms}
+        if page not in self.ids:
+            self.ids[page] = self.next_id
+            self.next_id += 1
+
+    def retain(self, pages: set[str]):
+        """
+        Forget pages that are no longer part of the site.
+
+        Document ids are reassigned once more than half of them are unused.
+
+        :param pages: Paths of every page of the site, relative to the output directory.
+        """
+        self.pages = {page: entry for page, entry in self.pages.items() if page in pages}
+        self.ids = {page: doc_id for page, doc_id in self.ids.items() if page in self.pages}
+        if len(self.ids) * 2 < self.next_id:
+            self.ids = {page: doc_id for doc_id, page in enumerate(sorted(self.pages))}
+            self.next_id = len(self.ids)
+
+    def postings(self) -> dict[str, list[tuple[int, int]]]:
+        """
+        Invert the stored pages.
+
+        :return: Sorted (document id, weight) pairs by term.
+        """
+        inverted = {}
+        for page, entry in self.pages.items():
+            doc_id = self.ids[page]
+            for term, weight in entry["terms"].items():
+                inverted.setdefault(term, []).append((doc_id, weight))
+        for postings in inverted.values():
+            postings.sort()
+        return inverted
+
+    def write(self, directory: str, basepath: str = "/") -> int:
+        """
+        Write the index as JSON files: docs.json with the URL and title of every document id,
+        and one terms-<key>.json shard per shard_key, mapping terms to base64 encoded postings.
+
+        Files whose content did not change are not rewritten.
+
+        :param directory: The directory of the index, usually SEARCH_DIR inside the output.
+        :param basepath: The basepath the page URLs start with.
+        :return: Number of files written.
+        """
+        shards = {}
+        for term, postings in sorted(self.postings().items()):
+            shards.setdefault(shard_key(term), {})[term] = b64encode(encode_postings(postings)).decode()
+
+        docs = [None] * self.next_id
+        for page, doc_id in self.ids.items():
+            url = page[:-len("index.html")] if page.endswith("index.html") else page
+            docs[doc_id] = {"url": basepath + url, "title": self.pages[page]["title"]}
+
+        files = {"docs.json": {"docs": docs, "shards": sorted(shards)}}
+        for key, terms in shards.items():
+            files[f"terms-{key}.json"] = terms
+
+        makedirs(directory, exist_ok=True)
+        written = 0
+        for name, data in files.items():
+            text = json.dumps(data, separators=(",", ":"), sort_keys=True)
+            path = join(directory, name)
+            if exists(path):
+                with open(path, "r") as f:
+                    if f.read() == text:
+                        continue
+            with open(path, "w") as f:
+                f.write(text)
+            written += 1
+
+        for name in os.listdir(directory):
+            if name.startswith("terms-") and name not in files:
+                os.remove(join(directory, name))
+
+        return written
+
+def search(directory: str, query: str) -> list[tuple[str, int]]:
+    """
+    Look up a query in a written index, the way a client would.
+
+    :param directory: The directory of the index.
+    :param query: The search query. Pages must contain every term.
+    :return: (URL, score) pairs of the matching pages, best first.
+    """
+    with open(join(directory, "docs.json"), "r") as f:
+        docs = json.load(f)["docs"]
+
+    scores = None
+    for term in set(tokenize(query)):
+        path = join(directory, f"terms-{shard_key(term)}.json")
+        postings = {}
+        if exists(path):
+            with open(path, "r") as f:
+                encoded = json.load(f).get(term)
+            if encoded is not None:
+                postings = dict(decode_postings(b64decode(encoded)))
+        if scores is None:
+            scores = postings
+        else:
+            scores = {doc_id: scores[doc_id] + weight for doc_id, weight in postings.items() if doc_id in scores}
+
+    ranked = sorted((scores or {}).items(), key=lambda item: (-item[1], item[0]))
+    return [(docs[doc_id]["url"], score) for doc_id, score in ranked]
@@ -0,0 +1,423 @@
+import os
+import sys
+
+from argparse import ArgumentParser
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from os.path import dirname, exists, isdir, join, relpath
+from shutil import rmtree
+from threading import Thread
+from time import perf_counter, sleep
+
+from assets import STRATEGIES, sync_asset
+from collection import page_url
+from main import collect_pages, copy_files, page_output, read_page, read_title, write_page
+from metadataindex import MetadataIndex, template_variables
+from template import load_template
+from treeindex import TreeIndex
+
+LIVERELOAD_PATH = "/__livereload"
+
+LIVERELOAD_SCRIPT = """<script>
+(function () {
+  var version = null;
+  function poll() {
+    fetch("%s").then(function (response) { return response.text(); }).then(function (current) {
+      if (version !== null && current !== version) { location.reload(); }
+      version = current;
+    }).catch(function () {}).finally(function () { setTimeout(poll, 500); });
+  }
+  poll();
+})();
+</script>""" % LIVERELOAD_PATH
+
+class DependencyGraph:
+    """
+    Maps each source file to the outputs it produces and each file to the sources that depend on it.
+    """
+
+    def __init__(self):
+        self.outputs = {}
+        self.dependents = {}
+
+    def add(self, source: str, output: str, depends_on: tuple = ()):
+        """
+        Record that a source produces an output.
+
+        :param source: Path to the source file.
+        :param output: Path to the output file.
+        :param depends_on: Other files the output is built from, such as the template.
+        """
+        self.outputs.setdefault(source, set()).add(output)
+        for dependency in depends_on:
+            self.dependents.setdefault(dependency, set()).add(source)
+
+    def remove(self, source: str) -> set[str]:
+        """
+        Forget a source that was deleted.
+
+        :param source: Path to the source file.
+        :return: The outputs the source produced.
+        """
+        for sources in self.dependents.values():
+            sources.discard(source)
+        return self.outputs.pop(source, set())
+
+    def outputs_of(self, source: str) -> set[str]:
+        """
+        Get the outputs a source produces.
+
+        :param source: Path to the source file.
+        :return: Set of output paths.
+        """
+        return self.outputs.get(source, set())
+
+    def dependents_of(self, path: str) -> set[str]:
+        """
+        Get the sources whose outputs are built from a file.
+
+        :param path: Path to the file, such as the template.
+        :return: Set of source paths.
+        """
+        return self.dependents.get(path, set())
+
+def snapshot(paths: list[str]) -> dict[str, tuple[int, int]]:
+    """
+    Record the modification time and size of every file under a list of paths.
+
+    :param paths: Files or directories to scan.
+    :return: Mapping of file paths to (mtime, size) pairs.
+    """
+    state = {}
+    pending = []
+
+    for path in paths:
+        if isdir(path):
+            pending.append(path)
+        elif exists(path):
+            info = os.stat(path)
+            state[path] = (info.st_mtime_ns, info.st_size)
+
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file():
+                    info = entry.stat()
+                    state[entry.path] = (info.st_mtime_ns, info.st_size)
+
+    return state
+
+def changed_paths(before: dict, after: dict) -> set[str]:
+    """
+    Compare two snapshots.
+
+    :param before: The older snapshot.
+    :param after: The newer snapshot.
+    :return: Paths that were added, removed or modified.
+    """
+    return {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+
+class Watcher:
+    """
+    Polls a set of files and directories for changes.
+    """
+
+    def __init__(self, paths: list[str]):
+        self.paths = paths
+        self.state = snapshot(paths)
+
+    def poll(self) -> set[str]:
+        """
+        Scan the watched paths again.
+
+        :return: Paths that changed since the previous scan.
+        """
+        current = snapshot(self.paths)
+        changes = changed_paths(self.state, current)
+        self.state = current
+        return changes
+
+    def watch(self, paths: list[str]):
+        """
+        Start watching more paths, without reporting their current files as changes.
+
+        :param paths: Files or directories to watch, along with the ones already watched.
+        """
+        added = [path for path in paths if path not in self.paths]
+        if added:
+            self.paths = self.paths + added
+            self.state.update(snapshot(added))
+
+class SiteBuilder:
+    """
+    Builds the site once and then rebuilds only the outputs affected by each change.
+
+    Parsed pages are kept in memory, so a template change renders every page again
+    without parsing any markdown. Front matter is kept in a MetadataIndex, so drafts are
+    left out and pages are rendered with the template they choose, like in a full build.
+    """
+
+    def __init__(self, content: str, static: str, template: str, output: str, basepath: str = "/", strategy: str = "copy"):
+        self.content = content
+        self.static = static
+        self.template = template
+        self.output = output
+        self.basepath = basepath
+        self.strategy = strategy
+        self.graph = DependencyGraph()
+        self.pages = {}
+        self.metadata = MetadataIndex()
+        self.version = 0
+
+    def page_dest(self, source: str) -> str:
+        """
+        Get the output path of a markdown page.
+
+        :param source: Path to the markdown file.
+        :return: Path to the generated HTML file.
+        """
+        directory, name = os.path.split(relpath(source, self.content))
+        return join(self.output, directory, name.replace(".md", ".html"))
+
+    def page_template(self, source: str) -> str:
+        """
+        Get the template a page is rendered with.
+
+        :param source: Path to the markdown file.
+        :return: The template named by its front matter, or the default template.
+        """
+        entry = self.metadata.get(relpath(source, self.content))
+        name = entry["fields"].get("template") if entry is not None else None
+        return join(dirname(self.template), name) if name else self.template
+
+    def template_paths(self) -> list[str]:
+        """
+        :return: The default template and every template chosen by a page.
+        """
+        return sorted({self.template, *self.metadata.templates(dirname(self.template)).values()})
+
+    def build(self):
+        """
+        Build the whole site from scratch.
+        """
+        if exists(self.output):
+            rmtree(self.output)
+        copy_files(self.static, self.output, strategy=self.strategy)
+
+        for path in snapshot([self.static]):
+            self.graph.add(path, join(self.output, relpath(path, self.static)))
+        self.metadata.update(TreeIndex(self.content), read_title)
+        for source, dest in collect_pages(self.content, self.output, drafts=set(self.metadata.drafts())):
+            self.build_page(source, dest)
+
+        self.version += 1
+
+    def build_page(self, source: str, dest: str, parse: bool = True):
+        """
+        Render a page, parsing its markdown only when asked to.
+
+        :param source: Path to the markdown file.
+        :param dest: Path to the generated HTML file.
+        :param parse: Whether to parse the markdown again or reuse the cached tree.
+        """
+        if parse or source not in self.pages:
+            self.pages[source] = read_page(source)
+        title, html_node = self.pages[source]
+        relative = relpath(source, self.content)
+        variables = {"Path": self.basepath + page_url(page_output(relative))[1:], **template_variables(self.metadata.get(relative))}
+        template = self.page_template(source)
+        write_page(dest, load_template(template, self.basepath), title, html_node, self.basepath, variables)
+        # The page may have switched templates, so only the current one triggers rebuilds
+        self.graph.remove(source)
+        self.graph.add(source, dest, (template,))
+
+    def remove(self, source: str):
+        """
+        Delete the outputs of a removed source, or of a page that became a draft.
+
+        :param source: Path to the removed file.
+        """
+        self.pages.pop(source, None)
+        for output in self.graph.remove(source):
+            if exists(output):
+                os.remove(output)
+
+    def apply(self, changes: set[str]) -> int:
+        """
+        Rebuild the outputs affected by a set of changed files.
+
+        :param changes: Paths of files that were added, removed or modified.
+        :return: Number of outputs written or removed.
+        """
+        count = 0
+        templates = self.template_paths()
+
+        for path in sorted(changes):
+            if path in templates:
+                for source in sorted(self.graph.dependents_of(path)):
+                    self.build_page(source, self.page_dest(source), parse=False)
+                    count += 1
+            elif not exists(path):
+                count += len(self.graph.outputs_of(path))
+                self.remove(path)
+                if path.startswith(self.content):
+                    self.metadata.remove_page(relpath(path, self.content))
+            elif path.startswith(self.content) and path.endswith(".md"):
+                entry = self.metadata.update_page(path, relpath(path, self.content), read_title)
+                if entry["fields"]["draft"]:
+                    count += len(self.graph.outputs_of(path))
+                    self.remove(path)
+                else:
+                    self.build_page(path, self.page_dest(path))
+                    count += 1
+            elif path.startswith(self.static):
+                dest = join(self.output, relpath(path, self.static))
+                os.makedirs(dirname(dest), exist_ok=True)
+                sync_asset(path, dest, self.strategy)
+                self.graph.add(path, dest)
+                count += 1
+
+        if count:
+            self.version += 1
+        return count
+
+def inject_livereload(html: str) -> str:
+    """
+    Add the live reload script to an HTML page.
+
+    :param html: The HTML page.
+    :return: The HTML page with the script before the closing body tag.
+    """
+    position = html.rfind("</body>")
+    if position == -1:
+        return html + LIVERELOAD_SCRIPT
+    return html[:position] + LIVERELOAD_SCRIPT + html[position:]
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    """
+    Serves the output directory under the basepath, adding the live reload script to HTML pages.
+
+    Links are rewritten to the basepath, so the output is mounted there and other paths are not found.
+    """
+
+    def __init__(self, *args, builder: SiteBuilder = None, basepath: str = "/", **kwargs):
+        self.builder = builder
+        self.prefix = basepath.rstrip("/")
+        super().__init__(*args, **kwargs)
+
+    def in_basepath(self, path: str) -> bool:
+        """
+        :param path: The path of a request, without its query.
+        :return: Whether the path is under the basepath.
+        """
+        return not self.prefix or path == self.prefix or path.startswith(self.prefix + "/")
+
+    def translate_path(self, path: str) -> str:
+        path = path.split("?", 1)[0].split("#", 1)[0]
+        if self.in_basepath(path):
+            path = path[len(self.prefix):]
+        return super().translate_path(path)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == LIVERELOAD_PATH:
+            self.send_text(str(self.builder.version), "text/plain")
+            return
+        if not self.in_basepath(path):
+            self.send_error(404)
+            return
+
+        file_path = self.translate_path(path)
+        if isdir(file_path):
+            if not path.endswith("/"):
+                # Let the base handler redirect to the trailing slash
+                super().do_GET()
+                return
+            file_path = join(file_path, "index.html")
+        if file_path.endswith(".html") and exists(file_path):
+            with open(file_path, "r") as f:
+                self.send_text(inject_livereload(f.read()), "text/html")
+            return
+
+        super().do_GET()
+
+    def send_text(self, text: str, content_type: str):
+        body = text.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def parse_args(args: list[str] = None):
+    """
+    Parse the command line arguments of the server.
+
+    :param args: The arguments to parse, defaults to sys.argv.
+    :return: The parsed arguments.
+    """
+    parser = ArgumentParser(description="Build the static site and serve it")
+    parser.add_argument("basepath", nargs="?", default="/", help="basepath used to rewrite links")
+    parser.add_argument("--content", default="./content", help="directory of markdown pages")
+    parser.add_argument("--static", default="./static", help="directory of static files")
+    parser.add_argument("--template", default="./template.html", help="HTML template for every page")
+    parser.add_argument("--output", default="./docs", help="directory the site is generated into")
+    parser.add_argument("--assets", choices=sorted(STRATEGIES), default="copy", help="how static files are written to the output")
+    parser.add_argument("--host", default="localhost", help="address to serve on")
+    parser.add_argument("--port", type=int, default=8888, help="port to serve on")
+    parser.add_argument("--watch", action="store_true", help="rebuild on changes and reload the browser")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between scans for changes")
+    return parser.parse_args(args)
+
+def serve(argv: list[str] = None):
+    """
+    Build the site, serve it and optionally rebuild it as the sources change.
+
+    :param argv: The arguments to parse, defaults to sys.argv.
+    """
+    args = parse_args(argv)
+    builder = SiteBuilder(args.content, args.static, args.template, args.output, args.basepath, args.assets)
+
+    start = perf_counter()
+    builder.build()
+    print(f"Built {len(builder.pages)} pages in {(perf_counter() - start) * 1000:.0f}ms")
+
+    handler = partial(LiveReloadHandler, directory=args.output, builder=builder, basepath=args.basepath)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving {args.output} at http://{args.host}:{args.port}{args.basepath}")
+
+    try:
+        if not args.watch:
+            while True:
+                sleep(3600)
+
+        watcher = Watcher([args.content, args.static, *builder.template_paths()])
+        while True:
+            sleep(args.interval)
+            changes = watcher.poll()
+            if not changes:
+                continue
+            start = perf_counter()
+            try:
+                count = builder.apply(changes)
+            except Exception as e:
+                print(f"Rebuild failed: {e}")
+                continue
+            finally:
+                # Pages may have chosen another template
+                watcher.watch(builder.template_paths())
+            print(f"Rebuilt {count} outputs in {(perf_counter() - start) * 1000:.0f}ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    sys.exit(serve())
@@ -0,0 +1,160 @@
+import json
+import os
+
+from hashlib import sha256
+from os.path import exists, join, relpath
+from shutil import rmtree
+
+from assets import sync_asset
+
+# Name of the manifest every shard writes at the root of its output directory
+SHARD_MANIFEST = ".shard-manifest.json"
+
+def shard_of(relative_path: str, count: int) -> int:
+    """
+    Assign a file to a shard by a stable hash of its path.
+
+    The hash does not depend on the process or the platform, so every host agrees on the split.
+
+    :param relative_path: Path of the file relative to the root of its tree.
+    :param count: Number of shards.
+    :return: The index of the shard, from 0 to count - 1.
+    """
+    key = relative_path.replace(os.sep, "/").encode()
+    return int.from_bytes(sha256(key).digest()[:8], "big") % count
+
+class Shard:
+    """
+    One of N independent parts of a build.
+    """
+
+    def __init__(self, index: int, count: int):
+        """
+        Initialize the Shard.
+
+        :param index: The index of the shard, from 0 to count - 1.
+        :param count: Number of shards.
+        """
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"Invalid shard {index}/{count}, expected 0 <= index < count")
+        self.index = index
+        self.count = count
+
+    def includes(self, path: str, root: str) -> bool:
+        """
+        Check whether a file belongs to this shard.
+
+        :param path: Path to the file.
+        :param root: Root of the tree the file is in, such as the content directory.
+        :return: True if this shard builds the file.
+        """
+        return shard_of(relpath(path, root), self.count) == self.index
+
+    def output(self, path: str) -> str:
+        """
+        Get the path this shard writes instead of an output of the whole site.
+
+        :param path: An output directory or file of the whole site.
+        :return: A sibling path named after the shard.
+        """
+        return f"{path.rstrip('/')}.shard-{self.index}-of-{self.count}"
+
+def parse_shard(spec: str) -> Shard:
+    """
+    Parse a shard given as index/count, such as 0/4.
+
+    :param spec: The shard specification.
+    :return: The Shard.
+    """
+    index, separator, count = spec.partition("/")
+    if not separator or not index.isdigit() or not count.isdigit():
+        raise ValueError(f"Invalid shard {spec}, expected index/count such as 0/4")
+    return Shard(int(index), int(count))
+
+def load_shard_manifest(shard_dir: str) -> dict:
+    """
+    Read the manifest a shard wrote into its output directory.
+
+    :param shard_dir: The output directory of the shard.
+    :return: The manifest.
+    """
+    path = join(shard_dir, SHARD_MANIFEST)
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RuntimeError(f"Cannot read shard manifest {path}: {e}")
+    if "shard" not in manifest:
+        raise RuntimeError(f"{path} is not the manifest of a sharded build")
+    return manifest
+
+def list_outputs(shard_dir: str) -> list[str]:
+    """
+    List the files a shard generated.
+
+    :param shard_dir: The output directory of the shard.
+    :return: Sorted paths relative to the output directory, without the shard manifest.
+    """
+    found = []
+    for directory, _, files in os.walk(shard_dir):
+        for name in files:
+            path = relpath(join(directory, name), shard_dir)
+            if path != SHARD_MANIFEST:
+                found.append(path)
+    return sorted(found)
+
+def merge_shards(shard_dirs: list[str], output: str, strategy: str = "copy") -> dict:
+    """
+    Combine the output directories of every shard of a build into the final output tree.
+
+    The shards must come from the same build settings and cover every index exactly once.
+    Nothing is written when two shards generated the same output path.
+
+    :param shard_dirs: The output directories of the shards.
+    :param output: The directory the site is merged into.
+    :param strategy: How files are written, one of copy, hardlink, reflink or sendfile.
+    :return: The merged build manifest, with destinations inside the output directory.
+    """
+    manifests = [load_shard_manifest(shard_dir) for shard_dir in shard_dirs]
+
+    counts = {manifest["shard"]["count"] for manifest in manifests}
+    if len(counts) != 1:
+        raise RuntimeError(f"Shards come from builds with different shard counts: {sorted(counts)}")
+    count = counts.pop()
+    indexes = sorted(manifest["shard"]["index"] for manifest in manifests)
+    if indexes != list(range(count)):
+        raise RuntimeError(f"Expected shards 0 to {count - 1} exactly once, got {indexes}")
+    # Settings such as the basepath, the templates or the asset map, which every page depends on
+    settings = sorted({key for manifest in manifests for key in manifest} - {"files", "shard"})
+    for key in settings:
+        if len({json.dumps(manifest.get(key), sort_keys=True) for manifest in manifests}) != 1:
+            raise RuntimeError(f"Shards were built with a different {key}")
+
+    owners = {}
+    collisions = []
+    for shard_dir in shard_dirs:
+        for path in list_outputs(shard_dir):
+            if path in owners:
+                collisions.append(f"{path} ({owners[path]}, {shard_dir})")
+            else:
+                owners[path] = shard_dir
+    if collisions:
+        raise RuntimeError(f"{len(collisions)} output(s) collide between shards: {', '.join(collisions)}")
+
+    merged = {key: manifests[0][key] for key in settings}
+    merged["files"] = {}
+    for shard_dir, manifest in zip(shard_dirs, manifests):
+        for src, entry in manifest["files"].items():
+            path = relpath(entry["dest"], manifest["shard"]["output"])
+            if owners.get(path) != shard_dir:
+                raise RuntimeError(f"Shard {shard_dir} is missing its output {path}")
+            merged["files"][src] = dict(entry, dest=join(output, path))
+
+    if exists(output):
+        rmtree(output)
+    for path, shard_dir in owners.items():
+        dest = join(output, path)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        sync_asset(join(shard_dir, path), dest, strategy)
+
+    return merged
@@ -0,0 +1,116 @@
+import mmap
+import os
+
+from frontmatter import DELIMITER, parse_front_matter
+
+BLOCK_SEPARATOR = b"\n\n"
+TITLE_MARKER = b"# "
+
+class SourceFile:
+    """
+    A markdown file mapped into memory, scanned as bytes and decoded one block at a time.
+
+    Block boundaries, the front matter and the title are found with mmap.find, so the file
+    is never decoded whole nor split into a list of strings. Only files with Unix line
+    endings can be scanned this way, others are read as text like before.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the SourceFile. The file is mapped when the context is entered.
+
+        :param path: Path to the markdown file.
+        """
+        self.path = path
+        self.data = b""
+        self.view = memoryview(b"")
+        self._map = None
+
+    def __enter__(self):
+        with open(self.path, "rb") as f:
+            # Empty files cannot be mapped, and the map keeps its own handle open
+            if os.fstat(f.fileno()).st_size:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.data = self._map
+                self.view = memoryview(self._map)
+        return self
+
+    def __exit__(self, *exc):
+        self.view.release()
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # A slice is still referenced, such as by a traceback; the map is closed when it is collected
+                pass
+        self._map = None
+        self.data = b""
+        return False
+
+    @property
+    def scannable(self) -> bool:
+        """
+        Whether the file can be scanned as bytes, which needs its line endings to be \\n only.
+        """
+        return self.data.find(b"\r") == -1
+
+    def read_front_matter(self) -> tuple[dict, int]:
+        """
+        Parse the front matter, decoding its lines only.
+
+        :return: A (front matter, byte offset of the body) pair, empty and 0 without front matter.
+        """
+        delimiter = DELIMITER.encode()
+        if self.data[:len(delimiter)] != delimiter:
+            return {}, 0
+        end = self.line_end(0)
+        if self.data[:end].rstrip() != delimiter:
+            return {}, 0
+        lines = []
+        while end < len(self.data):
+            start = end + 1
+            end = self.line_end(start)
+            line = self.data[start:end]
+            if line.rstrip() == delimiter:
+                return parse_front_matter(lines), min(end + 1, len(self.data))
+            lines.append(line.decode("utf-8"))
+        return {}, 0
+
+    def line_end(self, start: int) -> int:
+        """
+        :param start: The byte offset of a line.
+        :return: The offset of the newline ending the line, or the size of the file.
+        """
+        end = self.data.find(b"\n", start)
+        return end if end != -1 else len(self.data)
+
+    def title(self, start: int = 0) -> str:
+        """
+        Find the title, the first line starting with "# ".
+
+        :param start: The byte offset of the body.
+        :return: The title, decoded from its line alone.
+        """
+        pos = self.data.find(TITLE_MARKER, start)
+        while pos != -1:
+            if pos == start or self.data[pos - 1] == ord("\n"):
+                return str(self.view[pos + len(TITLE_MARKER):self.line_end(pos)], "utf-8").strip()
+            pos = self.data.find(TITLE_MARKER, pos + 1)
+        return "Untitled Document"
+
+    def blocks(self, start: int = 0):
+        """
+        Generate the blocks of the body, the same as markdown_to_blocks on the decoded body.
+
+        :param start: The byte offset of the body.
+        :return: An iterator over the non-empty blocks, each decoded from its own slice.
+        """
+        size = len(self.data)
+        while start <= size:
+            end = self.data.find(BLOCK_SEPARATOR, start)
+            if end == -1:
+                end = size
+            block = str(self.view[start:end], "utf-8").strip()
+            if block:
+                yield block
+            start = end + len(BLOCK_SEPARATOR)
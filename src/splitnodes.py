@@ -147,18 +147,113 @@ def split_nodes_image(old_nodes):
 
     return new_nodes
 
-def text_to_textnodes(text: str):
+INLINE_DELIMITERS = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+
+def text_to_textnodes(text: str) -> list[TextNode]:
     """
     Convert a plain text string to a list of TextNode objects.
 
+    The text is tokenized in a single left-to-right pass. Images and links are matched
+    where they start, and bold, italic and code spans run to their closing delimiter.
+    Images and links take precedence, so a span is not closed past the start of one, and
+    delimiters that are never closed are kept as plain text.
+
     :param text: The plain text string to convert.
     :return: List of TextNode objects.
     """
-    
-    new_nodes = split_nodes_image([TextNode(text, TextType.TEXT)])
-    new_nodes = split_nodes_link(new_nodes)
-    new_nodes = split_nodes_delimiter(new_nodes, "**", TextType.BOLD)
-    new_nodes = split_nodes_delimiter(new_nodes, "_", TextType.ITALIC)
-    new_nodes = split_nodes_delimiter(new_nodes, "`", TextType.CODE)
+    nodes = []
+    length = len(text)
+    plain_start = 0
+    pos = 0
+
+    # Position of the next occurrence of each closing marker, so no part of the text is searched twice
+    next_found = {}
+
+    def find_next(marker: str, start: int) -> int:
+        found = next_found.get(marker)
+        if found is None or (found != -1 and found < start):
+            found = text.find(marker, start)
+            next_found[marker] = found
+        return found
+
+    def flush(end: int):
+        if end > plain_start:
+            nodes.append(TextNode(text[plain_start:end], TextType.TEXT))
+
+    while pos < length:
+        char = text[pos]
+
+        if char == "!" and text.startswith("[", pos + 1):
+            match = match_link(text, pos + 1, find_next, allow_empty_text=True)
+            if match:
+                flush(pos)
+                nodes.append(TextNode(match[0], TextType.IMAGE, url=match[1]))
+                pos = plain_start = match[2]
+                continue
+        elif char == "[":
+            match = match_link(text, pos, find_next)
+            if match:
+                flush(pos)
+                nodes.append(TextNode(match[0], TextType.LINK, url=match[1]))
+                pos = plain_start = match[2]
+                continue
+        elif char in "*_`":
+            delimiter = "**" if text.startswith("**", pos) else char
+            if delimiter in INLINE_DELIMITERS:
+                close = find_next(delimiter, pos + len(delimiter))
+                if close != -1 and not has_link(text, pos + len(delimiter), close):
+                    flush(pos)
+                    if close > pos + len(delimiter):
+                        nodes.append(TextNode(text[pos + len(delimiter):close], INLINE_DELIMITERS[delimiter]))
+                    pos = plain_start = close + len(delimiter)
+                    continue
+
+        pos += 1
+
+    flush(length)
+
+    return nodes
+
+def has_link(text: str, start: int, end: int) -> bool:
+    """
+    Check whether an image or a link starts in part of a text.
+
+    :param text: The text to search.
+    :param start: Start position of the part.
+    :param end: End position of the part.
+    :return: True if an image or link starts at or after start and before end.
+    """
+    # A separate finder, since find_next only moves forward through the text
+    find = lambda marker, after: text.find(marker, after)
+    pos = text.find("[", start, end)
+    while pos != -1:
+        if match_link(text, pos, find, allow_empty_text=text[pos - 1] == "!"):
+            return True
+        pos = text.find("[", pos + 1, end)
+    return False
+
+def match_link(text: str, pos: int, find_next, allow_empty_text: bool = False):
+    """
+    Match a markdown link of the form [text](url) starting at a given position.
+
+    :param text: The text to match in.
+    :param pos: Position of the opening bracket.
+    :param find_next: Function returning the next position of a marker at or after a start position.
+    :param allow_empty_text: Whether the bracketed text may be empty, as it may for images.
+    :return: A (text, url, end position) tuple, or None if there is no link at the position.
+    """
+    close_bracket = find_next("]", pos + 1)
+    if close_bracket == -1 or not text.startswith("(", close_bracket + 1):
+        return None
+    if close_bracket == pos + 1 and not allow_empty_text:
+        return None
+
+    close_paren = find_next(")", close_bracket + 2)
+    if close_paren == -1 or close_paren == close_bracket + 2:
+        return None
 
-    return new_nodes
\ No newline at end of file
+    return text[pos + 1:close_bracket], text[close_bracket + 2:close_paren], close_paren + 1
@@ -0,0 +1,146 @@
+import re
+
+from os import stat
+
+SLOT_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+SRCSET_PATTERN = re.compile(r'srcset="([^"]*)"')
+LINK_PATTERN = re.compile(r'(href|src)="(/[^"?#]*)')
+
+def rewrite_basepath(html: str, basepath: str = "/", assets: dict = None) -> str:
+    """
+    Rewrite root-relative href, src and srcset attributes to start with the basepath.
+
+    :param html: The HTML string to rewrite.
+    :param basepath: The basepath used to rewrite links.
+    :param assets: Optional fingerprinted URLs by original URL, looked up once per link.
+    :return: The rewritten HTML string.
+    """
+    if assets:
+        html = LINK_PATTERN.sub(lambda match: f'{match.group(1)}="{basepath}{assets.get(match.group(2), match.group(2))[1:]}', html)
+    else:
+        html = html.replace('href="/', f'href="{basepath}').replace('src="/', f'src="{basepath}')
+    if 'srcset="' in html:
+        html = SRCSET_PATTERN.sub(lambda match: rewrite_srcset(match.group(1), basepath, assets), html)
+    return html
+
+def rewrite_srcset(srcset: str, basepath: str, assets: dict = None) -> str:
+    """
+    Rewrite the root-relative candidates of a srcset attribute to start with the basepath.
+
+    :param srcset: The value of the attribute.
+    :param basepath: The basepath used to rewrite links.
+    :param assets: Optional fingerprinted URLs by original URL.
+    :return: The rewritten attribute.
+    """
+    candidates = []
+    for candidate in srcset.split(", "):
+        if candidate.startswith("/"):
+            url, space, descriptor = candidate.partition(" ")
+            if assets:
+                url = assets.get(url, url)
+            candidate = f"{basepath}{url[1:]}{space}{descriptor}"
+        candidates.append(candidate)
+    return f'srcset="{", ".join(candidates)}"'
+
+class Slot:
+    """
+    A named placeholder in a template, such as {{ Title }}.
+    """
+
+    def __init__(self, name: str, raw: str):
+        """
+        Initialize the Slot with its name and original text.
+
+        :param name: The name of the variable that fills the slot.
+        :param raw: The placeholder as written in the template.
+        """
+        self.name = name
+        self.raw = raw
+
+    def __eq__(self, value):
+        return isinstance(value, Slot) and self.name == value.name
+
+    def __repr__(self):
+        return f"Slot({self.name})"
+
+class Template:
+    """
+    A template parsed into literal segments and slots.
+    """
+
+    def __init__(self, segments: list):
+        """
+        Initialize the Template with its segments.
+
+        :param segments: List of literal strings and Slot objects, in output order.
+        """
+        self.segments = segments
+
+    def render(self, fp, variables: dict):
+        """
+        Write the template to a file object, filling each slot from the variables.
+
+        A variable can be a string or an iterable of string fragments, which are
+        written one at a time. Slots without a variable are written unchanged.
+
+        :param fp: A text file object to write to.
+        :param variables: Mapping of slot names to their values.
+        """
+        for segment in self.segments:
+            if not isinstance(segment, Slot):
+                fp.write(segment)
+                continue
+
+            value = variables.get(segment.name)
+            if value is None:
+                fp.write(segment.raw)
+            elif isinstance(value, str):
+                fp.write(value)
+            else:
+                fp.writelines(value)
+
+def compile_template(text: str, basepath: str = "/", assets: dict = None) -> Template:
+    """
+    Parse template text into literal segments and slots.
+
+    :param text: The template text.
+    :param basepath: The basepath applied to links in the literal segments.
+    :param assets: Optional fingerprinted URLs by original URL, applied to links in the literal segments.
+    :return: The compiled Template.
+    """
+    segments = []
+    pos = 0
+
+    for match in SLOT_PATTERN.finditer(text):
+        if match.start() > pos:
+            segments.append(rewrite_basepath(text[pos:match.start()], basepath, assets))
+        segments.append(Slot(match.group(1), match.group(0)))
+        pos = match.end()
+
+    if pos < len(text):
+        segments.append(rewrite_basepath(text[pos:], basepath, assets))
+
+    return Template(segments)
+
+_template_cache = {}
+
+def load_template(path: str, basepath: str = "/", assets=None) -> Template:
+    """
+    Load and compile a template file, reusing the compiled template while the file is unchanged.
+
+    :param path: Path to the template file.
+    :param basepath: The basepath applied to links in the literal segments.
+    :param assets: Optional AssetMap applied to links in the literal segments.
+    :return: The compiled Template.
+    """
+    info = stat(path)
+    version = (info.st_mtime_ns, info.st_size)
+    key = (path, basepath, assets.version if assets is not None else None)
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with open(path, "r") as f:
+        template = compile_template(f.read(), basepath, assets.urls if assets is not None else None)
+    _template_cache[key] = (version, template)
+    return template
@@ -0,0 +1,44 @@
+import unittest
+
+from os.path import join, samefile
+from tempfile import TemporaryDirectory
+
+from assets import STRATEGIES, sync_asset
+
+class TestAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.src = join(self.tmp.name, "image.png")
+        self.dest = join(self.tmp.name, "out.png")
+        with open(self.src, "wb") as f:
+            f.write(bytes(range(256)) * 1024)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_strategies_copy_content(self):
+        for strategy in STRATEGIES:
+            with self.subTest(strategy=strategy):
+                sync_asset(self.src, self.dest, strategy)
+                self.assertEqual(self.read(self.dest), self.read(self.src))
+
+    def test_hardlink_shares_file(self):
+        sync_asset(self.src, self.dest, "hardlink")
+        self.assertTrue(samefile(self.src, self.dest))
+
+    def test_sync_replaces_linked_output(self):
+        sync_asset(self.src, self.dest, "hardlink")
+        sync_asset(self.src, self.dest, "copy")
+        self.assertFalse(samefile(self.src, self.dest))
+        self.assertEqual(self.read(self.dest), self.read(self.src))
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            sync_asset(self.src, self.dest, "teleport")
+
+if __name__ == "__main__":
+    unittest.main()
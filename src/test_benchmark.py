@@ -0,0 +1,48 @@
+import os
+import unittest
+
+from os.path import exists
+from tempfile import TemporaryDirectory
+
+from benchmark import bench_build, compare_results, measure, run_benchmarks
+from main import text_to_parts
+from corpus import CorpusSettings
+
+def report(mb_per_sec):
+    return {"results": {"build": {"mb_per_sec": mb_per_sec}}}
+
+class TestBenchmark(unittest.TestCase):
+    def test_compare_results(self):
+        self.assertEqual(compare_results(report(9.5), report(10.0), 0.1), [])
+        regressions = compare_results(report(5.0), report(10.0), 0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("build:"))
+
+    def test_compare_results_missing_baseline(self):
+        self.assertEqual(compare_results(report(5.0), {"results": {}}), [])
+
+    def test_measure_clears_memos(self):
+        text_to_parts("warm **cache**")
+        measure(lambda: text_to_parts("warm **cache**"), repeat=3)
+        self.assertEqual((text_to_parts.hits, text_to_parts.misses), (0, 1))
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(CorpusSettings(pages=3, depth=1), repeat=1)["results"]
+        self.assertIn("classify_lists", results)
+        self.assertIn("build", results)
+        self.assertEqual(results["build"]["items"], 3)
+        self.assertLess(results["traversal"]["syscalls"], results["traversal"]["legacy_syscalls"])
+        self.assertLess(results["scan_mmap"]["peak_bytes"], results["scan_text"]["peak_bytes"])
+
+    def test_build_keeps_state_in_tmp(self):
+        cwd = os.getcwd()
+        with TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                bench_build(CorpusSettings(pages=2, depth=1), repeat=1)
+            finally:
+                os.chdir(cwd)
+            self.assertFalse(exists(os.path.join(tmp, ".build")))
+
+if __name__ == "__main__":
+    unittest.main()
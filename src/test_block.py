@@ -1,5 +1,6 @@
 import unittest
-from blocknode import markdown_to_blocks, block_to_block_type, BlockType
+from io import StringIO
+from blocknode import markdown_to_blocks, block_to_block_type, remove_block_markers, classify_block, BlockType, BlockReader
 
 class TestBlock(unittest.TestCase):
     def test_markdown_to_blocks(self):
@@ -33,4 +34,30 @@ This is the same paragraph on a new line
         self.assertEqual(block_to_block_type("> This is a quote"), BlockType.QUOTE)
         self.assertEqual(block_to_block_type("- Item 1\n- Item 2"), BlockType.UNORDERED_LIST)
         self.assertEqual(block_to_block_type("1. First item\n2. Second item"), BlockType.ORDERED_LIST)
-        self.assertEqual(block_to_block_type("Just a paragraph."), BlockType.PARAGRAPH)
\ No newline at end of file
+        self.assertEqual(block_to_block_type("Just a paragraph."), BlockType.PARAGRAPH)
+
+    def test_block_reader_matches_markdown_to_blocks(self):
+        md = "\n\nIntro  \n\n\n# Title\n\n- one\n- two\n \nsame block\n\n\n\n```\ncode\n```\n"
+        reader = BlockReader(StringIO(md))
+        self.assertEqual(list(reader), markdown_to_blocks(md))
+        self.assertEqual(reader.title, "Title")
+
+    def test_block_reader_without_title(self):
+        reader = BlockReader(StringIO("just text"))
+        self.assertEqual(list(reader), ["just text"])
+        self.assertIsNone(reader.title)
+
+    def test_classify_block(self):
+        self.assertEqual(classify_block("## Heading"), (BlockType.HEADING, "Heading"))
+        self.assertEqual(classify_block("```\ncode\n```"), (BlockType.CODE, "code\n"))
+        self.assertEqual(classify_block(">one\n> two"), (BlockType.QUOTE, "one\n two"))
+        self.assertEqual(classify_block("- a\n- b"), (BlockType.UNORDERED_LIST, "a\nb"))
+        self.assertEqual(classify_block("1. a\n2. b"), (BlockType.ORDERED_LIST, "a\nb"))
+        self.assertEqual(classify_block("1. a\n3. b"), (BlockType.PARAGRAPH, "1. a 3. b"))
+        self.assertEqual(classify_block("- a\nb"), (BlockType.PARAGRAPH, "- a b"))
+
+    def test_classify_block_matches_two_pass(self):
+        blocks = ["#######", "# ", "#\tx", "-", "- ", "-\tx\n- y", ">", "> a\nb", "1. ", "1.  \n2. x", "01. x", "```", "````", "text\nmore"]
+        for block in blocks:
+            block_type = block_to_block_type(block)
+            self.assertEqual(classify_block(block), (block_type, remove_block_markers(block, block_type)), block)
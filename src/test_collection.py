@@ -0,0 +1,106 @@
+import unittest
+
+from datetime import datetime, timezone
+from os import listdir, makedirs
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from collection import Collection, PageMeta, base_url, build_collections, page_meta, page_url, parse_date, stale_listings
+from main import page_output, read_title, write_collection
+from metadataindex import MetadataIndex
+from treeindex import TreeIndex
+
+def page(name, day, description=""):
+    return PageMeta(f"content/blog/{name}.md", f"/blog/{name}.html", name.title(), datetime(2024, 1, day, tzinfo=timezone.utc), description)
+
+class TestCollection(unittest.TestCase):
+    def test_parse_date(self):
+        self.assertEqual(parse_date("2024-05-01"), datetime(2024, 5, 1, tzinfo=timezone.utc))
+        self.assertEqual(parse_date("2024-05-01T12:00:00+02:00").hour, 12)
+
+    def test_urls(self):
+        self.assertEqual(page_url("blog/tom/index.html"), "/blog/tom/")
+        self.assertEqual(page_url("index.html"), "/")
+        self.assertEqual(page_url("blog/post.html"), "/blog/post.html")
+        self.assertEqual(base_url("https://example.com/", "/site/"), "https://example.com/site/")
+        self.assertEqual(base_url("", "/"), "/")
+
+    def test_listings(self):
+        collection = Collection("blog", [page(f"p{day}", day) for day in range(1, 6)], page_size=2)
+        self.assertEqual(collection.page_count, 3)
+        self.assertEqual([[p.title for p in pages] for _, pages in collection.listings()], [["P5", "P4"], ["P3", "P2"], ["P1"]])
+        self.assertEqual(collection.listing_path(1), join("blog", "index.html"))
+        self.assertEqual(collection.listing_path(3), join("blog", "page", "3", "index.html"))
+
+        html = "".join(collection.render_listing(2, collection.pages[2:4]))
+        self.assertIn('<a href="/blog/" rel="prev">Newer</a>', html)
+        self.assertIn('<a href="/blog/page/3/" rel="next">Older</a>', html)
+        self.assertIn('<a href="/blog/p3.html">P3</a> <time datetime="2024-01-03T00:00:00+00:00">2024-01-03</time>', html)
+
+        collection = Collection("blog", [], has_index=True)
+        self.assertEqual(collection.page_count, 1)
+        self.assertEqual(collection.listing_path(1), join("blog", "page", "1", "index.html"))
+
+    def test_feed(self):
+        collection = Collection("blog", [page("old", 1), page("new", 2, "Fish & chips")])
+        feed = collection.render_feed("https://example.com/", size=1)
+        self.assertIn("<updated>2024-01-02T00:00:00+00:00</updated>", feed)
+        self.assertIn('<link href="https://example.com/blog/new.html"/>', feed)
+        self.assertIn("<summary>Fish &amp; chips</summary>", feed)
+        self.assertNotIn("old.html", feed)
+
+    def test_feed_needs_site_url(self):
+        with TemporaryDirectory() as tmp:
+            template = join(tmp, "template.html")
+            with open(template, "w") as f:
+                f.write("<title>{{ Title }}</title>{{ Content }}")
+            output = join(tmp, "docs")
+            collection = Collection("blog", [page("old", 1), page("new", 2)])
+            feed = join("blog", "feed.xml")
+            self.assertIn(feed, write_collection(collection, template, output, "/", "https://example.com"))
+            self.assertEqual(write_collection(collection, template, output, "/"), [join("blog", "index.html")])
+            self.assertEqual(listdir(join(output, "blog")), ["index.html"])
+
+    def test_build_collections(self):
+        with TemporaryDirectory() as tmp:
+            makedirs(join(tmp, "blog", "post"))
+            makedirs(join(tmp, "news"))
+            with open(join(tmp, "blog", "post", "index.md"), "w") as f:
+                f.write("---\ndate: 2024-02-01\ndescription: About it\n---\n# Post\n\nBody")
+            with open(join(tmp, "blog", "other.md"), "w") as f:
+                f.write("# Other\n")
+            with open(join(tmp, "blog", "draft.md"), "w") as f:
+                f.write("---\ndraft: true\n---\n# Draft\n")
+            with open(join(tmp, "news", "index.md"), "w") as f:
+                f.write("# News\n")
+
+            metadata = MetadataIndex(join(tmp, "metadata.json"))
+            metadata.update(TreeIndex(tmp), read_title)
+            blog, news = build_collections(metadata, tmp, ["blog", "news/"], page_output)
+            self.assertEqual([(p.url, p.title) for p in blog.pages][-1], ("/blog/post/", "Post"))
+            self.assertEqual(blog.pages[-1].description, "About it")
+            self.assertEqual(blog.pages[-1].source, join(tmp, "blog", "post", "index.md"))
+            self.assertNotIn("Draft", [p.title for p in blog.pages])
+            self.assertFalse(blog.has_index)
+            self.assertEqual((news.pages, news.has_index), ([], True))
+
+            blog, = build_collections(metadata, tmp, ["blog"], page_output, include_drafts=True)
+            self.assertIn("Draft", [p.title for p in blog.pages])
+
+    def test_invalid_date(self):
+        entry = {"mtime": 0, "title": "Post", "fields": {"date": "yesterday"}}
+        with self.assertRaises(ValueError):
+            page_meta("post.md", "/post.html", entry)
+        entry = {"mtime": 86_400_000_500_000_000, "title": "Post", "fields": {}}
+        self.assertEqual(page_meta("post.md", "/post.html", entry).date, datetime.fromtimestamp(86_400_000, timezone.utc))
+
+    def test_stale_listings(self):
+        with TemporaryDirectory() as tmp:
+            for number in ["2", "3", "archive"]:
+                makedirs(join(tmp, "blog", "page", number))
+            collection = Collection("blog", [page("a", 1), page("b", 2)], page_size=1)
+            self.assertEqual(stale_listings(tmp, collection), [join(tmp, "blog", "page", "3")])
+            self.assertEqual(stale_listings(join(tmp, "missing"), collection), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import gzip
+import os
+import unittest
+
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+
+from compress import Compressor, compress_file
+from manifest import hash_file
+
+HTML = "<html><body>" + "<p>Hobbits like second breakfast.</p>" * 200 + "</body></html>"
+
+class TestCompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.output = self.tmp.name
+        self.page = join(self.output, "index.html")
+        with open(self.page, "w") as f:
+            f.write(HTML)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_compress_file(self):
+        self.assertTrue(compress_file(self.page))
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), HTML)
+        with open(self.page + ".gz", "rb") as f:
+            first = f.read()
+        compress_file(self.page)
+        with open(self.page + ".gz", "rb") as f:
+            self.assertEqual(f.read(), first)
+
+    def test_incompressible_file(self):
+        path = join(self.output, "noise.css")
+        with open(path, "wb") as f:
+            f.write(os.urandom(4096))
+        with open(path + ".gz", "w") as f:
+            f.write("stale")
+        self.assertFalse(compress_file(path))
+        self.assertFalse(exists(path + ".gz"))
+        self.assertFalse(exists(path + ".gz.tmp"))
+
+    def test_skips_unchanged_outputs(self):
+        store = join(self.output, "store.json")
+        image = join(self.output, "logo.png")
+        with open(image, "w") as f:
+            f.write(HTML)
+
+        compressor = Compressor(self.output, threads=2)
+        compressor.submit(self.page)
+        compressor.submit(image)
+        self.assertEqual(compressor.finish(), {"compressed": 1, "incompressible": 0, "unchanged": 0})
+        self.assertFalse(exists(image + ".gz"))
+        compressor.save(store)
+
+        compressor = Compressor(self.output)
+        compressor.load(store)
+        compressor.submit(self.page)
+        self.assertEqual(compressor.finish()["unchanged"], 1)
+
+        with open(self.page, "a") as f:
+            f.write("<!-- changed -->")
+        compressor = Compressor(self.output)
+        compressor.load(store)
+        compressor.submit(self.page)
+        self.assertEqual(compressor.finish()["compressed"], 1)
+        self.assertEqual(compressor.entries["index.html"]["hash"], hash_file(self.page))
+
+    def test_removes_siblings_of_removed_outputs(self):
+        store = join(self.output, "store.json")
+        compressor = Compressor(self.output)
+        compressor.submit(self.page)
+        compressor.finish()
+        compressor.save(store)
+
+        os.remove(self.page)
+        compressor = Compressor(self.output)
+        compressor.load(store)
+        compressor.finish()
+        self.assertFalse(exists(self.page + ".gz"))
+        self.assertEqual(compressor.entries, {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from os import walk
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from corpus import CorpusSettings, generate_corpus, page_directory
+
+def read_tree(path):
+    files = {}
+    for root, _, names in walk(path):
+        for name in names:
+            with open(join(root, name)) as f:
+                files[join(root, name)[len(path):]] = f.read()
+    return files
+
+class TestCorpus(unittest.TestCase):
+    def test_page_directory(self):
+        self.assertEqual(page_directory("content", 123, 2), join("content", "section-1", "section-2", "page-123"))
+        self.assertEqual(page_directory("content", 7, 0), join("content", "page-7"))
+
+    def test_generate_corpus_is_deterministic(self):
+        settings = CorpusSettings(pages=20, depth=1, seed=42)
+        with TemporaryDirectory() as first, TemporaryDirectory() as second:
+            generate_corpus(first, settings)
+            generate_corpus(second, settings)
+            self.assertEqual(read_tree(first), read_tree(second))
+
+    def test_generate_corpus_pages(self):
+        with TemporaryDirectory() as tmp:
+            site = generate_corpus(tmp, CorpusSettings(pages=15, depth=1))
+            pages = [path for path in read_tree(site["content"]) if path.endswith("index.md")]
+            self.assertEqual(len(pages), 15)
+            self.assertGreater(site["bytes"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
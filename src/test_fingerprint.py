@@ -0,0 +1,104 @@
+import json
+import unittest
+
+from hashlib import sha256
+from os import listdir, makedirs
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from fingerprint import AssetMap, fingerprint_files, fingerprint_path, get_asset_map, use_asset_map
+from main import collect_pages, copy_files, generate_pages
+from manifest import hash_file
+from treeindex import TreeIndex
+
+class TestFingerprint(unittest.TestCase):
+    def test_fingerprint_path(self):
+        self.assertEqual(fingerprint_path("images/a.b.png", "0123456789abcdef"), "images/a.b.0123456789.png")
+
+    def test_asset_map(self):
+        assets = AssetMap()
+        version = assets.version
+        self.assertEqual(assets.add("css/site.css", "ab" * 32), "css/site.ababababab.css")
+        self.assertNotEqual(assets.version, version)
+        self.assertEqual(assets.urls, {"/css/site.css": "/css/site.ababababab.css"})
+        self.assertEqual(assets.output("css/site.css"), "css/site.ababababab.css")
+        self.assertEqual(assets.output("robots.txt"), "robots.txt")
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, "assets.json")
+            assets.write(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f), {"css/site.css": "css/site.ababababab.css"})
+
+    def test_fingerprinted_site(self):
+        with TemporaryDirectory() as tmp:
+            static = join(tmp, "static")
+            content = join(tmp, "content")
+            makedirs(join(static, "images"))
+            makedirs(content)
+            for name, text in [("index.css", "body {}"), ("robots.txt", "User-agent: *"), (join("images", "a.png"), "png")]:
+                with open(join(static, name), "w") as f:
+                    f.write(text)
+            with open(join(content, "index.md"), "w") as f:
+                f.write("# Home\n\n![a](/images/a.png) and [robots](/robots.txt)")
+            template = join(tmp, "template.html")
+            with open(template, "w") as f:
+                f.write('<link href="/index.css?v=1">{{ Content }}')
+
+            index = TreeIndex(static)
+            assets = fingerprint_files(index)
+            self.assertEqual(len(assets), 2)
+            css = fingerprint_path("index.css", hash_file(join(static, "index.css")))
+            image = fingerprint_path("images/a.png", hash_file(join(static, "images", "a.png")))
+
+            previous = get_asset_map()
+            try:
+                use_asset_map(assets)
+                for jobs in [1, 2]:
+                    output = join(tmp, f"out{jobs}")
+                    copy_files(static, output, index=index, assets=assets)
+                    self.assertEqual(sorted(listdir(output)), sorted([css, "images", "robots.txt"]))
+                    generate_pages(collect_pages(content, output), template, "/site/", jobs=jobs)
+                    with open(join(output, "index.html")) as f:
+                        html = f.read()
+                    self.assertIn(f'<link href="/site/{css}?v=1">', html)
+                    self.assertIn(f'<img src="/site/{image}" alt="a">', html)
+                    self.assertIn('<a href="/site/robots.txt">', html)
+            finally:
+                use_asset_map(previous)
+
+    def test_stylesheet_urls(self):
+        with TemporaryDirectory() as tmp:
+            static = join(tmp, "static")
+            makedirs(join(static, "css"))
+            makedirs(join(static, "images"))
+            files = {
+                join("images", "a.png"): "png",
+                join("css", "base.css"): "p {}",
+                join("css", "site.css"): '@import url("base.css");\nbody { background: url(../images/a.png?x#y), url(/images/a.png), url(data:image/png;base64,AA), url(missing.png) }',
+            }
+            for name, text in files.items():
+                with open(join(static, name), "w") as f:
+                    f.write(text)
+
+            index = TreeIndex(static)
+            assets = fingerprint_files(index)
+            image = fingerprint_path("images/a.png", hash_file(join(static, "images", "a.png")))
+            base = fingerprint_path("css/base.css", hash_file(join(static, "css", "base.css")))
+            rewritten = assets.stylesheet("css/site.css")
+            self.assertEqual(rewritten, (
+                f'@import url("{base[4:]}");\nbody {{ background: url(../{image}?x#y), url(/{image}), '
+                "url(data:image/png;base64,AA), url(missing.png) }"
+            ))
+            self.assertIsNone(assets.stylesheet("css/base.css"))
+            site = fingerprint_path("css/site.css", sha256(rewritten.encode()).hexdigest())
+            self.assertEqual(assets.output("css/site.css"), site)
+
+            output = join(tmp, "out")
+            copy_files(static, output, index=index, assets=assets)
+            with open(join(output, site)) as f:
+                self.assertEqual(f.read(), rewritten)
+            with open(join(static, "css", "site.css")) as f:
+                self.assertEqual(f.read(), files[join("css", "site.css")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from io import StringIO
+
+from flatdoc import FlatDocumentBuilder, flatten
+from htmlnode import LeafNode, ParentNode
+from main import markdown_to_flat_document, markdown_to_html_node
+from textnode import TextNode, TextType
+
+class TestFlatDocument(unittest.TestCase):
+    def test_flatten_matches_tree(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "Hello "), LeafNode("a", "link", {"href": "/"})]),
+            ParentNode("ul", [ParentNode("li", [LeafNode("b", "bold")]), ParentNode("li", [])]),
+            LeafNode("img", None, {"src": "/image.png", "alt": "image"}),
+        ])
+        document = flatten(node)
+        self.assertEqual(len(document), 9)
+        self.assertEqual(document.to_html(), node.to_html())
+
+    def test_write_html(self):
+        builder = FlatDocumentBuilder()
+        builder.open("p", {"class": "note"})
+        builder.leaf("i", "text")
+        builder.close()
+        fp = StringIO()
+        builder.finish().write_html(fp)
+        self.assertEqual(fp.getvalue(), '<p class="note"><i>text</i></p>')
+
+    def test_builder_errors(self):
+        builder = FlatDocumentBuilder()
+        with self.assertRaises(ValueError):
+            builder.open(None)
+        builder.open("div")
+        with self.assertRaises(ValueError):
+            builder.finish()
+
+    def test_markdown_to_flat_document(self):
+        md = """
+# Title
+
+A **bold** [link](/page) and `code`
+
+> quoted _text_
+
+- one
+- two
+
+1. first
+2. second
+
+```
+code block
+```
+"""
+        self.assertEqual(markdown_to_flat_document(md).to_html(), markdown_to_html_node(md).to_html())
+
+    def test_nodes_have_no_dict(self):
+        self.assertFalse(hasattr(TextNode("text", TextType.TEXT), "__dict__"))
+        self.assertFalse(hasattr(LeafNode("b", "bold"), "__dict__"))
+        self.assertFalse(hasattr(ParentNode("p", []), "__dict__"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from io import StringIO
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from frontmatter import page_fields, parse_front_matter, read_front_matter, split_front_matter
+from main import collect_pages, generate_pages
+
+MARKDOWN = """---
+title: "Hello: world"
+date: 2024-05-01
+# a comment
+tags: [a, 'b c']
+---
+# Heading
+
+Body
+"""
+
+class TestFrontMatter(unittest.TestCase):
+    def test_split_front_matter(self):
+        meta, body = split_front_matter(MARKDOWN)
+        self.assertEqual(meta, {"title": "Hello: world", "date": "2024-05-01", "tags": ["a", "b c"]})
+        self.assertEqual(body, "# Heading\n\nBody\n")
+
+    def test_without_front_matter(self):
+        for markdown in ["# Heading\n", "---\n\nA rule above, never closed\n", "----\n"]:
+            self.assertEqual(split_front_matter(markdown), ({}, markdown))
+
+    def test_read_front_matter(self):
+        fp = StringIO(MARKDOWN)
+        self.assertEqual(read_front_matter(fp)["date"], "2024-05-01")
+        self.assertEqual(fp.readline(), "# Heading\n")
+        fp = StringIO("# Heading\n")
+        self.assertEqual(read_front_matter(fp), {})
+        self.assertEqual(fp.readline(), "# Heading\n")
+
+    def test_page_fields(self):
+        fields = page_fields({"tags": "a, b", "draft": "yes", "template": "wide.html"})
+        self.assertEqual(fields, {"tags": ["a", "b"], "draft": True, "template": "wide.html"})
+        self.assertEqual(page_fields({}), {"tags": [], "draft": False})
+        for meta in [{"draft": "maybe"}, {"date": ["2024-01-01"]}]:
+            with self.assertRaises(ValueError):
+                page_fields(meta)
+
+    def test_invalid_line(self):
+        with self.assertRaises(ValueError):
+            parse_front_matter(["no separator"])
+
+    def test_front_matter_is_not_rendered(self):
+        with TemporaryDirectory() as tmp:
+            with open(join(tmp, "index.md"), "w") as f:
+                f.write(MARKDOWN)
+            template = join(tmp, "template.html")
+            with open(template, "w") as f:
+                f.write("{{ Title }}|{{ Content }}")
+            generate_pages(collect_pages(tmp, join(tmp, "out")), template)
+            with open(join(tmp, "out", "index.html")) as f:
+                self.assertEqual(f.read(), "Heading|<div><h1>Heading</h1><p>Body</p></div>")
+
+if __name__ == "__main__":
+    unittest.main()
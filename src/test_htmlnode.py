@@ -1,5 +1,6 @@
 import unittest
 
+from io import StringIO
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
 class TestHTMLNode(unittest.TestCase):
@@ -35,5 +36,28 @@ class TestHTMLNode(unittest.TestCase):
         parent_node = ParentNode("div", [child_node])
         self.assertEqual(parent_node.to_html(), "<div><span><b>grandchild</b></span></div>")
 
+    def test_void_leaf(self):
+        node = ParentNode("p", [LeafNode("img", None, {"src": "/a.png", "alt": "a"}), LeafNode("b", None)])
+        self.assertEqual(node.to_html(), '<p><img src="/a.png" alt="a"></p>')
+
+    def test_write_html(self):
+        node = ParentNode("p", [LeafNode("b", "bold"), LeafNode(None, " text "), LeafNode("a", "link", {"href": "/"})])
+        fp = StringIO()
+        node.write_html(fp)
+        self.assertEqual(fp.getvalue(), node.to_html())
+        self.assertEqual(fp.getvalue(), '<p><b>bold</b> text <a href="/">link</a></p>')
+
+    def test_iter_html_deep_tree(self):
+        node = LeafNode("b", "leaf")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertIn("<b>leaf</b>", html)
+
+    def test_iter_html_requires_children(self):
+        with self.assertRaises(ValueError):
+            ParentNode("div", [ParentNode("p", None)]).to_html()
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,141 @@
+import struct
+import unittest
+import zlib
+
+from contextlib import redirect_stdout
+from io import StringIO
+from os import listdir, makedirs, remove, rename
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+
+from fingerprint import AssetMap
+from images import PngHeader, ResponsiveImages, add_image_attributes, decode_png, encode_png, get_image_attributes, image_attributes, read_png_header, resize_pixels, use_image_attributes, variant_path
+from treeindex import TreeIndex
+
+def gradient(width, height, channels=3):
+    return [bytes((x * 7 + y * 3 + c * 50) & 0xFF for x in range(width) for c in range(channels)) for y in range(height)]
+
+def palette_png(indexes, palette, transparency=None):
+    def chunk(kind, payload):
+        return struct.pack(">I", len(payload)) + kind + payload + struct.pack(">I", zlib.crc32(kind + payload))
+    raw = b"".join(b"\x00" + bytes(row) for row in indexes)
+    chunks = chunk(b"IHDR", struct.pack(">IIBBBBB", len(indexes[0]), len(indexes), 8, 3, 0, 0, 0)) + chunk(b"PLTE", palette)
+    if transparency is not None:
+        chunks += chunk(b"tRNS", transparency)
+    return b"\x89PNG\r\n\x1a\n" + chunks + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+class TestImages(unittest.TestCase):
+    def test_encode_decode_round_trip(self):
+        for channels in [1, 2, 3, 4]:
+            rows = gradient(13, 7, channels)
+            self.assertEqual(decode_png(encode_png(13, 7, channels, rows)), (13, 7, channels, rows))
+
+    def test_decode_palette(self):
+        data = palette_png([[0, 1], [1, 0]], b"\xff\x00\x00\x00\x00\xff", b"\x80")
+        self.assertEqual(decode_png(data), (2, 2, 4, [b"\xff\x00\x00\x80\x00\x00\xff\xff", b"\x00\x00\xff\xff\xff\x00\x00\x80"]))
+
+    def test_resize_pixels(self):
+        rows = [bytes([0, 10, 20, 30]), bytes([40, 50, 60, 70])]
+        self.assertEqual(resize_pixels(rows, 4, 1, 2, 1), [bytes([25, 45])])
+        self.assertEqual(resize_pixels(rows, 2, 2, 1, 1), [bytes([30, 40])])
+
+    def test_image_attributes(self):
+        header = PngHeader(1000, 500, 8, 2, 0)
+        self.assertEqual(image_attributes("/images/a.png", header, (960, 480, 2000)), {
+            "srcset": "/images/a-480w.png 480w, /images/a-960w.png 960w, /images/a.png 1000w",
+            "width": "1000",
+            "height": "500",
+        })
+        self.assertEqual(image_attributes("/a.png", PngHeader(300, 200, 16, 2, 0)), {"width": "300", "height": "200"})
+
+    def test_add_image_attributes(self):
+        previous = get_image_attributes()
+        try:
+            use_image_attributes({"/a.png": {"width": "10", "height": "5"}})
+            html = '<p><img src="/a.png" alt="a"><img src="/b.png" alt="b"></p>'
+            self.assertEqual(add_image_attributes(html), '<p><img src="/a.png" width="10" height="5" alt="a"><img src="/b.png" alt="b"></p>')
+        finally:
+            use_image_attributes(previous)
+
+    def test_build_uses_derivative_cache(self):
+        with TemporaryDirectory() as tmp:
+            static = join(tmp, "static")
+            output = join(tmp, "docs")
+            cache = join(tmp, "cache")
+            makedirs(join(static, "images"))
+            with open(join(static, "images", "photo.png"), "wb") as f:
+                f.write(encode_png(40, 20, 3, gradient(40, 20)))
+            with open(join(static, "logo.png"), "wb") as f:
+                f.write(encode_png(8, 8, 3, gradient(8, 8)))
+
+            images = ResponsiveImages(cache, (10, 20, 80), jobs=1)
+            attributes = images.build(TreeIndex(static), output)
+            self.assertEqual(images.generated, 2)
+            self.assertEqual(attributes["/images/photo.png"]["srcset"], "/images/photo-10w.png 10w, /images/photo-20w.png 20w, /images/photo.png 40w")
+            self.assertEqual(attributes["/logo.png"], {"width": "8", "height": "8"})
+            header = read_png_header(join(output, "images", "photo-10w.png"))
+            self.assertEqual((header.width, header.height), (10, 5))
+
+            rename(join(static, "images", "photo.png"), join(static, "images", "renamed.png"))
+            images = ResponsiveImages(cache, (10, 20, 80), jobs=1)
+            images.build(TreeIndex(static), output)
+            self.assertEqual(images.generated, 0)
+            self.assertTrue(exists(join(output, "images", "renamed-20w.png")))
+            self.assertEqual(list(images.hashes), [join(static, "images", "renamed.png")])
+
+    def test_build_skips_corrupt_images(self):
+        with TemporaryDirectory() as tmp:
+            static = join(tmp, "static")
+            makedirs(static)
+            with open(join(static, "good.png"), "wb") as f:
+                f.write(encode_png(40, 20, 3, gradient(40, 20)))
+            # A valid header followed by data that does not inflate
+            data = encode_png(40, 20, 3, gradient(40, 20))
+            with open(join(static, "broken.png"), "wb") as f:
+                f.write(data[:41] + b"\x00" * (len(data) - 41))
+
+            for jobs in (1, 2):
+                images = ResponsiveImages(join(tmp, f"cache{jobs}"), (10,), jobs=jobs)
+                with redirect_stdout(StringIO()) as log:
+                    attributes = images.build(TreeIndex(static), join(tmp, f"docs{jobs}"))
+                self.assertIn("broken.png", log.getvalue())
+                self.assertNotIn("/broken.png", attributes)
+                self.assertIn("srcset", attributes["/good.png"])
+                self.assertEqual(listdir(join(tmp, f"docs{jobs}")), ["good-10w.png"])
+
+    def test_build_evicts_variants_of_removed_images(self):
+        with TemporaryDirectory() as tmp:
+            static = join(tmp, "static")
+            cache = join(tmp, "cache")
+            makedirs(static)
+            with open(join(static, "photo.png"), "wb") as f:
+                f.write(encode_png(40, 20, 3, gradient(40, 20)))
+            ResponsiveImages(cache, (10, 20), jobs=1).build(TreeIndex(static), join(tmp, "docs"))
+            self.assertEqual(len([name for name in listdir(cache) if name.endswith(".png")]), 2)
+
+            ResponsiveImages(cache, (10,), jobs=1).build(TreeIndex(static), join(tmp, "docs"))
+            self.assertEqual(len([name for name in listdir(cache) if name.endswith(".png")]), 1)
+
+            remove(join(static, "photo.png"))
+            ResponsiveImages(cache, (10,), jobs=1).build(TreeIndex(static), join(tmp, "docs"))
+            self.assertEqual(listdir(cache), ["index.json"])
+
+    def test_build_fingerprints_variants(self):
+        with TemporaryDirectory() as tmp:
+            static = join(tmp, "static")
+            output = join(tmp, "docs")
+            makedirs(static)
+            with open(join(static, "photo.png"), "wb") as f:
+                f.write(encode_png(40, 20, 3, gradient(40, 20)))
+
+            assets = AssetMap()
+            ResponsiveImages(join(tmp, "cache"), (10,), jobs=1).build(TreeIndex(static), output, assets=assets)
+            fingerprinted = assets.urls["/photo-10w.png"]
+            self.assertRegex(fingerprinted, r"^/photo-10w\.[0-9a-f]{10}\.png$")
+            self.assertEqual(listdir(output), [fingerprinted[1:]])
+
+    def test_variant_path(self):
+        self.assertEqual(variant_path("/images/a.b.png", 480), "/images/a.b-480w.png")
+
+if __name__ == "__main__":
+    unittest.main()
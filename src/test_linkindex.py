@@ -0,0 +1,98 @@
+import json
+import unittest
+
+from os import makedirs
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from linkindex import LinkIndex, collect_references, find_target, resolve, write_json
+from main import CachedBody, collect_pages, generate_pages, markdown_to_flat_document, markdown_to_html_node
+
+MARKDOWN = """# Title
+
+A [link](/about) and ![an image](/images/logo.png) in a paragraph.
+
+- [external](https://example.com)
+- [relative](../other)
+
+```
+[not a link](/code)
+```
+"""
+
+class TestLinkIndex(unittest.TestCase):
+    def test_collect_references(self):
+        expected = (["/about", "https://example.com", "../other"], ["/images/logo.png"])
+        for node in [markdown_to_html_node(MARKDOWN), markdown_to_flat_document(MARKDOWN), CachedBody("<div></div>", expected, {})]:
+            links, images = [], []
+            collect_references(node, links, images)
+            self.assertEqual((links, images), expected)
+
+    def test_resolve(self):
+        page = "blog/post/index.html"
+        self.assertEqual(resolve("/about", page), "about")
+        self.assertEqual(resolve("/", page), "index.html")
+        self.assertEqual(resolve("/blog/", page), "blog/index.html")
+        self.assertEqual(resolve("../other?x=1#top", page), "blog/other")
+        self.assertEqual(resolve("/images/my%20logo.png", page), "images/my logo.png")
+        for url in ["https://example.com", "mailto:me@example.com", "//cdn.example.com/x.js", "#section"]:
+            self.assertIsNone(resolve(url, page))
+
+    def test_find_target(self):
+        targets = {"index.html", "about/index.html", "images/logo.png"}
+        self.assertEqual(find_target("about", targets), "about/index.html")
+        self.assertEqual(find_target("images/logo.png", targets), "images/logo.png")
+        self.assertIsNone(find_target("images/missing.png", targets))
+
+    def test_report(self):
+        index = LinkIndex("docs")
+        index.add_page(join("docs", "index.html"), ["/about", "/missing", "https://example.com"], ["/logo.png"])
+        index.add_page(join("docs", "about", "index.html"), ["/"], ["/gone.png"])
+        report = index.report({"index.html", "about/index.html", "logo.png"})
+        self.assertEqual(
+            report["broken"],
+            [
+                {"page": "about/index.html", "kind": "image", "url": "/gone.png"},
+                {"page": "index.html", "kind": "link", "url": "/missing"},
+            ],
+        )
+        self.assertEqual(report["inbound"]["about/index.html"], ["index.html"])
+        self.assertEqual(report["inbound"]["https://example.com"], ["index.html"])
+
+    def test_load_and_retain(self):
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, "links.json")
+            index = LinkIndex("docs")
+            index.add_page(join("docs", "a.html"), ["/b.html"], [])
+            index.add_page(join("docs", "b.html"), [], [])
+            write_json(path, index.report(set()))
+
+            index = LinkIndex("docs")
+            index.load(path)
+            index.add_page(join("docs", "b.html"), ["/a.html"], [])
+            index.retain({"b.html"})
+            self.assertEqual(index.pages, {"b.html": {"links": ["/a.html"], "images": []}})
+            with open(path) as f:
+                self.assertEqual(len(json.load(f)["broken"]), 1)
+
+    def test_generate_pages_fills_index(self):
+        with TemporaryDirectory() as tmp:
+            content = join(tmp, "content")
+            makedirs(join(content, "blog"))
+            with open(join(content, "index.md"), "w") as f:
+                f.write(MARKDOWN)
+            with open(join(content, "blog", "index.md"), "w") as f:
+                f.write("# Blog\n\n[home](/)")
+            template = join(tmp, "template.html")
+            with open(template, "w") as f:
+                f.write("{{ Content }}")
+
+            for jobs in [1, 2]:
+                output = join(tmp, f"out{jobs}")
+                index = LinkIndex(output)
+                generate_pages(collect_pages(content, output), template, jobs=jobs, links=index)
+                self.assertEqual(index.pages["blog/index.html"], {"links": ["/"], "images": []})
+                self.assertEqual(index.pages["index.html"]["images"], ["/images/logo.png"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,10 @@
 import unittest
-from main import markdown_to_html_node, extract_title
+from os import makedirs
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import main
+from main import markdown_to_html_node, text_to_children, text_to_parts, extract_title, collect_pages, generate_pages, generate_pages_pipelined
 
 class TestBlock(unittest.TestCase):
     def test_paragraphs(self):
@@ -40,4 +45,98 @@ the **same** even with inline stuff
     def test_extract_title(self):
         md = """# Title of the Document"""
         title = extract_title(md)
-        self.assertEqual(title, "Title of the Document")
\ No newline at end of file
+        self.assertEqual(title, "Title of the Document")
+
+    def test_memoized_fragments_are_not_shared(self):
+        text = "a [link](/x) here"
+        first = text_to_children(text)
+        first[1].props["href"] = "/changed"
+        first[1].value = "changed"
+        self.assertEqual("".join(node.to_html() for node in text_to_children(text)), 'a <a href="/x">link</a> here')
+        self.assertIsInstance(text_to_parts(text)[1][2], tuple)
+
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.content = join(self.tmp.name, "content")
+        self.template = join(self.tmp.name, "template.html")
+        makedirs(join(self.content, "blog", "post"))
+        with open(join(self.content, "index.md"), "w") as f:
+            f.write("# Home\n\nSee [the post](/blog/post)")
+        with open(join(self.content, "blog", "post", "index.md"), "w") as f:
+            f.write("# Post\n\n- **one**\n- _two_")
+        with open(self.template, "w") as f:
+            f.write('<title>{{ Title }}</title><a href="/">{{ Content }}</a>')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, dest, jobs):
+        pages = collect_pages(self.content, dest)
+        generate_pages(pages, self.template, "/site/", jobs)
+        return pages
+
+    def test_collect_pages(self):
+        pages = collect_pages(self.content, "out")
+        self.assertEqual(
+            pages,
+            [
+                (join(self.content, "blog", "post", "index.md"), join("out", "blog", "post", "index.html")),
+                (join(self.content, "index.md"), join("out", "index.html")),
+            ],
+        )
+
+    def test_parallel_matches_serial(self):
+        serial = self.build(join(self.tmp.name, "serial"), 1)
+        parallel = self.build(join(self.tmp.name, "parallel"), 2)
+        for (_, serial_dest), (_, parallel_dest) in zip(serial, parallel):
+            with open(serial_dest) as a, open(parallel_dest) as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_pipelined_matches_serial(self):
+        serial = self.build(join(self.tmp.name, "serial"), 1)
+        pages = collect_pages(self.content, join(self.tmp.name, "pipelined"))
+        generate_pages_pipelined(iter(pages), self.template, "/site/", io_threads=2, depth=1)
+        for (_, serial_dest), (_, pipelined_dest) in zip(serial, pages):
+            with open(serial_dest) as a, open(pipelined_dest) as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_parallel_reports_failed_page(self):
+        # Not valid UTF-8, so reading the page fails
+        with open(join(self.content, "broken.md"), "wb") as f:
+            f.write(b"# \xff\xfe")
+        with self.assertRaises(RuntimeError) as context:
+            self.build(join(self.tmp.name, "out"), 2)
+        self.assertIn("broken.md", str(context.exception))
+
+    def test_page_templates_and_drafts(self):
+        wide = join(self.tmp.name, "wide.html")
+        with open(wide, "w") as f:
+            f.write("<main>{{ Content }}</main>")
+        post = join(self.content, "blog", "post", "index.md")
+        pages = collect_pages(self.content, join(self.tmp.name, "out"), drafts={"index.md"})
+        self.assertEqual([source for source, _ in pages], [post])
+        for jobs in (1, 2):
+            generate_pages(pages, self.template, "/", jobs, templates={post: wide})
+            with open(pages[0][1]) as f:
+                self.assertTrue(f.read().startswith("<main>"))
+
+    def test_page_variables(self):
+        template = join(self.tmp.name, "path.html")
+        with open(template, "w") as f:
+            f.write('<link rel="canonical" href="{{ Path }}">{{ Title }}')
+        post = join(self.content, "blog", "post", "index.md")
+        pages = collect_pages(self.content, join(self.tmp.name, "out"))
+        generate_pages(pages, template, "/site/", variables={post: {"Path": "/site/blog/post/"}})
+        with open(join(self.tmp.name, "out", "blog", "post", "index.html")) as f:
+            self.assertTrue(f.read().startswith('<link rel="canonical" href="/site/blog/post/">'))
+
+    def test_streamed_pages_match(self):
+        with open(join(self.content, "long.md"), "w") as f:
+            f.write("Intro paragraph\n\n" * 5 + "# Long\n\n" + "- **item** [link](/x)\n\n" * 20)
+        serial = self.build(join(self.tmp.name, "whole"), 1)
+        with patch.object(main, "STREAM_THRESHOLD", -1), patch.object(main, "STREAM_TITLE_BLOCKS", 2):
+            streamed = self.build(join(self.tmp.name, "streamed"), 1)
+        for (_, whole_dest), (_, streamed_dest) in zip(serial, streamed):
+            with open(whole_dest) as a, open(streamed_dest) as b:
+                self.assertEqual(a.read(), b.read())
@@ -0,0 +1,110 @@
+import unittest
+
+from os import makedirs, utime
+from os.path import dirname, exists, join
+from tempfile import TemporaryDirectory
+
+from manifest import BuildManifest, hash_file
+
+def write(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.manifest_path = join(self.dir, "manifest.json")
+        self.template = join(self.dir, "template.html")
+        self.src = join(self.dir, "index.md")
+        self.dest = join(self.dir, "index.html")
+        write(self.template, "<html>{{ Content }}</html>")
+        write(self.src, "# Title")
+        write(self.dest, "<html></html>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, basepath="/"):
+        manifest = BuildManifest(self.manifest_path, self.template, basepath)
+        result = manifest.needs_build(self.src, self.dest)
+        manifest.save()
+        return result
+
+    def test_hash_file(self):
+        self.assertEqual(hash_file(self.src), hash_file(self.src))
+        self.assertNotEqual(hash_file(self.src), hash_file(self.template))
+
+    def test_unchanged_is_skipped(self):
+        self.assertTrue(self.build())
+        self.assertFalse(self.build())
+
+    def test_touched_but_unchanged_is_skipped(self):
+        self.build()
+        utime(self.src, (0, 0))
+        self.assertFalse(self.build())
+
+    def test_source_change_rebuilds(self):
+        self.build()
+        write(self.src, "# Other title")
+        self.assertTrue(self.build())
+
+    def test_template_or_basepath_change_rebuilds(self):
+        self.build()
+        write(self.template, "<body>{{ Content }}</body>")
+        self.assertTrue(self.build())
+        self.assertTrue(self.build("/blog/"))
+        self.assertFalse(self.build("/blog/"))
+
+    def test_setting_change_rebuilds(self):
+        manifest = BuildManifest(self.manifest_path, self.template)
+        manifest.add_setting("images", {"/a.png": {"width": "10"}})
+        manifest.needs_build(self.src, self.dest)
+        manifest.save()
+        manifest = BuildManifest(self.manifest_path, self.template)
+        manifest.add_setting("images", {"/a.png": {"width": "10"}})
+        self.assertFalse(manifest.needs_build(self.src, self.dest))
+        manifest = BuildManifest(self.manifest_path, self.template)
+        manifest.add_setting("images", {"/a.png": {"width": "20"}})
+        self.assertTrue(manifest.needs_build(self.src, self.dest))
+
+    def test_static_ignores_template(self):
+        manifest = BuildManifest(self.manifest_path, self.template)
+        manifest.needs_build(self.src, self.dest, uses_template=False)
+        manifest.save()
+        write(self.template, "<body>{{ Content }}</body>")
+        manifest = BuildManifest(self.manifest_path, self.template)
+        self.assertFalse(manifest.needs_build(self.src, self.dest, uses_template=False))
+
+    def test_remove_stale_moved_output(self):
+        self.build()
+        manifest = BuildManifest(self.manifest_path, self.template)
+        moved = join(self.dir, "moved.html")
+        manifest.needs_build(self.src, moved)
+        self.assertEqual(manifest.remove_stale(), [self.dest])
+
+    def test_remove_stale(self):
+        self.build()
+        manifest = BuildManifest(self.manifest_path, self.template)
+        self.assertEqual(manifest.remove_stale(), [self.dest])
+        self.assertFalse(exists(self.dest))
+
+    def test_remove_stale_prunes_empty_directories(self):
+        page = join(self.dir, "docs", "blog", "2024", "post.html")
+        kept = join(self.dir, "docs", "index.html")
+        makedirs(dirname(page))
+        write(page, "<html></html>")
+        write(kept, "<html></html>")
+        manifest = BuildManifest(self.manifest_path, self.template)
+        manifest.needs_build(self.src, page)
+        manifest.needs_build(self.template, kept)
+        manifest.save()
+
+        manifest = BuildManifest(self.manifest_path, self.template)
+        manifest.needs_build(self.template, kept)
+        self.assertEqual(manifest.remove_stale(join(self.dir, "docs")), [page])
+        self.assertFalse(exists(join(self.dir, "docs", "blog")))
+        self.assertTrue(exists(kept))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from threading import Thread
+
+from memo import Memo
+
+class TestMemo(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.memo = Memo(self.square, maxsize=2)
+
+    def square(self, value):
+        self.calls.append(value)
+        return (value * value,)
+
+    def test_hits_and_misses(self):
+        self.assertEqual(self.memo(3), (9,))
+        self.assertEqual(self.memo(3), (9,))
+        self.assertEqual(self.calls, [3])
+        stats = self.memo.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+    def test_evicts_least_recently_used(self):
+        self.memo(1)
+        self.memo(2)
+        self.memo(1)
+        self.memo(3)
+        self.assertEqual(list(self.memo.entries), [1, 3])
+        self.memo(2)
+        self.assertEqual(self.calls, [1, 2, 3, 2])
+
+    def test_disabled(self):
+        self.memo.resize(0)
+        self.memo(1)
+        self.memo(1)
+        self.assertEqual(self.calls, [1, 1])
+        self.assertEqual(self.memo.stats()["size"], 0)
+
+    def test_long_keys_are_not_cached(self):
+        memo = Memo(len, maxsize=4, max_key_length=3)
+        self.assertEqual(memo("abcd"), 4)
+        self.assertEqual(memo("abc"), 3)
+        self.assertEqual(list(memo.entries), ["abc"])
+
+    def test_threads(self):
+        memo = Memo(lambda value: (value,), maxsize=16)
+
+        def lookup():
+            for i in range(1000):
+                memo(i % 32)
+
+        threads = [Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = memo.stats()
+        self.assertEqual(stats["hits"] + stats["misses"], 4000)
+        self.assertLessEqual(stats["size"], 16)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+from contextlib import redirect_stdout
+from io import StringIO
+from os import makedirs, utime
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from main import main, read_title
+from metadataindex import MetadataIndex, template_variables
+from treeindex import TreeIndex
+
+PAGES = {
+    "index.md": "# Home\n",
+    "post.md": "---\ntags: [python, web]\ndate: 2024-05-01\n---\n# Post\n",
+    "titled.md": "---\ntitle: Front matter title\n---\n# Heading\n",
+    "draft.md": "---\ndraft: true\ntags: python\ntemplate: wide.html\n---\n# Draft\n",
+}
+
+class TestMetadataIndex(unittest.TestCase):
+    def write_pages(self, root):
+        for name, text in PAGES.items():
+            with open(join(root, name), "w") as f:
+                f.write(text)
+
+    def test_queries(self):
+        with TemporaryDirectory() as tmp:
+            self.write_pages(tmp)
+            metadata = MetadataIndex(join(tmp, "metadata.json"))
+            metadata.update(TreeIndex(tmp), read_title)
+            self.assertEqual(metadata.read, 4)
+            self.assertEqual(metadata.drafts(), ["draft.md"])
+            self.assertEqual(metadata.tagged("python"), ["draft.md", "post.md"])
+            self.assertEqual(metadata.tagged("web"), ["post.md"])
+            self.assertEqual(metadata.templates("layouts"), {"draft.md": join("layouts", "wide.html")})
+            self.assertEqual(metadata.get("index.md")["title"], "Home")
+            self.assertEqual(metadata.get("titled.md")["title"], "Front matter title")
+            self.assertEqual(metadata.get("index.md")["fields"], {"tags": [], "draft": False})
+
+    def test_template_variables(self):
+        entry = {"title": "Post", "fields": {"date": "2024-05-01", "description": "Fish & chips", "tags": ["a", "b"], "draft": False}}
+        self.assertEqual(template_variables(entry), {"Title": "Post", "Date": "2024-05-01", "Description": "Fish &amp; chips", "Tags": "a, b"})
+        self.assertEqual(template_variables({"title": "Home", "fields": {"tags": [], "draft": False}}), {"Title": "Home", "Date": "", "Description": "", "Tags": ""})
+
+    def test_build_renders_front_matter(self):
+        with TemporaryDirectory() as tmp:
+            content = join(tmp, "content")
+            makedirs(content)
+            for name in ("post.md", "titled.md"):
+                with open(join(content, name), "w") as f:
+                    f.write(PAGES[name])
+            template = join(tmp, "template.html")
+            with open(template, "w") as f:
+                f.write("{{ Title }} {{ Date }} [{{ Tags }}] [{{ Description }}] {{ Path }}")
+            with redirect_stdout(StringIO()):
+                main(["/site/", "--content", content, "--static", content, "--template", template, "--output", join(tmp, "docs"),
+                      "--state-dir", join(tmp, ".build")])
+            with open(join(tmp, "docs", "post.html")) as f:
+                self.assertEqual(f.read(), "Post 2024-05-01 [python, web] [] /site/post.html")
+            with open(join(tmp, "docs", "titled.html")) as f:
+                self.assertEqual(f.read(), "Front matter title  [] [] /site/titled.html")
+
+    def test_update_reads_changed_pages_only(self):
+        with TemporaryDirectory() as tmp:
+            self.write_pages(tmp)
+            metadata = MetadataIndex(join(tmp, "metadata.json"))
+            metadata.update(TreeIndex(tmp), read_title)
+            metadata.save()
+
+            with open(join(tmp, "post.md"), "w") as f:
+                f.write("---\ntags: [go]\n---\n# Post\n")
+            utime(join(tmp, "post.md"), ns=(1, 1))
+
+            metadata = MetadataIndex(join(tmp, "metadata.json"))
+            metadata.load()
+            metadata.update(TreeIndex(tmp), read_title)
+            self.assertEqual(metadata.read, 1)
+            self.assertEqual(metadata.tagged("go"), ["post.md"])
+            self.assertEqual(metadata.tagged("web"), [])
+
+    def test_invalid_front_matter(self):
+        with TemporaryDirectory() as tmp:
+            with open(join(tmp, "page.md"), "w") as f:
+                f.write("---\ndraft: maybe\n---\n# Page\n")
+            with self.assertRaises(ValueError) as context:
+                MetadataIndex(join(tmp, "metadata.json")).update(TreeIndex(tmp), read_title)
+            self.assertIn("page.md", str(context.exception))
+
+if __name__ == "__main__":
+    unittest.main()
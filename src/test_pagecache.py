@@ -0,0 +1,62 @@
+import unittest
+
+from os import utime
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import main
+from main import CachedBody, read_page
+from pagecache import PageCache
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.cache = PageCache(join(self.tmp.name, "cache"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_and_get(self):
+        key = self.cache.key("# Title")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "Title", "<div><h1>Title</h1></div>", (["/about"], ["/logo.png"]))
+        self.assertEqual(self.cache.get(key), ("Title", "<div><h1>Title</h1></div>", (["/about"], ["/logo.png"]), {}))
+
+    def test_key_depends_on_parser_version(self):
+        key = self.cache.key("# Title")
+        with patch("pagecache.PARSER_VERSION", "next"):
+            self.assertNotEqual(self.cache.key("# Title"), key)
+
+    def test_prune_evicts_least_recently_used(self):
+        keys = [self.cache.key(str(index)) for index in range(3)]
+        for age, key in enumerate(keys):
+            self.cache.put(key, "Title", "x" * 100)
+            utime(self.cache.entry_path(key), (age, age))
+        self.cache.get(keys[0])
+        self.cache.max_bytes = sum(size for _, size, _ in self.cache.entries()) - 1
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+
+    def test_clear(self):
+        key = self.cache.key("# Title")
+        self.cache.put(key, "Title", "<div></div>")
+        self.cache.clear()
+        self.assertEqual(self.cache.entries(), [])
+
+    def test_read_page_skips_parsing_on_hit(self):
+        path = join(self.tmp.name, "index.md")
+        with open(path, "w") as f:
+            f.write("# Title\n\nSome **bold** text")
+        with patch.object(main, "blocks_to_html_node", wraps=main.blocks_to_html_node) as parse:
+            title, node = read_page(path, self.cache)
+            parse.assert_called_once()
+            cached_title, cached_node = read_page(path, self.cache)
+            parse.assert_called_once()
+        self.assertNotIsInstance(node, CachedBody)
+        self.assertIsInstance(cached_node, CachedBody)
+        self.assertEqual((cached_title, cached_node.to_html()), (title, node.to_html()))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from threading import Lock
+from time import sleep
+
+from pipeline import Pipeline
+
+class TestPipeline(unittest.TestCase):
+    def test_every_item_is_written(self):
+        written = []
+        pipeline = Pipeline(lambda item: item * 2, lambda item, data: data + 1, lambda item, data: written.append((item, data)), 3, 2)
+        self.assertEqual(pipeline.run(range(50)), [])
+        self.assertEqual(sorted(written), [(i, i * 2 + 1) for i in range(50)])
+
+    def test_failures_are_reported(self):
+        def read(item):
+            if item == 3:
+                raise OSError("unreadable")
+            return item
+
+        def render(item, data):
+            if item == 5:
+                raise ValueError("bad markdown")
+            return data
+
+        written = []
+        failures = Pipeline(read, render, lambda item, data: written.append(item)).run(range(8))
+        self.assertEqual(sorted(item for item, _ in failures), [3, 5])
+        self.assertIn("unreadable", dict(failures)[3])
+        self.assertEqual(sorted(written), [0, 1, 2, 4, 6, 7])
+
+    def test_queues_apply_backpressure(self):
+        lock = Lock()
+        state = {"read": 0, "written": 0, "ahead": 0}
+
+        def read(item):
+            with lock:
+                state["read"] += 1
+                state["ahead"] = max(state["ahead"], state["read"] - state["written"])
+            return item
+
+        def write(item, data):
+            sleep(0.001)
+            with lock:
+                state["written"] += 1
+
+        Pipeline(read, lambda item, data: data, write, readers=2, writers=1, depth=2).run(range(40))
+        self.assertEqual(state["written"], 40)
+        # Two queues of depth 2, plus the items held by each reader, the renderer and the writer
+        self.assertLessEqual(state["ahead"], 2 + 2 + 2 + 1 + 1 + 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import json
+import unittest
+
+from os.path import join
+from tempfile import TemporaryDirectory
+
+import profiler
+from profiler import Profiler, percentile
+
+class TestProfiler(unittest.TestCase):
+    def tearDown(self):
+        profiler.disable()
+
+    def test_percentile(self):
+        values = [5.0, 1.0, 4.0, 2.0, 3.0]
+        self.assertEqual(percentile(values, 0.5), 3.0)
+        self.assertEqual(percentile(values, 0.95), 5.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_stage_disabled(self):
+        with profiler.stage("parse"):
+            pass
+        self.assertIsNone(profiler.get_profiler())
+
+    def test_stage_and_pages(self):
+        active = profiler.enable()
+        for path in ["a.md", "b.md"]:
+            with profiler.time_page(path):
+                with profiler.stage("parse"):
+                    pass
+        report = active.report(top=1)
+        self.assertEqual(report["stages"]["parse"]["calls"], 2)
+        self.assertEqual(report["pages"]["count"], 2)
+        self.assertEqual(len(report["pages"]["slowest"]), 1)
+
+    def test_merge(self):
+        worker = Profiler()
+        worker.add_time("render", 0.5)
+        worker.pages.append(("a.md", 0.5))
+        worker.add_bytes(10, 20)
+        worker.add_memo("text_to_parts", 3, 1)
+        main = Profiler()
+        main.add_time("render", 0.25)
+        main.merge(worker.state())
+        report = main.report()
+        self.assertEqual(report["stages"]["render"], {"seconds": 0.75, "calls": 2})
+        self.assertEqual(report["pages"]["slowest"], [{"path": "a.md", "seconds": 0.5}])
+        self.assertEqual((report["bytes_read"], report["bytes_written"]), (10, 20))
+        self.assertEqual(report["memos"]["text_to_parts"], {"hits": 3, "misses": 1, "hit_rate": 0.75})
+
+    def test_write_json(self):
+        active = Profiler()
+        active.add_time("read", 0.1)
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, "profile.json")
+            active.write_json(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)["stages"]["read"]["calls"], 1)
+        self.assertIn("read", active.format_report())
+
+if __name__ == "__main__":
+    unittest.main()
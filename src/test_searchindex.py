@@ -0,0 +1,104 @@
+import os
+import unittest
+
+from os import makedirs
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from main import collect_pages, generate_pages, markdown_to_flat_document, markdown_to_html_node
+from searchindex import HEADING_BOOST, TITLE_BOOST, SearchIndex, collect_terms, decode_postings, encode_postings, search, tokenize
+
+MARKDOWN = """# Hobbits
+
+Hobbits like **second breakfast** and a quiet life.
+
+## Breakfast
+
+- eggs
+- more breakfast
+"""
+
+class TestSearchIndex(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize("A Hobbit's 2nd_breakfast, at 9!"), ["hobbit", "2nd_breakfast", "at"])
+
+    def test_postings_round_trip(self):
+        postings = [(0, 1), (3, 200), (130, 5), (100000, 1)]
+        data = encode_postings(postings)
+        self.assertEqual(decode_postings(data), postings)
+        self.assertEqual(len(encode_postings([(0, 1), (1, 1), (2, 1)])), 6)
+
+    def test_collect_terms(self):
+        expected = {"hobbits": HEADING_BOOST + 1, "like": 1, "second": 1, "breakfast": 2 + HEADING_BOOST, "and": 1, "quiet": 1, "life": 1, "eggs": 1, "more": 1}
+        for node in [markdown_to_html_node(MARKDOWN), markdown_to_flat_document(MARKDOWN)]:
+            terms = {}
+            collect_terms(node, terms)
+            self.assertEqual(terms, expected)
+
+    def test_collect_terms_code_block(self):
+        for node in [markdown_to_html_node("```\nfoo bar\n```"), markdown_to_flat_document("```\nfoo bar\n```")]:
+            terms = {}
+            collect_terms(node, terms)
+            self.assertEqual(terms, {"foo": 1, "bar": 1})
+
+    def test_search_ranking(self):
+        with TemporaryDirectory() as tmp:
+            index = SearchIndex("docs")
+            index.add_page(join("docs", "index.html"), "Home", {"hobbits": 1, "breakfast": 1})
+            index.add_page(join("docs", "blog", "food", "index.html"), "Food", {"breakfast": 7, "hobbits": 2})
+            index.add_page(join("docs", "blog", "tom", "index.html"), "Tom", {"hobbits": 3})
+            index.write(tmp, "/site/")
+
+            self.assertEqual(search(tmp, "Breakfast hobbits"), [("/site/blog/food/", 9), ("/site/", 2)])
+            self.assertEqual(search(tmp, "food"), [("/site/blog/food/", TITLE_BOOST)])
+            self.assertEqual(search(tmp, "dragons"), [])
+
+    def test_incremental_update(self):
+        with TemporaryDirectory() as tmp:
+            store = join(tmp, "store.json")
+            directory = join(tmp, "search")
+            index = SearchIndex("docs")
+            index.add_page(join("docs", "a.html"), "Apples", {"apples": 1, "bananas": 1})
+            index.add_page(join("docs", "b.html"), "Cherries", {"cherries": 1})
+            self.assertEqual(index.write(directory), 4)
+            index.save(store)
+
+            index = SearchIndex("docs")
+            index.load(store)
+            index.add_page(join("docs", "b.html"), "Cherries", {"cherries": 2})
+            index.retain({"a.html", "b.html"})
+            self.assertEqual(index.write(directory), 1)
+            self.assertEqual(search(directory, "cherries"), [("/b.html", TITLE_BOOST + 2)])
+
+            index.retain({"b.html"})
+            self.assertEqual(index.ids, {"b.html": 1})
+            index.write(directory)
+            self.assertEqual(sorted(os.listdir(directory)), ["docs.json", "terms-c.json"])
+            self.assertEqual(search(directory, "cherries"), [("/b.html", TITLE_BOOST + 2)])
+
+            index.add_page(join("docs", "c.html"), "Dates", {})
+            index.retain({"c.html"})
+            self.assertEqual(index.ids, {"c.html": 0})
+
+    def test_generate_pages_fills_index(self):
+        with TemporaryDirectory() as tmp:
+            content = join(tmp, "content")
+            makedirs(join(content, "blog"))
+            with open(join(content, "index.md"), "w") as f:
+                f.write(MARKDOWN)
+            with open(join(content, "blog", "index.md"), "w") as f:
+                f.write("# Blog\n\nNo hobbits here.")
+            template = join(tmp, "template.html")
+            with open(template, "w") as f:
+                f.write("{{ Content }}")
+
+            for jobs in [1, 2]:
+                output = join(tmp, f"out{jobs}")
+                index = SearchIndex(output)
+                generate_pages(collect_pages(content, output), template, jobs=jobs, search=index)
+                self.assertEqual(index.pages["blog/index.html"]["title"], "Blog")
+                self.assertEqual(index.pages["blog/index.html"]["terms"]["blog"], HEADING_BOOST + TITLE_BOOST)
+                self.assertEqual(index.pages["index.html"]["terms"]["breakfast"], 2 + HEADING_BOOST)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+
+from functools import partial
+from http.server import ThreadingHTTPServer
+from os import makedirs, remove
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest.mock import patch
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import serve
+from serve import DependencyGraph, LiveReloadHandler, SiteBuilder, Watcher, changed_paths, inject_livereload
+
+def write(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+class TestDependencyGraph(unittest.TestCase):
+    def test_add_and_remove(self):
+        graph = DependencyGraph()
+        graph.add("a.md", "a.html", ("template.html",))
+        graph.add("b.md", "b.html", ("template.html",))
+        self.assertEqual(graph.dependents_of("template.html"), {"a.md", "b.md"})
+        self.assertEqual(graph.remove("a.md"), {"a.html"})
+        self.assertEqual(graph.dependents_of("template.html"), {"b.md"})
+
+    def test_changed_paths(self):
+        before = {"a": (1, 1), "b": (1, 1)}
+        after = {"a": (2, 1), "c": (1, 1)}
+        self.assertEqual(changed_paths(before, after), {"a", "b", "c"})
+
+class TestSiteBuilder(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        root = self.tmp.name
+        self.content = join(root, "content")
+        self.static = join(root, "static")
+        self.template = join(root, "template.html")
+        self.output = join(root, "docs")
+        makedirs(join(self.content, "blog"))
+        makedirs(self.static)
+        write(join(self.content, "index.md"), "# Home")
+        write(join(self.content, "blog", "post.md"), "# Post")
+        write(join(self.static, "index.css"), "body {}")
+        write(self.template, "<h1>{{ Title }}</h1>")
+        self.builder = SiteBuilder(self.content, self.static, self.template, self.output)
+        self.builder.build()
+        self.watcher = Watcher([self.content, self.static, self.template])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_build(self):
+        self.assertEqual(read(join(self.output, "blog", "post.html")), "<h1>Post</h1>")
+        self.assertTrue(exists(join(self.output, "index.css")))
+
+    def test_content_edit_rebuilds_one_page(self):
+        write(join(self.content, "blog", "post.md"), "# Edited post")
+        changes = self.watcher.poll()
+        self.assertEqual(changes, {join(self.content, "blog", "post.md")})
+        self.assertEqual(self.builder.apply(changes), 1)
+        self.assertEqual(read(join(self.output, "blog", "post.html")), "<h1>Edited post</h1>")
+
+    def test_template_edit_reuses_parsed_pages(self):
+        write(self.template, "<section>{{ Title }}</section>")
+        with patch.object(serve, "read_page") as read_page:
+            self.assertEqual(self.builder.apply(self.watcher.poll()), 2)
+            read_page.assert_not_called()
+        self.assertEqual(read(join(self.output, "index.html")), "<section>Home</section>")
+
+    def test_removed_sources_remove_outputs(self):
+        remove(join(self.content, "index.md"))
+        remove(join(self.static, "index.css"))
+        self.builder.apply(self.watcher.poll())
+        self.assertFalse(exists(join(self.output, "index.html")))
+        self.assertFalse(exists(join(self.output, "index.css")))
+
+    def test_drafts_are_not_published(self):
+        draft = join(self.content, "draft.md")
+        write(draft, "---\ndraft: true\n---\n# Draft")
+        self.builder.build()
+        self.assertFalse(exists(join(self.output, "draft.html")))
+
+        write(draft, "---\ndraft: false\n---\n# Draft")
+        self.builder.apply({draft})
+        self.assertEqual(read(join(self.output, "draft.html")), "<h1>Draft</h1>")
+
+        write(draft, "---\ndraft: true\n---\n# Draft again")
+        self.builder.apply({draft})
+        self.assertFalse(exists(join(self.output, "draft.html")))
+
+    def test_page_templates(self):
+        wide = join(self.tmp.name, "wide.html")
+        write(wide, "<main>{{ Title }} {{ Path }}</main>")
+        post = join(self.content, "blog", "post.md")
+        write(post, "---\ntemplate: wide.html\n---\n# Post")
+        self.builder.apply(self.watcher.poll())
+        self.assertEqual(read(join(self.output, "blog", "post.html")), "<main>Post /blog/post.html</main>")
+        self.assertEqual(self.builder.template_paths(), sorted([self.template, wide]))
+
+        self.watcher.watch(self.builder.template_paths())
+        self.assertEqual(self.watcher.poll(), set())
+        write(wide, "<article>{{ Title }}</article>")
+        with patch.object(serve, "read_page") as read_page:
+            self.assertEqual(self.builder.apply(self.watcher.poll()), 1)
+            read_page.assert_not_called()
+        self.assertEqual(read(join(self.output, "blog", "post.html")), "<article>Post</article>")
+
+        # Editing the default template leaves the page choosing another one alone
+        write(self.template, "<section>{{ Title }}</section>")
+        self.assertEqual(self.builder.apply(self.watcher.poll()), 1)
+        self.assertEqual(read(join(self.output, "blog", "post.html")), "<article>Post</article>")
+
+    def test_serves_under_basepath(self):
+        builder = SiteBuilder(self.content, self.static, self.template, self.output, "/site/")
+        builder.build()
+        handler = partial(LiveReloadHandler, directory=self.output, builder=builder, basepath="/site/")
+        server = ThreadingHTTPServer(("localhost", 0), handler)
+        Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://localhost:{server.server_address[1]}"
+            with urlopen(f"{url}/site/blog/post.html") as response:
+                self.assertTrue(response.read().decode().startswith("<h1>Post</h1><script>"))
+            with urlopen(f"{url}/site/index.css") as response:
+                self.assertEqual(response.read(), b"body {}")
+            with self.assertRaises(HTTPError) as context:
+                urlopen(f"{url}/index.css")
+            self.assertEqual(context.exception.code, 404)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_inject_livereload(self):
+        html = inject_livereload("<body><p>page</p></body>")
+        self.assertTrue(html.startswith("<body><p>page</p><script>"))
+        self.assertTrue(html.endswith("</script></body>"))
+
+if __name__ == "__main__":
+    unittest.main()
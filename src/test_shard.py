@@ -0,0 +1,113 @@
+import json
+import subprocess
+import sys
+import unittest
+
+from os import makedirs
+from os.path import dirname, exists, join, abspath
+from tempfile import TemporaryDirectory
+
+from main import collect_pages
+from shard import SHARD_MANIFEST, Shard, merge_shards, parse_shard, shard_of
+
+MAIN = join(dirname(abspath(__file__)), "main.py")
+
+def write(path, content):
+    makedirs(dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+class TestShard(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.dir = self.tmp.name
+        for i in range(12):
+            write(join(self.dir, "content", f"section{i % 3}", f"page{i}.md"), f"# Page {i}\n\nBody of page **{i}**")
+        write(join(self.dir, "static", "index.css"), "body {}")
+        write(join(self.dir, "static", "images", "logo.png"), "png")
+        write(join(self.dir, "template.html"), "<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_main(self, *args):
+        subprocess.run([sys.executable, MAIN, *args], cwd=self.dir, check=True, capture_output=True)
+
+    def test_shard_of_is_stable(self):
+        self.assertEqual(shard_of("blog/post/index.md", 4), shard_of("blog/post/index.md", 4))
+        self.assertEqual({shard_of(f"page{i}.md", 4) for i in range(100)}, {0, 1, 2, 3})
+
+    def test_parse_shard(self):
+        shard = parse_shard("1/4")
+        self.assertEqual((shard.index, shard.count), (1, 4))
+        self.assertEqual(shard.output("docs/"), "docs.shard-1-of-4")
+        for spec in ["4/4", "1", "a/2", "0/0"]:
+            with self.assertRaises(ValueError):
+                parse_shard(spec)
+
+    def test_shards_partition_pages(self):
+        content = join(self.dir, "content")
+        everything = collect_pages(content, "out")
+        shards = [collect_pages(content, "out", shard=Shard(i, 3)) for i in range(3)]
+        self.assertEqual(sorted(sum(shards, [])), everything)
+
+    def test_separate_processes_merge_to_full_build(self):
+        self.run_main("/", "--output", "full")
+        processes = [
+            subprocess.Popen([sys.executable, MAIN, "/", "--shard", f"{i}/3"], cwd=self.dir, stdout=subprocess.DEVNULL)
+            for i in range(3)
+        ]
+        for process in processes:
+            self.assertEqual(process.wait(), 0)
+
+        shards = [f"docs.shard-{i}-of-3" for i in range(3)]
+        self.run_main("merge", *shards, "--manifest", "merged.json")
+
+        full = subprocess.run(["diff", "-r", "full", "docs"], cwd=self.dir)
+        self.assertEqual(full.returncode, 0)
+        with open(join(self.dir, "merged.json")) as f:
+            merged = json.load(f)
+        self.assertEqual(len(merged["files"]), 14)
+        self.assertFalse(exists(join(self.dir, "docs", SHARD_MANIFEST)))
+
+    def test_merge_rejects_collisions(self):
+        for i in range(2):
+            self.run_main("/", "--shard", f"{i}/2")
+        write(join(self.dir, "docs.shard-1-of-2", "extra.html"), "one")
+        write(join(self.dir, "docs.shard-0-of-2", "extra.html"), "two")
+        shards = [join(self.dir, f"docs.shard-{i}-of-2") for i in range(2)]
+        with self.assertRaises(RuntimeError) as context:
+            merge_shards(shards, join(self.dir, "docs"))
+        self.assertIn("extra.html", str(context.exception))
+        self.assertFalse(exists(join(self.dir, "docs")))
+
+    def test_merge_keeps_settings(self):
+        for i in range(2):
+            self.run_main("/", "--fingerprint", "--shard", f"{i}/2")
+        shards = [join(self.dir, f"docs.shard-{i}-of-2") for i in range(2)]
+        merged = merge_shards(shards, join(self.dir, "docs"))
+        with open(join(shards[0], SHARD_MANIFEST)) as f:
+            self.assertEqual(merged["assets"], json.load(f)["assets"])
+        self.assertNotIn("shard", merged)
+
+    def test_merge_rejects_different_settings(self):
+        for i in range(2):
+            self.run_main("/", "--fingerprint", "--shard", f"{i}/2")
+        path = join(self.dir, "docs.shard-1-of-2", SHARD_MANIFEST)
+        with open(path) as f:
+            manifest = json.load(f)
+        manifest["assets"] = "other"
+        with open(path, "w") as f:
+            json.dump(manifest, f)
+        shards = [join(self.dir, f"docs.shard-{i}-of-2") for i in range(2)]
+        with self.assertRaises(RuntimeError) as context:
+            merge_shards(shards, join(self.dir, "docs"))
+        self.assertIn("assets", str(context.exception))
+
+    def test_merge_requires_every_shard(self):
+        self.run_main("/", "--shard", "0/2")
+        with self.assertRaises(RuntimeError):
+            merge_shards([join(self.dir, "docs.shard-0-of-2")], join(self.dir, "docs"))
+
+if __name__ == "__main__":
+    unittest.main()
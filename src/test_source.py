@@ -0,0 +1,76 @@
+import unittest
+
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from frontmatter import split_front_matter
+from main import blocks_to_flat_document, blocks_to_html_node, extract_title, markdown_to_flat_document, markdown_to_html_node, read_page
+from pagecache import PageCache
+from source import SourceFile
+
+SOURCES = [
+    "# Title\n\nSome **bold** text\nover two lines\n\n- a\n- b\n",
+    "---\ntitle: Front\n---\nIntro\n\n\n\n# Late title\n\n```\ncode\n\nmore\n```\n",
+    "\n\n  \n\nNo title, café and  spaces \n\n> quote",
+    "---\nnever closed\n\n# Title",
+    "#Not a title\n\n## Not either\n\n# Title  \n",
+    "",
+]
+
+class TestSourceFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text: str, name: str = "page.md") -> str:
+        path = join(self.tmp.name, name)
+        with open(path, "w", newline="") as f:
+            f.write(text)
+        return path
+
+    def test_matches_text_parsing(self):
+        for text in SOURCES:
+            meta, body = split_front_matter(text)
+            with SourceFile(self.write(text)) as source:
+                self.assertTrue(source.scannable)
+                self.assertEqual(source.read_front_matter(), (meta, len(text[:len(text) - len(body)].encode())))
+                start = source.read_front_matter()[1]
+                self.assertEqual(source.title(start), extract_title(body))
+                self.assertEqual(blocks_to_html_node(source.blocks(start)).to_html(), markdown_to_html_node(body).to_html())
+                self.assertEqual(blocks_to_flat_document(source.blocks(start)).to_html(), markdown_to_flat_document(body).to_html())
+
+    def test_carriage_returns_are_read_as_text(self):
+        path = self.write("# Title\r\n\r\nBody\r\n")
+        with SourceFile(path) as source:
+            self.assertFalse(source.scannable)
+        title, node = read_page(path)
+        self.assertEqual((title, node.to_html()), ("Title", "<div><h1>Title</h1><p>Body</p></div>"))
+
+    def test_cache_key_matches_text(self):
+        cache = PageCache(join(self.tmp.name, "cache"))
+        text = SOURCES[1]
+        with SourceFile(self.write(text)) as source:
+            start = source.read_front_matter()[1]
+            self.assertEqual(cache.key(source.view[start:]), cache.key(split_front_matter(text)[1]))
+
+        path = self.write(SOURCES[0])
+        first = read_page(path, cache)
+        second = read_page(path, cache)
+        self.assertEqual(first[0], second[0])
+        self.assertEqual(first[1].to_html(), second[1].to_html())
+
+    def test_closes_map(self):
+        with SourceFile(self.write(SOURCES[0])) as source:
+            mapped = source.data
+        self.assertTrue(mapped.closed)
+
+        # A slice outliving the context keeps the map open until it is collected, without raising
+        with SourceFile(self.write(SOURCES[0])) as source:
+            kept = source.view[0:1]
+        self.assertEqual(source.data, b"")
+        del kept
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,7 @@
 import unittest
 
 from textnode import TextNode, TextType
-from splitnodes import split_nodes_delimiter, split_nodes_link, split_nodes_image
+from splitnodes import split_nodes_delimiter, split_nodes_link, split_nodes_image, text_to_textnodes
 
 class TestSplitNodes(unittest.TestCase):
     def test_simple_split(self):
@@ -80,4 +80,55 @@ class TestSplitNodes(unittest.TestCase):
         self.assertEqual(new_nodes[1].type, TextType.IMAGE)
         self.assertEqual(new_nodes[2].text, " and another ")
         self.assertEqual(new_nodes[3].text, "YouTube")
-        self.assertEqual(new_nodes[3].type, TextType.IMAGE)
\ No newline at end of file
+        self.assertEqual(new_nodes[3].type, TextType.IMAGE)
+
+    def test_text_to_textnodes(self):
+        text = "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
+        self.assertEqual(
+            text_to_textnodes(text),
+            [
+                TextNode("This is ", TextType.TEXT),
+                TextNode("text", TextType.BOLD),
+                TextNode(" with an ", TextType.TEXT),
+                TextNode("italic", TextType.ITALIC),
+                TextNode(" word and a ", TextType.TEXT),
+                TextNode("code block", TextType.CODE),
+                TextNode(" and an ", TextType.TEXT),
+                TextNode("obi wan image", TextType.IMAGE, "https://i.imgur.com/fJRm4Vk.jpeg"),
+                TextNode(" and a ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "https://boot.dev"),
+            ],
+        )
+
+    def test_text_to_textnodes_keeps_text_after_link(self):
+        self.assertEqual(
+            text_to_textnodes("Contact [me](/contact)."),
+            [
+                TextNode("Contact ", TextType.TEXT),
+                TextNode("me", TextType.LINK, "/contact"),
+                TextNode(".", TextType.TEXT),
+            ],
+        )
+
+    def test_text_to_textnodes_unclosed_delimiters(self):
+        self.assertEqual(text_to_textnodes("a `b **c [d](e"), [TextNode("a `b **c [d](e", TextType.TEXT)])
+
+    def test_text_to_textnodes_delimiter_in_link_url(self):
+        self.assertEqual(
+            text_to_textnodes("see_this [a](http://x_y) now"),
+            [
+                TextNode("see_this ", TextType.TEXT),
+                TextNode("a", TextType.LINK, "http://x_y"),
+                TextNode(" now", TextType.TEXT),
+            ],
+        )
+        self.assertEqual(
+            text_to_textnodes("a *`b ![i](/x`y.png) c"),
+            [TextNode("a *`b ", TextType.TEXT), TextNode("i", TextType.IMAGE, "/x`y.png"), TextNode(" c", TextType.TEXT)],
+        )
+
+    def test_text_to_textnodes_many_delimiters(self):
+        text = "_a_ " * 5000
+        nodes = text_to_textnodes(text)
+        self.assertEqual(len(nodes), 10000)
+        self.assertEqual(nodes[0], TextNode("a", TextType.ITALIC))
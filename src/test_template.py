@@ -0,0 +1,48 @@
+import unittest
+
+from io import StringIO
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from template import Slot, compile_template, load_template, rewrite_basepath
+
+class TestTemplate(unittest.TestCase):
+    def test_rewrite_basepath(self):
+        html = '<a href="/blog">blog</a><img src="/image.png">'
+        self.assertEqual(rewrite_basepath(html, "/site/"), '<a href="/site/blog">blog</a><img src="/site/image.png">')
+
+    def test_rewrite_srcset(self):
+        html = '<img src="/a.png" srcset="/a-480w.png 480w, https://cdn.example.com/a.png 960w">'
+        self.assertEqual(rewrite_basepath(html, "/site/"), '<img src="/site/a.png" srcset="/site/a-480w.png 480w, https://cdn.example.com/a.png 960w">')
+
+    def test_rewrite_fingerprinted(self):
+        assets = {"/a.css": "/a.123.css", "/a.png": "/a.456.png"}
+        html = '<link href="/a.css#x"><a href="/about">about</a><img src="/a.png" srcset="/a.png 100w, /b.png 50w">'
+        self.assertEqual(
+            rewrite_basepath(html, "/site/", assets),
+            '<link href="/site/a.123.css#x"><a href="/site/about">about</a><img src="/site/a.456.png" srcset="/site/a.456.png 100w, /site/b.png 50w">',
+        )
+
+    def test_compile_template(self):
+        template = compile_template('<title>{{ Title }}</title><a href="/">{{Content}}</a>', "/site/")
+        self.assertEqual(
+            template.segments,
+            ["<title>", Slot("Title", ""), '</title><a href="/site/">', Slot("Content", ""), "</a>"],
+        )
+
+    def test_render(self):
+        template = compile_template("<h1>{{ Title }}</h1>{{ Content }}<p>{{ Date }}</p>")
+        fp = StringIO()
+        template.render(fp, {"Title": "Hello", "Content": iter(["<p>", "body", "</p>"])})
+        self.assertEqual(fp.getvalue(), "<h1>Hello</h1><p>body</p><p>{{ Date }}</p>")
+
+    def test_load_template_is_cached(self):
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Content }}")
+            self.assertIs(load_template(path), load_template(path))
+            self.assertIsNot(load_template(path), load_template(path, "/site/"))
+
+if __name__ == "__main__":
+    unittest.main()
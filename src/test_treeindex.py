@@ -0,0 +1,52 @@
+import os
+import unittest
+
+from os.path import isdir, join
+from tempfile import TemporaryDirectory
+
+from treeindex import TreeIndex, make_directories
+
+def write(path, content=""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+class TestTreeIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.root = self.tmp.name
+        write(join(self.root, "index.md"), "# Home")
+        write(join(self.root, "blog", "post", "index.md"), "# Post")
+        write(join(self.root, "blog", "a.png"), "png")
+        write(join(self.root, "about.md"), "# About")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sorted_depth_first(self):
+        index = TreeIndex(self.root)
+        self.assertEqual(
+            [file.relative for file in index.files],
+            ["about.md", join("blog", "a.png"), join("blog", "post", "index.md"), "index.md"],
+        )
+        self.assertEqual(index.directories, ["blog", join("blog", "post")])
+
+    def test_sizes_and_lookup(self):
+        index = TreeIndex(self.root)
+        path = join(self.root, "index.md")
+        self.assertEqual(index.get(path).size, 6)
+        self.assertEqual(index.get(path).mtime_ns, os.stat(path).st_mtime_ns)
+        self.assertIsNone(index.get(join(self.root, "missing.md")))
+        # One listing per directory and one stat per file
+        self.assertEqual((index.scandir_calls, index.stat_calls), (3, 4))
+
+    def test_make_directories(self):
+        output = join(self.root, "out", "site")
+        calls = make_directories(output, [join("a", "b", "c"), "d", join("a", "b")])
+        self.assertEqual(calls, 5)
+        for directory in [join("a", "b", "c"), "d"]:
+            self.assertTrue(isdir(join(output, directory)))
+        make_directories(output, ["d"])
+
+if __name__ == "__main__":
+    unittest.main()
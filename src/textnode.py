@@ -12,9 +12,7 @@ class TextType(Enum):
     IMAGE = "image"
 
 class TextNode:
-    text = ""
-    type = TextType.TEXT
-    url = ""
+    __slots__ = ("text", "type", "url")
 
     def __init__(self, text: str, type: TextType = TextType.TEXT, url: str = ""):
         """
@@ -0,0 +1,102 @@
+import os
+
+from os.path import dirname, join
+
+class IndexedFile:
+    """
+    A file found by a TreeIndex, with the stat result read while scanning.
+    """
+
+    __slots__ = ("path", "relative", "info")
+
+    def __init__(self, path: str, relative: str, info: os.stat_result):
+        self.path = path
+        self.relative = relative
+        self.info = info
+
+    @property
+    def size(self) -> int:
+        return self.info.st_size
+
+    @property
+    def mtime_ns(self) -> int:
+        return self.info.st_mtime_ns
+
+class TreeIndex:
+    """
+    An in-memory index of every file and directory under a root, built with one os.scandir pass.
+
+    Entry types come from the directory listing, so the only stat per file is the one that
+    reads its size and modification time. Files and directories are kept in the same sorted,
+    depth-first order as a walk over sorted(listdir()).
+    """
+
+    def __init__(self, root: str):
+        """
+        Scan a directory tree.
+
+        :param root: The directory to index.
+        """
+        self.root = root
+        self.files = []
+        self.directories = []
+        self.by_path = {}
+        self.scandir_calls = 0
+        self.stat_calls = 0
+        self.scan(root, "")
+
+    def scan(self, directory: str, relative: str):
+        """
+        Add the files and subdirectories of a directory to the index.
+
+        :param directory: Path of the directory.
+        :param relative: Path of the directory relative to the root, empty for the root.
+        """
+        self.scandir_calls += 1
+        with os.scandir(directory) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+
+        for entry in entries:
+            entry_relative = join(relative, entry.name) if relative else entry.name
+            if entry.is_dir():
+                self.directories.append(entry_relative)
+                self.scan(entry.path, entry_relative)
+            elif entry.is_file():
+                self.stat_calls += 1
+                indexed = IndexedFile(entry.path, entry_relative, entry.stat())
+                self.files.append(indexed)
+                self.by_path[entry.path] = indexed
+
+    def get(self, path: str) -> IndexedFile:
+        """
+        Look up an indexed file.
+
+        :param path: Path of the file, as built from the root.
+        :return: The IndexedFile, or None if the file was not indexed.
+        """
+        return self.by_path.get(path)
+
+def make_directories(root: str, directories) -> int:
+    """
+    Create an output root and a batch of directories under it, with one mkdir each.
+
+    Parents are added to the batch and sorted before their children, so no existence
+    checks are needed.
+
+    :param root: The directory the others are created in.
+    :param directories: Directories to create, relative to the root.
+    :return: Number of mkdir calls made.
+    """
+    os.makedirs(root, exist_ok=True)
+    wanted = set()
+    for directory in directories:
+        while directory and directory not in wanted:
+            wanted.add(directory)
+            directory = dirname(directory)
+
+    for directory in sorted(wanted):
+        try:
+            os.mkdir(join(root, directory))
+        except FileExistsError:
+            pass
+    return len(wanted) + 1